@@ -6,13 +6,21 @@ from datetime import timedelta
 import os
 
 from app.extensions import db, jwt, bcrypt
-from app.utils.cleanup import delete_expired_sessions
+from app.migrations import upgrade_database
+from app.utils.access_control import init_access_cache
+from app.utils.admin_cache import init_admin_cache, load_admin
+from app.utils.cleanup import delete_expired_sessions, start_session_reaper
+from app.utils.department_stats import init_department_stats_cache
+from app.utils.jobs import init_job_runner
+from app.utils.session_registry import init_session_registry, load_active_sessions
+from app.utils.student_cache import init_student_cache
+from app.utils.write_buffer import init_write_buffer
 
 load_dotenv()
 
 
-def create_app():
-    app = Flask(__name__, instance_relative_config=True)
+def create_app(test_config=None, instance_path=None):
+    app = Flask(__name__, instance_path=instance_path, instance_relative_config=True)
 
     # CORS for React frontend
     CORS(
@@ -32,20 +40,64 @@ def create_app():
         JWT_TOKEN_LOCATION=["headers"],
         JWT_ACCESS_TOKEN_EXPIRES=timedelta(hours=1),
         JWT_REFRESH_TOKEN_EXPIRES=timedelta(hours=1),
+        # Keys the session code permutation; must stay stable once codes exist
+        SESSION_CODE_KEY=os.getenv("SESSION_CODE_KEY"),
+        # Expired-session reaper: how often it runs (0 disables the thread)
+        # and how long expired sessions are kept before deletion
+        SESSION_REAPER_INTERVAL=int(os.getenv("SESSION_REAPER_INTERVAL", 300)),
+        SESSION_RETENTION=timedelta(
+            minutes=int(os.getenv("SESSION_RETENTION_MINUTES", 0))
+        ),
+        # How long a cached session code is trusted before it is re-read, which
+        # bounds how long a session deleted by another worker stays markable
+        SESSION_REGISTRY_TTL=float(os.getenv("SESSION_REGISTRY_TTL", 5)),
+        # Optional group commit of attendance inserts during bursts
+        ATTENDANCE_GROUP_COMMIT=os.getenv("ATTENDANCE_GROUP_COMMIT", "0") == "1",
+        ATTENDANCE_GROUP_COMMIT_MAX_BATCH=int(
+            os.getenv("ATTENDANCE_GROUP_COMMIT_MAX_BATCH", 200)
+        ),
+        ATTENDANCE_GROUP_COMMIT_DELAY_MS=float(
+            os.getenv("ATTENDANCE_GROUP_COMMIT_DELAY_MS", 5)
+        ),
+        # Student identity cache used by mark-attendance
+        STUDENT_CACHE_SIZE=int(os.getenv("STUDENT_CACHE_SIZE", 50000)),
+        STUDENT_CACHE_TTL=int(os.getenv("STUDENT_CACHE_TTL", 600)),
+        # Cross-request cache of each admin's accessible courses
+        ACCESS_CACHE_TTL=int(os.getenv("ACCESS_CACHE_TTL", 30)),
+        # JWT subject -> admin identity cache
+        ADMIN_CACHE_TTL=int(os.getenv("ADMIN_CACHE_TTL", 60)),
+        # Department course counts (public landing page and per admin)
+        DEPARTMENT_STATS_TTL=int(os.getenv("DEPARTMENT_STATS_TTL", 300)),
+        # Keyset-paginated listings: rows per page unless ?limit= asks for
+        # fewer or more, and the most a single page may hold
+        DEFAULT_PAGE_SIZE=int(os.getenv("DEFAULT_PAGE_SIZE", 100)),
+        MAX_PAGE_SIZE=int(os.getenv("MAX_PAGE_SIZE", 1000)),
+        # Background jobs: worker threads and how long finished results are kept
+        JOB_WORKERS=int(os.getenv("JOB_WORKERS", 2)),
+        JOB_RESULT_TTL=timedelta(hours=int(os.getenv("JOB_RESULT_TTL_HOURS", 24))),
+        JOB_HEARTBEAT_INTERVAL=int(os.getenv("JOB_HEARTBEAT_INTERVAL", 30)),
     )
+    if test_config:
+        app.config.update(test_config)
 
     # Init extensions
     db.init_app(app)
     jwt.init_app(app)
     bcrypt.init_app(app)
+    init_student_cache(app)
+    init_session_registry(app)
+    init_access_cache(app)
+    init_admin_cache(app)
+    init_department_stats_cache(app)
 
     # JWT user loader
     @jwt.user_lookup_loader
     def user_lookup_callback(_jwt_header, jwt_data):
-        from app.models import Admin
-
-        identity = jwt_data["sub"]
-        return Admin.query.get(identity)
+        try:
+            identity = int(jwt_data["sub"])
+        except (TypeError, ValueError):
+            return None
+        return load_admin(identity)
 
     # Blueprints
     from app.routes.login import auth_bp
@@ -55,6 +107,8 @@ def create_app():
     from app.routes.attendance import attendance_bp
     from app.routes.session import session_bp
     from app.routes.stats import stats_bp
+    from app.routes.dashboard import dashboard_bp
+    from app.routes.jobs import jobs_bp
     from app.routes.test import test_bp
 
     # Short endpoints
@@ -65,14 +119,25 @@ def create_app():
     app.register_blueprint(attendance_bp, url_prefix="/attendance")
     app.register_blueprint(session_bp, url_prefix="/sessions")
     app.register_blueprint(stats_bp, url_prefix="/stats")
+    app.register_blueprint(dashboard_bp)  # /dashboard
+    app.register_blueprint(jobs_bp)  # /jobs
     app.register_blueprint(test_bp)
 
+    from app.cli import register_commands
+
+    register_commands(app)
+
     @app.route("/health")
     def health_check():
         return jsonify({"status": "GeoPresence API running"})
 
     with app.app_context():
-        db.create_all()
-        delete_expired_sessions()
+        upgrade_database()
+        delete_expired_sessions(app.config["SESSION_RETENTION"])
+        load_active_sessions()
+
+    init_job_runner(app)
+    start_session_reaper(app)
+    init_write_buffer(app)
 
     return app
@@ -0,0 +1,64 @@
+# app/cli.py
+from datetime import timedelta
+
+import click
+from flask import current_app
+
+from app.extensions import db
+from app.migrations import upgrade_database
+from app.utils.cleanup import delete_expired_sessions
+from app.utils.jobs import delete_expired_jobs
+from app.utils.rollups import check_rollups, rebuild_rollups
+
+
+def register_commands(app):
+    @app.cli.command("reap-sessions")
+    @click.option(
+        "--retention-minutes",
+        type=int,
+        default=None,
+        help="Keep sessions this long after expiry (defaults to SESSION_RETENTION).",
+    )
+    def reap_sessions(retention_minutes):
+        """Delete expired sessions that have no attendance linked."""
+        retention = (
+            timedelta(minutes=retention_minutes)
+            if retention_minutes is not None
+            else current_app.config["SESSION_RETENTION"]
+        )
+        deleted = delete_expired_sessions(retention)
+        click.echo(f"Deleted {deleted} expired sessions")
+
+    @app.cli.command("reap-jobs")
+    def reap_jobs():
+        """Delete background jobs whose results have expired."""
+        deleted = delete_expired_jobs()
+        click.echo(f"Deleted {deleted} expired jobs")
+
+    @app.cli.command("db-upgrade")
+    def db_upgrade():
+        """Apply pending schema migrations."""
+        version = upgrade_database()
+        click.echo(f"Database at schema version {version}")
+
+    @app.cli.command("rebuild-rollups")
+    def rebuild_rollups_command():
+        """Recompute the attendance rollup tables from raw attendance."""
+        with db.engine.begin() as conn:
+            written = rebuild_rollups(conn)
+        for table, rows in written.items():
+            click.echo(f"{table}: {rows} rows")
+
+    @app.cli.command("check-rollups")
+    def check_rollups_command():
+        """Compare the attendance rollup tables with raw attendance."""
+        with db.engine.connect() as conn:
+            mismatches = check_rollups(conn)
+        for table, course_id, key, expected, actual in mismatches:
+            click.echo(
+                f"{table} course={course_id} key={key}: "
+                f"expected {expected}, found {actual}"
+            )
+        if mismatches:
+            raise SystemExit(1)
+        click.echo("Rollups match the attendance table")
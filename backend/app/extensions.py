@@ -1,8 +1,23 @@
 # app/extensions.py
+import sqlite3
+
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_bcrypt import Bcrypt
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 db = SQLAlchemy()
 jwt = JWTManager()
 bcrypt = Bcrypt()
+
+
+# WAL lets writers commit while another connection is mid-way through a
+# streaming read (exports, job heartbeats). The mode is stored in the
+# database file, so setting it on every connect is a cheap no-op after the first.
+@event.listens_for(Engine, "connect")
+def _configure_sqlite(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
@@ -0,0 +1,351 @@
+# app/migrations.py
+# Versioned schema migrations, applied in order by upgrade_database().
+# Each one runs in its own transaction together with the bump of the
+# single-row schema_version table. They must also work on databases created
+# by the old bare db.create_all(), hence checkfirst everywhere.
+import logging
+
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    JSON,
+    MetaData,
+    String,
+    Table,
+    Text,
+    UniqueConstraint,
+    inspect,
+    text,
+)
+
+from app.extensions import db
+from app import models
+from app.utils.rollups import rebuild_rollups
+
+logger = logging.getLogger(__name__)
+
+# Every table and index exactly as the migration that created it defined it.
+# Migrations must not use the live models for DDL: a migration that has been
+# applied anywhere has to produce the same schema forever, whatever models.py
+# looks like later. Change the schema by appending a migration instead.
+schema = MetaData()
+
+# ---- version 1: the schema of the original db.create_all() ----
+admins = Table(
+    "admins",
+    schema,
+    Column("id", Integer, primary_key=True),
+    Column("full_name", String(100), nullable=False),
+    Column("email", String(100), unique=True, nullable=False),
+    Column("password_hash", String(200), nullable=False),
+)
+students = Table(
+    "students",
+    schema,
+    Column("id", Integer, primary_key=True),
+    Column("index_number", String(20), unique=True, nullable=False),
+    Column("full_name", String(100), nullable=False),
+    Column("email", String(100), unique=True, nullable=False),
+)
+courses = Table(
+    "courses",
+    schema,
+    Column("id", Integer, primary_key=True),
+    Column("course_code", String(20), unique=True, nullable=False),
+    Column("course_name", String(100), nullable=False),
+    Column("department", String(50)),
+    Column("semester", String(20)),
+    Column(
+        "lecturer_id",
+        Integer,
+        ForeignKey("admins.id", ondelete="CASCADE"),
+        nullable=False,
+    ),
+)
+course_rep_access = Table(
+    "course_rep_access",
+    schema,
+    Column("id", Integer, primary_key=True),
+    Column(
+        "rep_id", Integer, ForeignKey("admins.id", ondelete="CASCADE"), nullable=False
+    ),
+    Column(
+        "course_id",
+        Integer,
+        ForeignKey("courses.id", ondelete="CASCADE"),
+        nullable=False,
+    ),
+    Column("approved_by_lecturer", Boolean),
+    UniqueConstraint("rep_id", "course_id", name="unique_rep_course"),
+)
+session_codes = Table(
+    "session_codes",
+    schema,
+    Column("id", Integer, primary_key=True),
+    Column("code", String(20), unique=True, nullable=False),
+    Column("created_at", DateTime),
+    Column("expires_at", DateTime, nullable=False),
+    Column("latitude", Float, nullable=False),
+    Column("longitude", Float, nullable=False),
+    Column("geo_radius", Float),
+    Column(
+        "admin_id", Integer, ForeignKey("admins.id", ondelete="CASCADE"), nullable=False
+    ),
+    Column("course_id", Integer, ForeignKey("courses.id", ondelete="CASCADE")),
+)
+attendance = Table(
+    "attendance",
+    schema,
+    Column("id", Integer, primary_key=True),
+    Column("timestamp", DateTime),
+    Column(
+        "student_id",
+        Integer,
+        ForeignKey("students.id", ondelete="CASCADE"),
+        nullable=False,
+    ),
+    Column(
+        "session_id",
+        Integer,
+        ForeignKey("session_codes.id", ondelete="CASCADE"),
+        nullable=False,
+    ),
+    Column("student_latitude", Float),
+    Column("student_longitude", Float),
+    Column("status", String(20)),
+    UniqueConstraint("student_id", "session_id", name="unique_student_session"),
+)
+location_codes = Table(
+    "location_codes",
+    schema,
+    Column("id", Integer, primary_key=True),
+    Column("code", String(10), unique=True, nullable=False),
+    Column("latitude", Float, nullable=False),
+    Column("longitude", Float, nullable=False),
+    Column("radius", Float, nullable=False),
+)
+course_sessions = Table(
+    "course_sessions",
+    schema,
+    Column("id", Integer, primary_key=True),
+    Column(
+        "course_id",
+        Integer,
+        ForeignKey("courses.id", ondelete="CASCADE"),
+        nullable=False,
+    ),
+    Column(
+        "location_id",
+        Integer,
+        ForeignKey("session_codes.id", ondelete="CASCADE"),
+        nullable=False,
+    ),
+    Column("start_time", DateTime, nullable=False),
+)
+
+# ---- version 2 ----
+# Plain DDL: Index objects would attach to the tables above and be created
+# by migration 1 as well
+hot_query_indexes = [
+    ("ix_attendance_session_timestamp", "attendance", ("session_id", "timestamp")),
+    ("ix_attendance_timestamp", "attendance", ("timestamp",)),
+    ("ix_session_codes_course_expires", "session_codes", ("course_id", "expires_at")),
+    ("ix_session_codes_admin_created", "session_codes", ("admin_id", "created_at")),
+    ("ix_session_codes_expires_at", "session_codes", ("expires_at",)),
+    ("ix_courses_lecturer_id", "courses", ("lecturer_id",)),
+    ("ix_course_rep_access_course_rep", "course_rep_access", ("course_id", "rep_id")),
+]
+
+# ---- version 3 ----
+attendance_daily_counts = Table(
+    "attendance_daily_counts",
+    schema,
+    Column(
+        "course_id",
+        Integer,
+        ForeignKey("courses.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column("day", Date, primary_key=True),
+    Column("attendance_count", Integer, nullable=False),
+)
+student_course_totals = Table(
+    "student_course_totals",
+    schema,
+    Column(
+        "course_id",
+        Integer,
+        ForeignKey("courses.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column(
+        "student_id",
+        Integer,
+        ForeignKey("students.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column("attendance_count", Integer, nullable=False),
+    Index("ix_student_course_totals_count", "course_id", "attendance_count"),
+)
+
+# ---- version 4 ----
+attendance_bucket_counts = Table(
+    "attendance_bucket_counts",
+    schema,
+    Column(
+        "course_id",
+        Integer,
+        ForeignKey("courses.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column("bucket_start", BigInteger, primary_key=True, autoincrement=False),
+    Column("attendance_count", Integer, nullable=False),
+)
+
+# ---- version 5 (owner and heartbeat_at are added by version 6) ----
+jobs = Table(
+    "jobs",
+    schema,
+    Column("id", String(32), primary_key=True),
+    Column("kind", String(50), nullable=False),
+    Column(
+        "admin_id", Integer, ForeignKey("admins.id", ondelete="CASCADE"), nullable=False
+    ),
+    Column("status", String(20), nullable=False),
+    Column("params", JSON, nullable=False),
+    Column("progress", Integer, nullable=False),
+    Column("total", Integer),
+    Column("result", JSON),
+    Column("error", Text),
+    Column("result_file", String(255)),
+    Column("download_name", String(255)),
+    Column("mimetype", String(100)),
+    Column("created_at", DateTime, nullable=False),
+    Column("started_at", DateTime),
+    Column("finished_at", DateTime),
+    Column("expires_at", DateTime),
+    Index("ix_jobs_admin_created", "admin_id", "created_at"),
+    Index("ix_jobs_expires_at", "expires_at"),
+)
+
+# ---- version 7: created by version 1 before it was frozen ----
+code_counters = Table(
+    "code_counters",
+    schema,
+    Column("name", String(20), primary_key=True),
+    Column("next_value", BigInteger, nullable=False),
+)
+
+
+def _create_tables(conn, *tables):
+    # Also creates each table's own indexes; checkfirst skips existing ones
+    schema.create_all(conn, tables=list(tables))
+
+
+def _create_indexes(conn, indexes):
+    for name, table_name, columns in indexes:
+        conn.execute(
+            text(
+                f"CREATE INDEX IF NOT EXISTS {name} "
+                f"ON {table_name} ({', '.join(columns)})"
+            )
+        )
+
+
+def _add_columns(conn, table_name, *columns):
+    existing = {c["name"] for c in inspect(conn).get_columns(table_name)}
+    for name, type_ in columns:
+        if name in existing:
+            continue
+        ddl = type_.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {name} {ddl}"))
+
+
+def _baseline(conn):
+    _create_tables(
+        conn,
+        admins,
+        students,
+        courses,
+        course_rep_access,
+        session_codes,
+        attendance,
+        location_codes,
+        course_sessions,
+    )
+
+
+def _hot_query_indexes(conn):
+    _create_indexes(conn, hot_query_indexes)
+
+
+def _attendance_rollups(conn):
+    _create_tables(conn, attendance_daily_counts, student_course_totals)
+    rebuild_rollups(conn, [models.AttendanceDailyCount, models.StudentCourseTotal])
+
+
+def _attendance_buckets(conn):
+    _create_tables(conn, attendance_bucket_counts)
+    rebuild_rollups(conn, [models.AttendanceBucketCount])
+
+
+def _jobs(conn):
+    _create_tables(conn, jobs)
+
+
+def _job_owners(conn):
+    _add_columns(conn, "jobs", ("owner", String(64)), ("heartbeat_at", DateTime()))
+
+
+def _code_counters(conn):
+    _create_tables(conn, code_counters)
+
+
+MIGRATIONS = [
+    (1, "baseline schema", _baseline),
+    (2, "indexes for hot query predicates", _hot_query_indexes),
+    (3, "attendance rollup tables", _attendance_rollups),
+    (4, "15-minute attendance buckets", _attendance_buckets),
+    (5, "background jobs", _jobs),
+    (6, "job owners and heartbeats", _job_owners),
+    (7, "session code counters", _code_counters),
+]
+
+
+def current_version(conn):
+    conn.execute(
+        text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+    )
+    version = conn.execute(text("SELECT version FROM schema_version")).scalar()
+    if version is None:
+        conn.execute(text("INSERT INTO schema_version (version) VALUES (0)"))
+        version = 0
+    return version
+
+
+def upgrade_database():
+    """
+    Apply every pending migration. Returns the resulting schema version.
+    Must be called inside an app context.
+    """
+    with db.engine.begin() as conn:
+        version = current_version(conn)
+
+    for target, description, migrate in MIGRATIONS:
+        if target <= version:
+            continue
+        logger.info("Applying migration %d: %s", target, description)
+        with db.engine.begin() as conn:
+            migrate(conn)
+            conn.execute(
+                text("UPDATE schema_version SET version = :v"), {"v": target}
+            )
+        version = target
+    return version
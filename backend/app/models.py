@@ -66,6 +66,8 @@ class Attendance(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint("student_id", "session_id", name="unique_student_session"),
+        db.Index("ix_attendance_session_timestamp", "session_id", "timestamp"),
+        db.Index("ix_attendance_timestamp", "timestamp"),
     )
 
     def __repr__(self):
@@ -98,6 +100,12 @@ class SessionCode(db.Model):
         "CourseSession", backref="location", lazy=True, cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        db.Index("ix_session_codes_course_expires", "course_id", "expires_at"),
+        db.Index("ix_session_codes_admin_created", "admin_id", "created_at"),
+        db.Index("ix_session_codes_expires_at", "expires_at"),
+    )
+
     def __repr__(self):
         return f"<Session {self.code}>"
 
@@ -135,6 +143,8 @@ class Course(db.Model):
         "CourseSession", backref="course", lazy=True, cascade="all, delete-orphan"
     )
 
+    __table_args__ = (db.Index("ix_courses_lecturer_id", "lecturer_id"),)
+
     def __repr__(self):
         return f"<Course {self.course_code}>"
 
@@ -153,6 +163,7 @@ class CourseRepAccess(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint("rep_id", "course_id", name="unique_rep_course"),
+        db.Index("ix_course_rep_access_course_rep", "course_id", "rep_id"),
     )
 
     def __repr__(self):
@@ -175,3 +186,101 @@ class CourseSession(db.Model):
 
     def __repr__(self):
         return f"<CourseSession course={self.course_id}, location={self.location_id}>"
+
+
+# ---------------------- CODE COUNTER ----------------------
+class CodeCounter(db.Model):
+    __tablename__ = "code_counters"
+    name = db.Column(db.String(20), primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CodeCounter {self.name}={self.next_value}>"
+
+
+# ---------------------- JOB ----------------------
+# Background exports and imports run by app/utils/jobs.py. Result files live
+# under instance_path/jobs and are removed with the row once expires_at passes.
+class Job(db.Model):
+    __tablename__ = "jobs"
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    admin_id = db.Column(
+        db.Integer, db.ForeignKey("admins.id", ondelete="CASCADE"), nullable=False
+    )
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    # Boot id of the runner that executes the job and the last time that
+    # runner reported itself alive; stale unfinished jobs are failed
+    owner = db.Column(db.String(64))
+    heartbeat_at = db.Column(db.DateTime)
+    params = db.Column(db.JSON, nullable=False, default=dict)
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    result_file = db.Column(db.String(255))
+    download_name = db.Column(db.String(255))
+    mimetype = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index("ix_jobs_admin_created", "admin_id", "created_at"),
+        db.Index("ix_jobs_expires_at", "expires_at"),
+    )
+
+    def __repr__(self):
+        return f"<Job {self.kind} {self.id} {self.status}>"
+
+
+# ---------------------- ATTENDANCE ROLLUPS ----------------------
+# Maintained incrementally by app/utils/rollups.py; rebuild with
+# `flask rebuild-rollups` if they ever drift from the attendance table.
+class AttendanceDailyCount(db.Model):
+    __tablename__ = "attendance_daily_counts"
+    course_id = db.Column(
+        db.Integer, db.ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True
+    )
+    day = db.Column(db.Date, primary_key=True)
+    attendance_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<AttendanceDailyCount course={self.course_id}, day={self.day}>"
+
+
+class AttendanceBucketCount(db.Model):
+    __tablename__ = "attendance_bucket_counts"
+    course_id = db.Column(
+        db.Integer, db.ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True
+    )
+    # Unix time (UTC) of the start of a 15-minute bucket
+    bucket_start = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    attendance_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return (
+            f"<AttendanceBucketCount course={self.course_id}, "
+            f"bucket={self.bucket_start}>"
+        )
+
+
+class StudentCourseTotal(db.Model):
+    __tablename__ = "student_course_totals"
+    course_id = db.Column(
+        db.Integer, db.ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True
+    )
+    student_id = db.Column(
+        db.Integer, db.ForeignKey("students.id", ondelete="CASCADE"), primary_key=True
+    )
+    attendance_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index("ix_student_course_totals_count", "course_id", "attendance_count"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<StudentCourseTotal course={self.course_id}, student={self.student_id}>"
+        )
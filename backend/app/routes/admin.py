@@ -3,11 +3,18 @@ from flask_jwt_extended import (
     create_access_token,
     jwt_required,
     get_jwt_identity,
+    current_user,
     set_access_cookies,
     unset_jwt_cookies,
 )
 from datetime import datetime, timedelta
+from app.utils.admin_cache import invalidate_admin
 from app.utils.code_generator import generate_unique_session_code
+from app.utils.session_registry import (
+    register_session,
+    unregister_session,
+    unregister_sessions,
+)
 from app.models import db, Admin, Student, Course, SessionCode, CourseSession
 from flask_bcrypt import Bcrypt
 
@@ -29,6 +36,7 @@ def register_admin():
     new_admin = Admin(full_name=full_name, email=email, password_hash=hashed_pw)
     db.session.add(new_admin)
     db.session.commit()
+    invalidate_admin(new_admin.id)
     return jsonify({"message": "Admin registered successfully"}), 201
 
 
@@ -47,6 +55,7 @@ def seed_admin():
     )
     db.session.add(new_admin)
     db.session.commit()
+    invalidate_admin(new_admin.id)
     token = create_access_token(identity=str(new_admin.id))
     return (
         jsonify(
@@ -115,6 +124,7 @@ def seed_sample_data():
                 )
 
         db.session.commit()
+        invalidate_admin(admin.id)
         return jsonify({"message": "Sample admin, students, and courses created."}), 201
 
     except Exception as e:
@@ -132,7 +142,7 @@ def add_course():
         return jsonify({"error": "Missing required fields"}), 400
 
     admin_id = int(get_jwt_identity())
-    if not Admin.query.get(admin_id):
+    if not current_user:
         return jsonify({"error": "Unauthorized"}), 403
 
     if Course.query.filter_by(course_code=data["course_code"]).first():
@@ -181,8 +191,7 @@ def get_all_courses():
 @jwt_required()
 def delete_course(course_id):
     admin_id = int(get_jwt_identity())
-    admin = Admin.query.get(admin_id)
-    if not admin:
+    if not current_user:
         return jsonify({"error": "Unauthorized"}), 403
 
     course = Course.query.get(course_id)
@@ -194,6 +203,7 @@ def delete_course(course_id):
 
     db.session.delete(course)
     db.session.commit()
+    unregister_sessions(course_id=course_id)
     return jsonify({"message": f"Course {course.course_code} deleted"}), 200
 
 
@@ -246,6 +256,7 @@ def location_code():
         )
         db.session.add(new_code)
         db.session.commit()
+        register_session(new_code)
         return jsonify({"message": "Code created"}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -259,6 +270,7 @@ def delete_location_code(id):
         return jsonify({"error": "Session code not found"}), 404
     db.session.delete(code)
     db.session.commit()
+    unregister_session(code.code)
     return jsonify({"message": f"Session code {id} deleted"}), 200
 
 
@@ -280,8 +292,7 @@ def create_course_session():
 @admin_bp.route("/me", methods=["GET"])
 @jwt_required()
 def get_profile():
-    admin_id = int(get_jwt_identity())
-    admin = Admin.query.get(admin_id)
+    admin = current_user
     if not admin:
         return jsonify({"error": "Admin not found"}), 404
 
@@ -313,6 +324,7 @@ def update_profile():
         admin.email = email
 
     db.session.commit()
+    invalidate_admin(admin_id)
 
     return jsonify({"message": "Profile updated successfully"}), 200
 
@@ -328,6 +340,8 @@ def delete_admin():
 
     db.session.delete(admin)
     db.session.commit()
+    invalidate_admin(admin_id)
+    unregister_sessions(admin_id=admin_id)
     return jsonify({"message": "Admin deleted successfully"}), 200
 
 
@@ -362,5 +376,6 @@ def create_admin():
     new_admin.set_password(password)
     db.session.add(new_admin)
     db.session.commit()
+    invalidate_admin(new_admin.id)
 
     return jsonify({"message": "Admin created successfully"}), 201
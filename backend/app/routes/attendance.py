@@ -1,40 +1,38 @@
-from flask import Blueprint, request, jsonify, Response
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
-from geopy.distance import geodesic
+from datetime import datetime, timezone
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import csv
-from sqlalchemy import or_
+import zlib
+from sqlalchemy import or_, select
 
 from app.models import db, SessionCode, Student, Attendance, Course, CourseRepAccess
-from app.utils.access_control import has_course_access
+from app.utils.access_control import (
+    access_cache_stats,
+    get_course_access,
+    load_attendance_access,
+    load_course_access,
+    load_session_access,
+)
+from app.utils.attendance_matrix import build_matrix, pack_rows
+from app.utils.attendance_writer import insert_attendance, retract_attendance
+from app.utils.geo import check_geofence, check_geofence_many
+from app.utils.jobs import job_handler, submit_job, wants_async
+from app.utils.pagination import finish_page, keyset, page_from_request
+from app.utils.session_registry import lookup_session
+from app.utils.student_cache import lookup_student, student_cache_stats
+from app.utils.write_buffer import get_write_buffer
 
 attendance_bp = Blueprint("attendance_bp", __name__)
 
 
-# ------------------- CLEANUP EXPIRED SESSIONS -------------------
-def delete_expired_sessions():
-    """
-    Delete expired sessions that have no attendance records.
-    Returns the number of sessions deleted.
-    """
-    now = datetime.utcnow()
-    expired_sessions = SessionCode.query.filter(
-        SessionCode.expires_at < now, ~SessionCode.attendance_records.any()
-    ).all()
-
-    count = len(expired_sessions)
-    for session in expired_sessions:
-        db.session.delete(session)
-
-    db.session.commit()
-    return count
+# ------------------- MARK ATTENDANCE -------------------
+# How long a request waits for its group commit before giving up
+ACK_TIMEOUT_SECONDS = 10
 
 
-# ------------------- MARK ATTENDANCE -------------------
 @attendance_bp.route("/mark-attendance", methods=["POST"])
 def mark_attendance():
-    delete_expired_sessions()  # cleanup before marking
-
     data = request.get_json()
     code = data.get("session_code")
     index_number = data.get("index_number")
@@ -48,53 +46,227 @@ def mark_attendance():
     if not all([code, index_number, email, latitude, longitude]):
         return jsonify({"error": "All fields are required"}), 400
 
-    session = SessionCode.query.filter_by(code=code).first()
+    session = lookup_session(code)
     if not session:
         return jsonify({"error": "Invalid session code"}), 404
     if datetime.utcnow() > session.expires_at:
         return jsonify({"error": "Session code has expired"}), 403
 
-    student = Student.query.filter_by(index_number=index_number, email=email).first()
+    student = lookup_student(index_number, email)
     if not student:
         return jsonify({"error": "Student not found"}), 404
 
-    if Attendance.query.filter_by(student_id=student.id, session_id=session.id).first():
-        return jsonify({"error": "Attendance already marked for this session"}), 409
-
-    distance = round(
-        geodesic((latitude, longitude), (session.latitude, session.longitude)).meters, 2
+    inside, distance = check_geofence(
+        latitude, longitude, session.latitude, session.longitude, session.geo_radius
     )
-    if distance > session.geo_radius:
+    distance = round(distance, 2)
+    if not inside:
         return (
             jsonify({"error": f"Outside allowed location (distance: {distance}m)"}),
             403,
         )
 
-    attendance = Attendance(
-        student_id=student.id,
-        session_id=session.id,
-        student_latitude=latitude,
-        student_longitude=longitude,
-        status="present",
+    row = {
+        "student_id": student.id,
+        "session_id": session.id,
+        "timestamp": datetime.utcnow(),
+        "student_latitude": latitude,
+        "student_longitude": longitude,
+        "status": "present",
+    }
+
+    buffer = get_write_buffer()
+    if buffer is not None:
+        # Hand the pooled connection back before waiting, the writer needs one
+        db.session.close()
+        future = buffer.submit(row)
+        try:
+            inserted = future.result(timeout=ACK_TIMEOUT_SECONDS)
+        except FutureTimeoutError:
+            return jsonify({"error": "Attendance queue is busy, try again"}), 503
+    else:
+        inserted = bool(insert_attendance([row]))
+        db.session.commit()
+
+    if not inserted:
+        return jsonify({"error": "Attendance already marked for this session"}), 409
+    return jsonify({"message": "Attendance marked", "distance": distance}), 201
+
+
+@attendance_bp.route("/metrics", methods=["GET"])
+@jwt_required()
+def attendance_metrics():
+    buffer = get_write_buffer()
+    return (
+        jsonify(
+            {
+                "write_buffer": buffer.stats() if buffer else {"enabled": False},
+                "student_cache": student_cache_stats(),
+                "access_cache": access_cache_stats(),
+            }
+        ),
+        200,
     )
 
-    db.session.add(attendance)
-    db.session.commit()
-    return jsonify({"message": "Attendance marked", "distance": distance}), 201
 
+# ------------------- BULK MARK ATTENDANCE -------------------
+MAX_BULK_SUBMISSIONS = 500
 
-# ------------------- VIEW ATTENDANCE -------------------
-@attendance_bp.route("/by-session/<int:session_id>", methods=["GET"])
+
+@attendance_bp.route("/mark-attendance/bulk", methods=["POST"])
 @jwt_required()
-def view_attendance_by_session(session_id):
+def bulk_mark_attendance():
+    """
+    Upload check-ins collected offline by a course rep's device for one session.
+    Each submission may carry the `timestamp` it was captured at, which must
+    fall between the session's creation and its expiry and not lie in the
+    future. Returns a result per submission.
+    """
     admin_id = int(get_jwt_identity())
-    session = SessionCode.query.get_or_404(session_id)
-    course = Course.query.get(session.course_id)
+    data = request.get_json() or {}
+    code = data.get("session_code")
+    submissions = data.get("submissions")
 
-    if not has_course_access(course, admin_id, allow_reps=True):
-        return jsonify({"error": "Access denied"}), 403
+    if not code or not isinstance(submissions, list) or not submissions:
+        return jsonify({"error": "session_code and submissions are required"}), 400
+    if len(submissions) > MAX_BULK_SUBMISSIONS:
+        return (
+            jsonify({"error": f"At most {MAX_BULK_SUBMISSIONS} submissions per upload"}),
+            400,
+        )
 
-    records = Attendance.query.filter_by(session_id=session_id).all()
+    session = lookup_session(code)
+    if not session:
+        return jsonify({"error": "Invalid session code"}), 404
+    # The session's creator, the course lecturer or an approved rep
+    if session.admin_id != admin_id:
+        access = get_course_access(admin_id)
+        if session.course_id not in access.owned | access.approved_rep:
+            return jsonify({"error": "Access denied"}), 403
+
+    now = datetime.utcnow()
+    results = [None] * len(submissions)
+    pending = []
+
+    for i, item in enumerate(submissions):
+        if not isinstance(item, dict):
+            results[i] = {"status": "rejected", "error": "Invalid submission"}
+            continue
+        index_number = item.get("index_number")
+        email = item.get("email")
+        try:
+            latitude = float(item.get("latitude"))
+            longitude = float(item.get("longitude"))
+            timestamp = (
+                datetime.fromisoformat(item["timestamp"])
+                if item.get("timestamp")
+                else now
+            )
+            if timestamp.tzinfo is not None:
+                timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            results[i] = {
+                "status": "rejected",
+                "error": "Invalid latitude, longitude or timestamp",
+            }
+            continue
+
+        if not index_number or not email:
+            results[i] = {"status": "rejected", "error": "All fields are required"}
+        elif timestamp > now:
+            results[i] = {"status": "rejected", "error": "Timestamp is in the future"}
+        elif timestamp > session.expires_at:
+            results[i] = {"status": "rejected", "error": "Session code has expired"}
+        elif session.created_at is not None and timestamp < session.created_at:
+            results[i] = {
+                "status": "rejected",
+                "error": "Timestamp is before the session started",
+            }
+        else:
+            pending.append((i, index_number, email, latitude, longitude, timestamp))
+
+    students = {}
+    if pending:
+        index_numbers = {p[1] for p in pending}
+        students = {
+            s.index_number: s
+            for s in Student.query.filter(Student.index_number.in_(index_numbers))
+        }
+
+    inside, distances = check_geofence_many(
+        [p[3] for p in pending],
+        [p[4] for p in pending],
+        session.latitude,
+        session.longitude,
+        session.geo_radius,
+    )
+
+    rows = {}
+    for (i, index_number, email, latitude, longitude, timestamp), ok, distance in zip(
+        pending, inside, distances
+    ):
+        distance = round(float(distance), 2)
+        student = students.get(index_number)
+        if student is None or student.email != email:
+            results[i] = {"status": "rejected", "error": "Student not found"}
+        elif not ok:
+            results[i] = {
+                "status": "rejected",
+                "error": f"Outside allowed location (distance: {distance}m)",
+            }
+        elif student.id in rows:
+            results[i] = {
+                "status": "duplicate",
+                "error": "Attendance already marked for this session",
+            }
+        else:
+            rows[student.id] = (
+                i,
+                {
+                    "student_id": student.id,
+                    "session_id": session.id,
+                    "timestamp": timestamp,
+                    "student_latitude": latitude,
+                    "student_longitude": longitude,
+                    "status": "present",
+                },
+            )
+            results[i] = {"status": "marked", "distance": distance}
+
+    inserted = insert_attendance([row for _, row in rows.values()])
+    db.session.commit()
+
+    for student_id, (i, _) in rows.items():
+        if (student_id, session.id) not in inserted:
+            results[i] = {
+                "status": "duplicate",
+                "error": "Attendance already marked for this session",
+            }
+
+    for i, result in enumerate(results):
+        item = submissions[i] if isinstance(submissions[i], dict) else {}
+        result["index_number"] = item.get("index_number")
+
+    return (
+        jsonify(
+            {
+                "session_id": session.id,
+                "marked": len(inserted),
+                "duplicates": sum(r["status"] == "duplicate" for r in results),
+                "rejected": sum(r["status"] == "rejected" for r in results),
+                "results": results,
+            }
+        ),
+        200,
+    )
+
+
+# ------------------- VIEW ATTENDANCE -------------------
+@attendance_bp.route("/by-session/<int:session_id>", methods=["GET"])
+@jwt_required()
+@load_session_access(allow_reps=True)
+def view_attendance_by_session(session, course):
+    records = Attendance.query.filter_by(session_id=session.id).all()
     result = [
         {
             "student_id": r.student_id,
@@ -106,21 +278,25 @@ def view_attendance_by_session(session_id):
     return jsonify({"attendance": result}), 200
 
 
-@attendance_bp.route("/course/<int:course_id>", methods=["GET"])
-@jwt_required()
-def get_attendance_by_course(course_id):
-    admin_id = int(get_jwt_identity())
-    course = Course.query.get_or_404(course_id)
+# The listings below are keyset-paginated newest first on (timestamp, id):
+# ?limit= sets the page size and ?cursor= takes the previous next_cursor.
+def _attendance_key(record):
+    return record.timestamp, record.id
 
-    if not has_course_access(course, admin_id, allow_reps=True):
-        return jsonify({"error": "Access denied"}), 403
 
-    session_ids = [s.id for s in SessionCode.query.filter_by(course_id=course_id)]
-    records = (
-        Attendance.query.filter(Attendance.session_id.in_(session_ids))
-        .order_by(Attendance.timestamp.desc())
-        .all()
+@attendance_bp.route("/course/<int:course_id>", methods=["GET"])
+@jwt_required()
+@load_course_access(allow_reps=True)
+def get_attendance_by_course(course):
+    page, invalid = page_from_request()
+    if invalid:
+        return invalid
+
+    query = Attendance.query.join(SessionCode).filter(
+        SessionCode.course_id == course.id
     )
+    records = keyset(query, Attendance.timestamp, Attendance.id, page).all()
+    records, next_cursor = finish_page(records, page, _attendance_key)
 
     result = [
         {
@@ -131,20 +307,95 @@ def get_attendance_by_course(course_id):
         }
         for r in records
     ]
-    return jsonify({"attendance": result}), 200
+    return jsonify({"attendance": result, "next_cursor": next_cursor}), 200
+
+
+# ------------------- ATTENDANCE MATRIX -------------------
+# Register view of a course: one row per student who attended any of its
+# sessions, one column per session in creation order. format=compact sends
+# each row as base64-packed bits instead of a list of 0/1.
+MATRIX_FORMATS = ("json", "compact")
+
+
+@attendance_bp.route("/course/<int:course_id>/matrix", methods=["GET"])
+@jwt_required()
+@load_course_access(allow_reps=True)
+def get_attendance_matrix(course):
+    fmt = request.args.get("format", "json")
+    if fmt not in MATRIX_FORMATS:
+        return jsonify({"error": "format must be 'json' or 'compact'"}), 400
+
+    # Each fetch is keyed on the ids the previous one returned, so a session
+    # created or marked mid-request cannot add a cell without its column
+    sessions = db.session.execute(
+        select(SessionCode.id, SessionCode.code, SessionCode.created_at)
+        .where(SessionCode.course_id == course.id)
+        .order_by(SessionCode.created_at, SessionCode.id)
+    ).all()
+    # Plain tuples: NumPy probes Row objects for array protocols one by one
+    pairs = [
+        tuple(r)
+        for r in db.session.execute(
+            select(Attendance.student_id, Attendance.session_id).where(
+                Attendance.session_id.in_([s.id for s in sessions])
+            )
+        )
+    ]
+    students = db.session.execute(
+        select(Student.id, Student.index_number, Student.full_name)
+        .where(Student.id.in_({student_id for student_id, _ in pairs}))
+        .order_by(Student.index_number)
+    ).all()
+
+    matrix, student_rates, session_rates = build_matrix(
+        [s.id for s in students], [s.id for s in sessions], pairs
+    )
+    attended = matrix.sum(axis=1)
+    present = matrix.sum(axis=0)
+
+    result = {
+        "course_id": course.id,
+        "format": fmt,
+        "sessions": [
+            {
+                "id": s.id,
+                "code": s.code,
+                "created_at": s.created_at.isoformat() if s.created_at else None,
+                "present": int(present[i]),
+                "rate": round(float(session_rates[i]), 4),
+            }
+            for i, s in enumerate(sessions)
+        ],
+        "students": [
+            {
+                "id": s.id,
+                "index_number": s.index_number,
+                "full_name": s.full_name,
+                "attended": int(attended[i]),
+                "rate": round(float(student_rates[i]), 4),
+            }
+            for i, s in enumerate(students)
+        ],
+    }
+    if fmt == "compact":
+        result["rows"] = pack_rows(matrix)
+    else:
+        result["matrix"] = matrix.astype(int).tolist()
+    return jsonify(result), 200
 
 
 @attendance_bp.route("/<int:session_id>", methods=["GET"])
 @jwt_required()
-def get_attendance_for_session(session_id):
-    admin_id = int(get_jwt_identity())
-    session = SessionCode.query.get_or_404(session_id)
-    course = Course.query.get(session.course_id)
+@load_session_access(allow_reps=True)
+def get_attendance_for_session(session, course):
+    page, invalid = page_from_request()
+    if invalid:
+        return invalid
 
-    if not has_course_access(course, admin_id, allow_reps=True):
-        return jsonify({"error": "Access denied"}), 403
+    query = Attendance.query.filter_by(session_id=session.id)
+    records = keyset(query, Attendance.timestamp, Attendance.id, page).all()
+    records, next_cursor = finish_page(records, page, _attendance_key)
 
-    records = Attendance.query.filter_by(session_id=session_id).all()
     result = [
         {
             "id": r.id,
@@ -154,13 +405,16 @@ def get_attendance_for_session(session_id):
         }
         for r in records
     ]
-    return jsonify({"attendance": result}), 200
+    return jsonify({"attendance": result, "next_cursor": next_cursor}), 200
 
 
 @attendance_bp.route("/student/<string:index_number>", methods=["GET"])
 @jwt_required()
 def get_attendance_for_student(index_number):
     admin_id = int(get_jwt_identity())
+    page, invalid = page_from_request()
+    if invalid:
+        return invalid
 
     accessible_ids = (
         db.session.query(Course.id)
@@ -175,13 +429,11 @@ def get_attendance_for_student(index_number):
         .filter(SessionCode.course_id.in_(accessible_ids))
         .subquery()
     )
-    records = (
-        Attendance.query.join(Student)
-        .filter(
-            Attendance.session_id.in_(session_ids), Student.index_number == index_number
-        )
-        .all()
+    query = Attendance.query.join(Student).filter(
+        Attendance.session_id.in_(session_ids), Student.index_number == index_number
     )
+    records = keyset(query, Attendance.timestamp, Attendance.id, page).all()
+    records, next_cursor = finish_page(records, page, _attendance_key)
 
     result = [
         {
@@ -191,20 +443,14 @@ def get_attendance_for_student(index_number):
         }
         for r in records
     ]
-    return jsonify({"attendance": result}), 200
+    return jsonify({"attendance": result, "next_cursor": next_cursor}), 200
 
 
 # ------------------- DELETE ATTENDANCE -------------------
 @attendance_bp.route("/delete/<int:id>", methods=["DELETE"])
 @jwt_required()
-def delete_attendance(id):
-    admin_id = int(get_jwt_identity())
-    record = Attendance.query.get_or_404(id)
-    course = Course.query.get(SessionCode.query.get(record.session_id).course_id)
-
-    if not has_course_access(course, admin_id, allow_reps=False):
-        return jsonify({"error": "Access denied"}), 403
-
+@load_attendance_access(allow_reps=False)
+def delete_attendance(record, session, course):
     db.session.delete(record)
     db.session.commit()
     return jsonify({"message": "Attendance deleted"}), 200
@@ -212,15 +458,10 @@ def delete_attendance(id):
 
 @attendance_bp.route("/delete/by-session/<int:session_id>", methods=["DELETE"])
 @jwt_required()
-def delete_attendance_by_session(session_id):
-    admin_id = int(get_jwt_identity())
-    session = SessionCode.query.get_or_404(session_id)
-    course = Course.query.get(session.course_id)
-
-    if not has_course_access(course, admin_id):
-        return jsonify({"error": "Access denied"}), 403
-
-    Attendance.query.filter_by(session_id=session_id).delete()
+@load_session_access(allow_reps=False)
+def delete_attendance_by_session(session, course):
+    retract_attendance(Attendance.session_id == session.id)
+    Attendance.query.filter_by(session_id=session.id).delete()
     db.session.commit()
     return jsonify({"message": "Deleted successfully"}), 200
 
@@ -235,11 +476,16 @@ def filter_attendance():
     course_id = request.args.get("course_id")
     session_id = request.args.get("session_id")
     index_number = request.args.get("index_number")
+    page, invalid = page_from_request()
+    if invalid:
+        return invalid
 
+    # The index number comes back with each row instead of a lazy load per row
     query = (
-        Attendance.query.join(SessionCode)
-        .join(Course)
-        .join(Student)
+        db.session.query(Attendance, Student.index_number)
+        .join(SessionCode, SessionCode.id == Attendance.session_id)
+        .join(Course, Course.id == SessionCode.course_id)
+        .join(Student, Student.id == Attendance.student_id)
         .filter(
             or_(
                 Course.lecturer_id == admin_id,
@@ -263,36 +509,72 @@ def filter_attendance():
     if to_date:
         query = query.filter(Attendance.timestamp <= datetime.fromisoformat(to_date))
 
-    results = query.all()
+    results = keyset(query, Attendance.timestamp, Attendance.id, page).all()
+    results, next_cursor = finish_page(
+        results, page, lambda row: _attendance_key(row.Attendance)
+    )
     data = [
         {
-            "student": r.student.index_number,
+            "student": index,
             "timestamp": r.timestamp.isoformat(),
             "status": r.status,
             "session_id": r.session_id,
         }
-        for r in results
+        for r, index in results
     ]
 
-    return jsonify({"filtered": data}), 200
+    return jsonify({"filtered": data, "next_cursor": next_cursor}), 200
 
 
 # ------------------- EXPORT -------------------
-@attendance_bp.route("/export", methods=["GET"])
-@jwt_required()
-def export_attendance_csv():
-    admin_id = int(get_jwt_identity())
-    course_id = request.args.get("course_id")
+# Rows are fetched as plain columns through a streaming cursor, EXPORT_BATCH
+# at a time, and written with the csv module; ?compress=gzip compresses the
+# stream on the fly. Memory stays flat regardless of the number of rows. The
+# same chunks feed the "attendance-export" job, which writes them to a file.
+EXPORT_BATCH = 2000
+
 
+class _LineBuffer:
+    """Write target for csv.writer that hands back what was written."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(data)
+
+    def drain(self):
+        data = "".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def _gzip_stream(chunks):
+    # wbits=31 selects the gzip container
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _export_query(admin_id, course_id=None):
     query = (
-        Attendance.query.join(SessionCode)
-        .join(Course)
-        .join(Student)
-        .filter(
+        select(
+            Student.index_number,
+            Attendance.session_id,
+            Attendance.timestamp,
+            Attendance.status,
+        )
+        .join(Student, Student.id == Attendance.student_id)
+        .join(SessionCode, SessionCode.id == Attendance.session_id)
+        .join(Course, Course.id == SessionCode.course_id)
+        .where(
             or_(
                 Course.lecturer_id == admin_id,
                 Course.id.in_(
-                    db.session.query(CourseRepAccess.course_id).filter(
+                    select(CourseRepAccess.course_id).where(
                         CourseRepAccess.rep_id == admin_id
                     )
                 ),
@@ -301,17 +583,65 @@ def export_attendance_csv():
     )
 
     if course_id:
-        query = query.filter(SessionCode.course_id == course_id)
+        query = query.where(SessionCode.course_id == course_id)
+
+    return query.execution_options(stream_results=True, yield_per=EXPORT_BATCH)
+
+
+def _csv_chunks(query, progress=None):
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(["Index Number", "Session ID", "Timestamp", "Status"])
+    yield buffer.drain()
+    written = 0
+    # Core execution: plain rows, no ORM loading layer per row
+    for rows in db.session.connection().execute(query).partitions():
+        writer.writerows(rows)
+        yield buffer.drain()
+        if progress:
+            written += len(rows)
+            progress(written)
 
-    records = query.yield_per(100)
 
-    def generate():
-        yield "Index Number,Session ID,Timestamp,Status\n"
-        for r in records:
-            yield f"{r.student.index_number},{r.session_id},{r.timestamp},{r.status}\n"
+@job_handler("attendance-export")
+def _export_job(ctx, course_id=None, compress=None):
+    chunks = _csv_chunks(_export_query(ctx.admin_id, course_id), ctx.progress)
+    if compress == "gzip":
+        with ctx.open_result("attendance.csv.gz", "application/gzip") as out:
+            out.writelines(_gzip_stream(chunks))
+    else:
+        with ctx.open_result("attendance.csv", "text/csv") as out:
+            out.writelines(chunk.encode("utf-8") for chunk in chunks)
+
+
+@attendance_bp.route("/export", methods=["GET"])
+@jwt_required()
+def export_attendance_csv():
+    """
+    Stream attendance as CSV, or with ?async=1 queue it as a job whose
+    result is downloaded from /jobs/<id>/download.
+    """
+    admin_id = int(get_jwt_identity())
+    course_id = request.args.get("course_id")
+    compress = request.args.get("compress")
+    if compress not in (None, "gzip"):
+        return jsonify({"error": "compress must be 'gzip'"}), 400
+
+    if wants_async():
+        params = {"course_id": course_id, "compress": compress}
+        return submit_job("attendance-export", admin_id, params)
+
+    chunks = _csv_chunks(_export_query(admin_id, course_id))
+
+    if compress == "gzip":
+        return Response(
+            stream_with_context(_gzip_stream(chunks)),
+            mimetype="application/gzip",
+            headers={"Content-Disposition": "attachment;filename=attendance.csv.gz"},
+        )
 
     return Response(
-        generate(),
+        stream_with_context(chunks),
         mimetype="text/csv",
         headers={"Content-Disposition": "attachment;filename=attendance.csv"},
     )
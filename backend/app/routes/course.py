@@ -1,16 +1,23 @@
 from flask import Blueprint, request, jsonify, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import or_, func
+from sqlalchemy import or_, func, insert, select
 from datetime import datetime
-from io import BytesIO, StringIO
-import pandas as pd
+from io import BytesIO, StringIO, TextIOWrapper
+from itertools import chain
+from shutil import copyfileobj
+from tempfile import SpooledTemporaryFile
 import csv
 from sqlalchemy.exc import IntegrityError
 
-from app.models import db, Course, CourseRepAccess, Attendance, SessionCode
-from app.utils.access_control import has_course_access
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
+from app.models import db, Course, CourseRepAccess
+from app.utils.access_control import (
+    invalidate_course_access,
+    load_attendance_access,
+    load_course_access,
+)
+from app.utils.department_stats import invalidate_department_stats
+from app.utils.jobs import JobError, job_handler, submit_job, wants_async
+from app.utils.session_registry import unregister_sessions
 
 course_bp = Blueprint('course_bp', __name__)
 
@@ -130,15 +137,10 @@ def get_courses():
     }), 200
 
 
-@course_bp.route('/<int:id>', methods=['GET'])
+@course_bp.route('/<int:course_id>', methods=['GET'])
 @jwt_required()
-def get_course(id):
-    admin_id = int(get_jwt_identity())
-    course = Course.query.get_or_404(id)
-
-    if not has_course_access(course, admin_id, allow_reps=True):
-        return jsonify({'error': 'Access denied or course not found'}), 403
-
+@load_course_access(allow_reps=True, message='Access denied or course not found')
+def get_course(course):
     return jsonify({
         'id': course.id,
         'course_code': course.course_code,
@@ -151,13 +153,8 @@ def get_course(id):
 # ------------------- UPDATE -------------------
 @course_bp.route('/<int:course_id>', methods=['PUT'])
 @jwt_required()
-def update_course(course_id):
-    admin_id = int(get_jwt_identity())
-    course = Course.query.get_or_404(course_id)
-
-    if not has_course_access(course, admin_id, allow_reps=False):
-        return jsonify({'error': 'Unauthorized to update this course'}), 403
-
+@load_course_access(allow_reps=False, message='Unauthorized to update this course')
+def update_course(course):
     data = request.get_json()
     new_code = data.get('course_code')
 
@@ -175,37 +172,114 @@ def update_course(course_id):
 
 
 # ------------------- DELETE -------------------
-@course_bp.route('/<int:id>', methods=['DELETE'])
+@course_bp.route('/<int:course_id>', methods=['DELETE'])
 @jwt_required()
-def delete_course(id):
-    admin_id = int(get_jwt_identity())
-    course = Course.query.get_or_404(id)
-
-    if not has_course_access(course, admin_id, allow_reps=False):
-        return jsonify({'error': 'Access denied or course not found'}), 403
-
+@load_course_access(allow_reps=False, message='Access denied or course not found')
+def delete_course(course):
     db.session.delete(course)
     db.session.commit()
+    unregister_sessions(course_id=course.id)
     return jsonify({'message': 'Course deleted successfully'}), 200
 
 
 @course_bp.route('/attendance/delete/<int:id>', methods=['DELETE'])
 @jwt_required()
-def delete_attendance(id):
-    admin_id = int(get_jwt_identity())
-    record = Attendance.query.get_or_404(id)
-    session = SessionCode.query.get_or_404(record.session_id)
-    course = Course.query.get_or_404(session.course_id)
-
-    if not has_course_access(course, admin_id, allow_reps=False):
-        return jsonify({'error': 'Access denied'}), 403
-
+@load_attendance_access(allow_reps=False)
+def delete_attendance(record, session, course):
     db.session.delete(record)
     db.session.commit()
     return jsonify({'message': 'Attendance record deleted'}), 200
 
 
 # ------------------- IMPORT -------------------
+# The upload is parsed as a stream and handled IMPORT_CHUNK rows at a time:
+# one IN lookup finds existing codes, the new rows go in with a single
+# executemany, and each chunk is committed on its own.
+IMPORT_CHUNK = 1000
+
+
+def _import_chunk(chunk, admin_id, seen, skipped):
+    codes = [row['course_code'] for _, row in chunk]
+    existing = set(
+        db.session.execute(
+            select(Course.course_code).where(Course.course_code.in_(codes))
+        ).scalars()
+    )
+
+    new_courses = []
+    for line, row in chunk:
+        # Codes from earlier chunks are committed by now, so `seen` goes first
+        if row['course_code'] in seen:
+            skipped.append({'line': line, 'row': row, 'reason': 'Duplicate course_code in file'})
+        elif row['course_code'] in existing:
+            skipped.append({'line': line, 'row': row, 'reason': 'Duplicate course_code'})
+        else:
+            seen.add(row['course_code'])
+            new_courses.append({**row, 'lecturer_id': admin_id})
+
+    if new_courses:
+        db.session.execute(insert(Course), new_courses)
+    db.session.commit()
+    return len(new_courses)
+
+
+def _import_courses(stream, admin_id, result, progress=None):
+    """
+    Import a course CSV, adding to result['imported'] and result['skipped']
+    as each chunk commits so a failure part-way still reports what landed.
+    """
+    reader = csv.DictReader(TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    seen = set()
+    chunk = []
+    read = 0
+
+    try:
+        # Line 1 is the header
+        for line, row in enumerate(reader, start=2):
+            read += 1
+            code = (row.get('course_code') or '').strip()
+            name = (row.get('course_name') or '').strip()
+            if not code or not name:
+                result['skipped'].append({'line': line, 'row': row, 'reason': 'Missing course_code or course_name'})
+                continue
+
+            chunk.append((line, {
+                'course_code': code,
+                'course_name': name,
+                'department': (row.get('department') or '').strip(),
+                'semester': (row.get('semester') or '').strip(),
+            }))
+            if len(chunk) >= IMPORT_CHUNK:
+                result['imported'] += _import_chunk(chunk, admin_id, seen, result['skipped'])
+                chunk = []
+                if progress:
+                    progress(read)
+
+        if chunk:
+            result['imported'] += _import_chunk(chunk, admin_id, seen, result['skipped'])
+    finally:
+        # Core inserts bypass the ORM events that normally drop these caches
+        if result['imported']:
+            invalidate_course_access()
+            invalidate_department_stats()
+        if progress:
+            progress(read)
+
+    result['skipped'].sort(key=lambda s: s['line'])
+    return result
+
+
+@job_handler('course-import')
+def _import_job(ctx):
+    result = {'imported': 0, 'skipped': []}
+    try:
+        with open(ctx.input_path, 'rb') as stream:
+            _import_courses(stream, ctx.admin_id, result, ctx.progress)
+    except UnicodeDecodeError:
+        raise JobError(f"File must be UTF-8 encoded ({result['imported']} courses imported)")
+    return {'message': f"{result['imported']} courses imported", **result}
+
+
 @course_bp.route('/import', methods=['POST'])
 @jwt_required()
 def import_courses():
@@ -218,98 +292,172 @@ def import_courses():
     if not file.filename.endswith('.csv'):
         return jsonify({'error': 'Only CSV files are allowed'}), 400
 
-    stream = StringIO(file.stream.read().decode("UTF8"))
-    reader = csv.DictReader(stream)
-
-    imported = 0
-    skipped = []
+    if wants_async():
+        return submit_job('course-import', admin_id, upload=file)
 
+    result = {'imported': 0, 'skipped': []}
     try:
-        for row in reader:
-            if not row.get('course_code') or not row.get('course_name'):
-                skipped.append({'row': row, 'reason': 'Missing course_code or course_name'})
-                continue
-
-            if Course.query.filter_by(course_code=row['course_code'].strip()).first():
-                skipped.append({'row': row, 'reason': 'Duplicate course_code'})
-                continue
-
-            db.session.add(Course(
-                course_code=row['course_code'].strip(),
-                course_name=row['course_name'].strip(),
-                department=row.get('department', '').strip(),
-                semester=row.get('semester', '').strip(),
-                lecturer_id=admin_id
-            ))
-            imported += 1
-
-        db.session.commit()
+        _import_courses(file.stream, admin_id, result)
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({'error': 'File must be UTF-8 encoded', 'imported': result['imported']}), 400
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': 'Import failed', 'details': str(e)}), 500
+        return jsonify({'error': 'Import failed', 'details': str(e), 'imported': result['imported']}), 500
 
-    return jsonify({'message': f'{imported} courses imported', 'skipped': skipped}), 200
+    imported = result['imported']
+    return jsonify({'message': f'{imported} courses imported', 'imported': imported, 'skipped': result['skipped']}), 200
 
 
 # ------------------- EXPORT -------------------
-@course_bp.route('/export', methods=['GET'])
-@jwt_required()
-def export_courses():
-    admin_id = int(get_jwt_identity())
-    format = request.args.get('format', 'excel').lower()
+# Rows stream from the database into a SpooledTemporaryFile and xlsxwriter runs
+# in constant_memory mode, so an Excel export never holds the course list.
+# reportlab keeps every finished page until save(), so PDF memory grows with
+# the row count; PDFs are refused beyond EXPORT_PDF_MAX_ROWS courses instead.
+# reportlab/xlsxwriter are imported only when used.
+EXPORT_HEADERS = ['Course Code', 'Course Name', 'Department', 'Semester']
+EXPORT_SPOOL_BYTES = 8 * 1024 * 1024
+EXPORT_BATCH = 1000
+EXPORT_PDF_MAX_ROWS = 5000
 
-    owned = Course.query.filter_by(lecturer_id=admin_id)
-    rep_ids = [c.course_id for c in CourseRepAccess.query.filter_by(rep_id=admin_id, approved_by_lecturer=True).all()]
-    as_rep = Course.query.filter(Course.id.in_(rep_ids))
 
-    courses = owned.union(as_rep).distinct().all()
-    if not courses:
-        return jsonify({'error': 'No courses to export'}), 404
+class ExportTooLarge(ValueError):
+    pass
 
-    data = [{
-        'Course Code': c.course_code,
-        'Course Name': c.course_name,
-        'Department': c.department or '',
-        'Semester': c.semester or ''
-    } for c in courses]
 
-    df = pd.DataFrame(data)
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+def _export_rows(admin_id):
+    approved_rep_courses = select(CourseRepAccess.course_id).where(
+        CourseRepAccess.rep_id == admin_id,
+        CourseRepAccess.approved_by_lecturer.is_(True),
+    )
+    query = (
+        select(
+            Course.course_code, Course.course_name, Course.department, Course.semester
+        )
+        .where(
+            or_(Course.lecturer_id == admin_id, Course.id.in_(approved_rep_courses))
+        )
+        .order_by(Course.course_code)
+        .execution_options(stream_results=True, yield_per=EXPORT_BATCH)
+    )
+    for rows in db.session.connection().execute(query).partitions():
+        for code, name, department, semester in rows:
+            yield code, name, department or '', semester or ''
+
+
+def _write_xlsx(rows, out):
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(out, {'constant_memory': True})
+    sheet = workbook.add_worksheet()
+    sheet.write_row(0, 0, EXPORT_HEADERS)
+    for i, row in enumerate(rows, start=1):
+        sheet.write_row(i, 0, row)
+    workbook.close()
 
-    if format == 'pdf':
-        buffer = BytesIO()
-        pdf = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
 
-        pdf.setFont("Helvetica-Bold", 14)
-        pdf.drawString(50, height - 50, f"GeoPresence - Courses ({timestamp})")
-        pdf.setFont("Helvetica", 10)
+def _write_pdf(rows, out, timestamp):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
 
-        x, y = 50, height - 80
-        headers = ['Course Code', 'Course Name', 'Department', 'Semester']
-        row_height = 18
+    # reportlab keeps finished pages until save(); compressing them keeps
+    # that footprint (and the download) several times smaller
+    pdf = canvas.Canvas(out, pagesize=A4, pageCompression=1)
+    width, height = A4
 
-        for i, h in enumerate(headers):
-            pdf.drawString(x + i * 120, y, h)
+    pdf.setFont("Helvetica-Bold", 14)
+    pdf.drawString(50, height - 50, f"GeoPresence - Courses ({timestamp})")
+    pdf.setFont("Helvetica", 10)
 
+    x, y = 50, height - 80
+    row_height = 18
+
+    for i, h in enumerate(EXPORT_HEADERS):
+        pdf.drawString(x + i * 120, y, h)
+
+    y -= row_height
+    for count, row in enumerate(rows, start=1):
+        if count > EXPORT_PDF_MAX_ROWS:
+            raise ExportTooLarge(
+                f'PDF export is limited to {EXPORT_PDF_MAX_ROWS} courses, '
+                'use format=excel'
+            )
+        for i, value in enumerate(row):
+            pdf.drawString(x + i * 120, y, str(value))
         y -= row_height
-        for row in data:
-            for i, key in enumerate(headers):
-                pdf.drawString(x + i * 120, y, str(row[key]))
-            y -= row_height
-            if y < 50:
-                pdf.showPage()
-                pdf.setFont("Helvetica", 10)
-                y = height - 50
-
-        pdf.save()
-        buffer.seek(0)
-        return send_file(buffer, as_attachment=True, download_name=f"courses_{timestamp}.pdf", mimetype="application/pdf")
-
-    buffer = BytesIO()
-    df.to_excel(buffer, index=False, engine='xlsxwriter')
-    buffer.seek(0)
-    return send_file(buffer, as_attachment=True, download_name=f"courses_{timestamp}.xlsx", mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        if y < 50:
+            pdf.showPage()
+            pdf.setFont("Helvetica", 10)
+            y = height - 50
+
+    pdf.save()
+
+
+EXPORT_FORMATS = {
+    'pdf': ('pdf', 'application/pdf'),
+    'excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+def _write_export(rows, format, out):
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    extension, mimetype = EXPORT_FORMATS[format]
+    if format == 'pdf':
+        _write_pdf(rows, out, timestamp)
+    else:
+        _write_xlsx(rows, out)
+    return f"courses_{timestamp}.{extension}", mimetype
+
+
+def _counted(rows, progress):
+    for done, row in enumerate(rows, start=1):
+        yield row
+        if done % EXPORT_BATCH == 0:
+            progress(done)
+
+
+@job_handler('course-export')
+def _export_job(ctx, format='excel'):
+    rows = _export_rows(ctx.admin_id)
+    first = next(rows, None)
+    if first is None:
+        raise JobError('No courses to export')
+    rows = _counted(chain([first], rows), ctx.progress)
+
+    with SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES) as out:
+        try:
+            download_name, mimetype = _write_export(rows, format, out)
+        except ExportTooLarge as e:
+            raise JobError(str(e))
+        out.seek(0)
+        with ctx.open_result(download_name, mimetype) as result:
+            copyfileobj(out, result)
+
+
+@course_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_courses():
+    admin_id = int(get_jwt_identity())
+    format = request.args.get('format', 'excel').lower()
+    if format not in EXPORT_FORMATS:
+        format = 'excel'
+
+    if wants_async():
+        return submit_job('course-export', admin_id, {'format': format})
+
+    rows = _export_rows(admin_id)
+    first = next(rows, None)
+    if first is None:
+        return jsonify({'error': 'No courses to export'}), 404
+
+    out = SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+    try:
+        download_name, mimetype = _write_export(chain([first], rows), format, out)
+    except ExportTooLarge as e:
+        out.close()
+        return jsonify({'error': str(e)}), 400
+    out.seek(0)
+    return send_file(out, as_attachment=True, download_name=download_name, mimetype=mimetype)
 
 
 # ------------------- SAMPLE CSV -------------------
@@ -1,55 +1,164 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime, timedelta
-from sqlalchemy import func
-
-from app.models import db, Course, SessionCode, Attendance, Student, CourseRepAccess
-from app.utils.access_control import has_course_access
+import calendar
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from sqlalchemy import Date, Integer, func, literal, select, union_all
+
+from app.models import (
+    db,
+    SessionCode,
+    Attendance,
+    AttendanceBucketCount,
+    AttendanceDailyCount,
+    StudentCourseTotal,
+)
+from app.utils.access_control import get_course_access, load_course_access
+from app.utils.attendance_writer import BUCKET_SECONDS, bucket_start
+from app.utils.geo import summarise_positions
 
 dashboard_bp = Blueprint("dashboard_bp", __name__, url_prefix="/dashboard")
 
 
+# Counts come from the rollup tables kept up to date by attendance_writer
+def _accessible_course_ids(admin_id):
+    access = get_course_access(admin_id)
+    return access.owned | access.rep
+
+
+def _summary_counts(course_ids):
+    """
+    Sessions, attendance records and distinct students over a set of courses,
+    as one statement of scalar subqueries over session_codes and the rollups.
+    """
+    if not course_ids:
+        return 0, 0, 0
+    course_ids = sorted(course_ids)
+    return db.session.execute(
+        select(
+            select(func.count(SessionCode.id))
+            .where(SessionCode.course_id.in_(course_ids))
+            .scalar_subquery(),
+            select(func.coalesce(func.sum(AttendanceDailyCount.attendance_count), 0))
+            .where(AttendanceDailyCount.course_id.in_(course_ids))
+            .scalar_subquery(),
+            select(func.count(func.distinct(StudentCourseTotal.student_id)))
+            .where(StudentCourseTotal.course_id.in_(course_ids))
+            .scalar_subquery(),
+        )
+    ).one()
+
+
+def _course_aggregates(course, trend_days=None, top_limit=None):
+    """
+    Summary, daily trend and top students of one course in a single query:
+    the rollup rows are read once through CTEs and the three result sets come
+    back as tagged rows of one UNION ALL.
+    """
+    daily = (
+        select(AttendanceDailyCount.day, AttendanceDailyCount.attendance_count)
+        .where(AttendanceDailyCount.course_id == course.id)
+        .cte("daily")
+    )
+    totals = (
+        select(
+            StudentCourseTotal.student_id,
+            StudentCourseTotal.attendance_count,
+            func.row_number()
+            .over(
+                order_by=(
+                    StudentCourseTotal.attendance_count.desc(),
+                    StudentCourseTotal.student_id,
+                )
+            )
+            .label("rank"),
+        )
+        .where(StudentCourseTotal.course_id == course.id)
+        .cte("totals")
+    )
+
+    no_day = literal(None, Date)
+    no_student = literal(None, Integer)
+    no_count = literal(None, Integer)
+    parts = [
+        select(
+            literal("summary").label("kind"),
+            no_day.label("day"),
+            no_student.label("student_id"),
+            select(func.count(SessionCode.id))
+            .where(SessionCode.course_id == course.id)
+            .scalar_subquery()
+            .label("n1"),
+            select(func.coalesce(func.sum(daily.c.attendance_count), 0))
+            .scalar_subquery()
+            .label("n2"),
+            select(func.count()).select_from(totals).scalar_subquery().label("n3"),
+        )
+    ]
+    if trend_days is not None:
+        start_day = (datetime.utcnow() - timedelta(days=trend_days)).date()
+        parts.append(
+            select(
+                literal("trend"),
+                daily.c.day,
+                no_student,
+                daily.c.attendance_count,
+                no_count,
+                no_count,
+            ).where(daily.c.day >= start_day)
+        )
+    if top_limit is not None:
+        parts.append(
+            select(
+                literal("top"),
+                no_day,
+                totals.c.student_id,
+                totals.c.attendance_count,
+                totals.c.rank,
+                no_count,
+            ).where(totals.c.rank <= top_limit)
+        )
+
+    summary = {"course_id": course.id, "course_name": course.course_name}
+    trend, top = [], []
+    for row in db.session.execute(union_all(*parts)):
+        if row.kind == "summary":
+            summary["sessions_count"] = row.n1
+            summary["total_attendance"] = row.n2
+            summary["students_marked"] = row.n3
+        elif row.kind == "trend":
+            trend.append((row.day, row.n1))
+        else:
+            top.append((row.n2, row.student_id, row.n1))
+
+    return {
+        "summary": summary,
+        "attendance_trend": [
+            {"date": str(day), "attendance_count": count}
+            for day, count in sorted(trend)
+        ],
+        "top_students": [
+            {"student_id": student_id, "attendance_count": count}
+            for _, student_id, count in sorted(top)
+        ],
+    }
+
+
 # ------------------- GLOBAL DASHBOARD SUMMARY -------------------
 @dashboard_bp.route("/summary", methods=["GET"])
 @jwt_required()
 def dashboard_summary():
     admin_id = int(get_jwt_identity())
-
-    accessible_courses = (
-        db.session.query(Course.id)
-        .outerjoin(CourseRepAccess, Course.id == CourseRepAccess.course_id)
-        .filter((Course.lecturer_id == admin_id) | (CourseRepAccess.rep_id == admin_id))
-        .distinct()
-    )
-
-    course_count = accessible_courses.count()
-    sessions_count = (
-        db.session.query(SessionCode)
-        .filter(SessionCode.course_id.in_(accessible_courses))
-        .count()
-    )
-    attendance_count = (
-        db.session.query(Attendance)
-        .join(SessionCode)
-        .filter(SessionCode.course_id.in_(accessible_courses))
-        .count()
-    )
-    students_count = (
-        db.session.query(Student)
-        .join(Attendance)
-        .join(SessionCode)
-        .filter(SessionCode.course_id.in_(accessible_courses))
-        .distinct()
-        .count()
-    )
+    course_ids = _accessible_course_ids(admin_id)
+    sessions, attendance_records, students = _summary_counts(course_ids)
 
     return (
         jsonify(
             {
-                "courses": course_count,
-                "sessions": sessions_count,
-                "attendance_records": attendance_count,
-                "students_marked": students_count,
+                "courses": len(course_ids),
+                "sessions": sessions,
+                "attendance_records": attendance_records,
+                "students_marked": students,
             }
         ),
         200,
@@ -57,244 +166,308 @@ def dashboard_summary():
 
 
 # ------------------- ATTENDANCE TREND -------------------
-@dashboard_bp.route("/attendance-trend", methods=["GET"])
-@jwt_required()
-def attendance_trend():
-    admin_id = int(get_jwt_identity())
-    days = int(request.args.get("days", 7))
-    start_date = datetime.utcnow() - timedelta(days=days)
-
-    accessible_courses = (
-        db.session.query(Course.id)
-        .outerjoin(CourseRepAccess, Course.id == CourseRepAccess.course_id)
-        .filter((Course.lecturer_id == admin_id) | (CourseRepAccess.rep_id == admin_id))
-        .distinct()
-    )
-
-    trend_data = (
+# Served from the 15-minute attendance_bucket_counts rollup. Buckets are
+# shifted by tz_offset (minutes east of UTC, a multiple of 15) before being
+# grouped, so local hours, days, weeks and months come out exact. `from` and
+# `to` (exclusive) are ISO 8601; naive values are local to tz_offset. Without
+# `from`, the range is the last `days` days (default 7). Only whole buckets
+# can be counted, so `from` is rounded down and `to` up to a 15-minute
+# boundary; the response reports those rounded bounds, in UTC.
+TREND_GRANULARITIES = {"hour": 3600, "day": 86400, "week": 7 * 86400, "month": None}
+MAX_TREND_BUCKETS = 5000
+MAX_TZ_OFFSET_MINUTES = 14 * 60
+# 1970-01-05, the first Monday of the Unix epoch; weeks start on Mondays
+_EPOCH_MONDAY = 4 * 86400
+
+
+class TrendParamError(ValueError):
+    pass
+
+
+def _trend_instant(value, offset):
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise TrendParamError(f"Invalid date: {value}")
+    if moment.tzinfo is not None:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment - offset
+
+
+def _bucket_bounds(start, end):
+    """Widen [start, end) to whole rollup buckets."""
+    lo = bucket_start(start)
+    hi = bucket_start(end)
+    if hi < calendar.timegm(end.utctimetuple()) or end.microsecond:
+        hi += BUCKET_SECONDS
+    epoch = datetime(1970, 1, 1)
+    return epoch + timedelta(seconds=lo), epoch + timedelta(seconds=hi)
+
+
+def _trend_params():
+    granularity = request.args.get("granularity", "day")
+    if granularity not in TREND_GRANULARITIES:
+        raise TrendParamError("granularity must be one of hour, day, week, month")
+    try:
+        tz_offset = int(request.args.get("tz_offset", 0))
+        days = int(request.args.get("days", 7))
+    except ValueError:
+        raise TrendParamError("tz_offset and days must be integers")
+    if abs(tz_offset) > MAX_TZ_OFFSET_MINUTES or tz_offset % 15:
+        raise TrendParamError("tz_offset must be a multiple of 15 minutes within ±14h")
+    offset = timedelta(minutes=tz_offset)
+
+    end = request.args.get("to")
+    end = _trend_instant(end, offset) if end else datetime.utcnow()
+    start = request.args.get("from")
+    start = _trend_instant(start, offset) if start else end - timedelta(days=days)
+    if start >= end:
+        raise TrendParamError("from must be before to")
+    start, end = _bucket_bounds(start, end)
+
+    width = TREND_GRANULARITIES[granularity] or 28 * 86400
+    if (end - start).total_seconds() / width > MAX_TREND_BUCKETS:
+        raise TrendParamError("Range too large for this granularity")
+    return granularity, tz_offset, start, end
+
+
+def _trend(course_ids, granularity, tz_offset, start, end):
+    offset = tz_offset * 60
+    # Bounds are already on bucket boundaries (see _bucket_bounds)
+    lo = calendar.timegm(start.utctimetuple())
+    hi = calendar.timegm(end.utctimetuple())
+
+    local = AttendanceBucketCount.bucket_start + offset
+    if granularity == "week":
+        group = (local - _EPOCH_MONDAY) // 604800 * 604800 + _EPOCH_MONDAY
+    else:
+        # Months are folded from local days below
+        width = TREND_GRANULARITIES[granularity] or 86400
+        group = local // width * width
+    group = group.label("local_start")
+
+    rows = (
         db.session.query(
-            func.date(Attendance.timestamp).label("date"),
-            func.count(Attendance.id).label("attendance_count"),
+            group, func.sum(AttendanceBucketCount.attendance_count).label("count")
         )
-        .join(SessionCode)
-        .filter(SessionCode.course_id.in_(accessible_courses))
-        .filter(Attendance.timestamp >= start_date)
-        .group_by(func.date(Attendance.timestamp))
-        .order_by(func.date(Attendance.timestamp))
+        .filter(AttendanceBucketCount.course_id.in_(course_ids))
+        .filter(AttendanceBucketCount.bucket_start >= lo)
+        .filter(AttendanceBucketCount.bucket_start < hi)
+        .group_by(group)
+        .order_by(group)
         .all()
     )
 
-    result = [
-        {"date": str(d.date), "attendance_count": d.attendance_count}
-        for d in trend_data
+    formats = {"hour": "%Y-%m-%dT%H:00", "month": "%Y-%m"}
+    counts = {}
+    for local_start, count in rows:
+        moment = datetime(1970, 1, 1) + timedelta(seconds=local_start)
+        label = moment.strftime(formats.get(granularity, "%Y-%m-%d"))
+        counts[label] = counts.get(label, 0) + count
+    return [
+        {"date": label, "attendance_count": count} for label, count in counts.items()
     ]
-    return jsonify({"trend": result}), 200
 
 
-# ------------------- COURSE-SPECIFIC SUMMARY -------------------
-@dashboard_bp.route("/course-summary/<int:course_id>", methods=["GET"])
+@dashboard_bp.route("/attendance-trend", methods=["GET"])
 @jwt_required()
-def course_summary(course_id):
+def attendance_trend():
     admin_id = int(get_jwt_identity())
-    course = Course.query.get_or_404(course_id)
-
-    if not has_course_access(course, admin_id, allow_reps=True):
-        return jsonify({"error": "Access denied"}), 403
-
-    sessions = SessionCode.query.filter_by(course_id=course_id).all()
-    session_count = len(sessions)
-
-    total_attendance = (
-        Attendance.query.join(SessionCode)
-        .filter(SessionCode.course_id == course_id)
-        .count()
-    )
-    students_count = (
-        Attendance.query.join(SessionCode)
-        .filter(SessionCode.course_id == course_id)
-        .distinct(Attendance.student_id)
-        .count()
-    )
-
+    try:
+        granularity, tz_offset, start, end = _trend_params()
+    except TrendParamError as e:
+        return jsonify({"error": str(e)}), 400
+
+    course_ids = _accessible_course_ids(admin_id)
+    course_id = request.args.get("course_id", type=int)
+    if course_id is not None:
+        if course_id not in course_ids:
+            return jsonify({"error": "Access denied"}), 403
+        course_ids = {course_id}
+
+    result = _trend(course_ids, granularity, tz_offset, start, end)
     return (
         jsonify(
             {
-                "course_id": course.id,
-                "course_name": course.course_name,
-                "sessions_count": session_count,
-                "total_attendance": total_attendance,
-                "students_marked": students_count,
+                "granularity": granularity,
+                "tz_offset": tz_offset,
+                "from": start.isoformat(),
+                "to": end.isoformat(),
+                "trend": result,
             }
         ),
         200,
     )
 
 
-# ------------------- TOP ATTENDING STUDENTS -------------------
-@dashboard_bp.route("/top-students/<int:course_id>", methods=["GET"])
+# ------------------- COURSE-SPECIFIC SUMMARY -------------------
+@dashboard_bp.route("/course-summary/<int:course_id>", methods=["GET"])
 @jwt_required()
-def top_students(course_id):
-    admin_id = int(get_jwt_identity())
-    limit = int(request.args.get("limit", 10))
-    course = Course.query.get_or_404(course_id)
+@load_course_access(allow_reps=True)
+def course_summary(course):
+    return jsonify(_course_aggregates(course)["summary"]), 200
 
-    if not has_course_access(course, admin_id, allow_reps=True):
-        return jsonify({"error": "Access denied"}), 403
 
-    student_attendance = (
-        db.session.query(
-            Attendance.student_id, func.count(Attendance.id).label("attendance_count")
-        )
-        .join(SessionCode)
-        .filter(SessionCode.course_id == course_id)
-        .group_by(Attendance.student_id)
-        .order_by(func.count(Attendance.id).desc())
-        .limit(limit)
-        .all()
-    )
+# ------------------- TOP ATTENDING STUDENTS -------------------
+# ?limit= must be a positive integer; larger values are capped at
+# MAX_TOP_STUDENTS rather than refused.
+DEFAULT_TOP_STUDENTS = 10
+MAX_TOP_STUDENTS = 100
 
-    result = [
-        {"student_id": r.student_id, "attendance_count": r.attendance_count}
-        for r in student_attendance
-    ]
-    return jsonify({"top_students": result}), 200
 
+def _top_limit():
+    try:
+        limit = int(request.args.get("limit", DEFAULT_TOP_STUDENTS))
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        return None, "limit must be a positive integer"
+    return min(limit, MAX_TOP_STUDENTS), None
 
-# ------------------- GEO ATTENDANCE INSIGHTS -------------------
-@dashboard_bp.route("/geo-insights/<int:course_id>", methods=["GET"])
+
+@dashboard_bp.route("/top-students/<int:course_id>", methods=["GET"])
 @jwt_required()
-def geo_attendance_insights(course_id):
-    admin_id = int(get_jwt_identity())
-    course = Course.query.get_or_404(course_id)
+@load_course_access(allow_reps=True)
+def top_students(course):
+    limit, error = _top_limit()
+    if error:
+        return jsonify({"error": error}), 400
 
-    if not has_course_access(course, admin_id, allow_reps=True):
-        return jsonify({"error": "Access denied"}), 403
+    result = _course_aggregates(course, top_limit=limit)["top_students"]
+    return jsonify({"top_students": result}), 200
 
-    records = (
-        db.session.query(
+
+# ------------------- GEO ATTENDANCE INSIGHTS -------------------
+# mode=grid (default) bins student positions per session into slippy-map tiles
+# at `zoom`, so the payload is bounded by GEO_MAX_CELLS and GEO_MAX_OUTLIERS
+# per session; mode=raw returns every position as before.
+GEO_DEFAULT_ZOOM = 19
+GEO_MAX_ZOOM = 22
+GEO_MAX_CELLS = 256
+GEO_MAX_OUTLIERS = 50
+
+
+def _geo_params():
+    mode = request.args.get("mode", "grid")
+    if mode not in ("grid", "raw"):
+        return None, None, "mode must be 'grid' or 'raw'"
+    try:
+        zoom = int(request.args.get("zoom", GEO_DEFAULT_ZOOM))
+    except ValueError:
+        return None, None, "zoom must be an integer"
+    if not 0 <= zoom <= GEO_MAX_ZOOM:
+        return None, None, f"zoom must be between 0 and {GEO_MAX_ZOOM}"
+    return mode, zoom, None
+
+
+def _geo_insights(course, mode, zoom):
+    if mode == "raw":
+        records = (
+            db.session.query(
+                SessionCode.id,
+                SessionCode.latitude,
+                SessionCode.longitude,
+                Attendance.student_latitude,
+                Attendance.student_longitude,
+            )
+            .join(Attendance)
+            .filter(SessionCode.course_id == course.id)
+            .all()
+        )
+        return [
+            {
+                "session_id": r.id,
+                "session_location": {"latitude": r.latitude, "longitude": r.longitude},
+                "student_location": {
+                    "latitude": r.student_latitude,
+                    "longitude": r.student_longitude,
+                },
+            }
+            for r in records
+        ]
+
+    sessions = {
+        s.id: s
+        for s in db.session.query(
             SessionCode.id,
             SessionCode.latitude,
             SessionCode.longitude,
+            SessionCode.geo_radius,
+        ).filter(SessionCode.course_id == course.id)
+    }
+    rows = db.session.execute(
+        select(
+            Attendance.session_id,
             Attendance.student_latitude,
             Attendance.student_longitude,
         )
-        .join(Attendance)
-        .filter(SessionCode.course_id == course_id)
-        .all()
+        .where(
+            Attendance.session_id.in_(sessions),
+            Attendance.student_latitude.isnot(None),
+            Attendance.student_longitude.isnot(None),
+        )
+        .order_by(Attendance.session_id)
     )
-
-    geo_data = [
-        {
-            "session_id": r.id,
-            "session_location": {"latitude": r.latitude, "longitude": r.longitude},
-            "student_location": {
-                "latitude": r.student_latitude,
-                "longitude": r.student_longitude,
-            },
-        }
-        for r in records
-    ]
-    return jsonify({"geo_data": geo_data}), 200
+    # Plain tuples: NumPy probes Row objects for array protocols one by one
+    positions = np.array([tuple(r) for r in rows], dtype=float).reshape(-1, 3)
+
+    session_ids, starts = np.unique(positions[:, 0], return_index=True)
+    geo_data = []
+    for session_id, group in zip(session_ids, np.split(positions, starts[1:])):
+        session = sessions[int(session_id)]
+        geo_data.append(
+            {
+                "session_id": session.id,
+                "session_location": {
+                    "latitude": session.latitude,
+                    "longitude": session.longitude,
+                    "radius": session.geo_radius,
+                },
+                **summarise_positions(
+                    group[:, 1],
+                    group[:, 2],
+                    session.latitude,
+                    session.longitude,
+                    session.geo_radius,
+                    zoom,
+                    GEO_MAX_CELLS,
+                    GEO_MAX_OUTLIERS,
+                ),
+            }
+        )
+    return geo_data
 
 
-# ------------------- ALL-IN-ONE COURSE DASHBOARD -------------------
-@dashboard_bp.route("/course-dashboard/<int:course_id>", methods=["GET"])
+@dashboard_bp.route("/geo-insights/<int:course_id>", methods=["GET"])
 @jwt_required()
-def course_dashboard(course_id):
-    admin_id = int(get_jwt_identity())
-    course = Course.query.get_or_404(course_id)
-
-    if not has_course_access(course, admin_id, allow_reps=True):
-        return jsonify({"error": "Access denied"}), 403
-
-    # Summary
-    sessions = SessionCode.query.filter_by(course_id=course_id).all()
-    session_count = len(sessions)
-    total_attendance = (
-        Attendance.query.join(SessionCode)
-        .filter(SessionCode.course_id == course_id)
-        .count()
-    )
-    students_count = (
-        Attendance.query.join(SessionCode)
-        .filter(SessionCode.course_id == course_id)
-        .distinct(Attendance.student_id)
-        .count()
-    )
+@load_course_access(allow_reps=True)
+def geo_attendance_insights(course):
+    mode, zoom, error = _geo_params()
+    if error:
+        return jsonify({"error": error}), 400
 
-    # Attendance trend (last 7 days)
-    start_date = datetime.utcnow() - timedelta(days=7)
-    trend_data = (
-        db.session.query(
-            func.date(Attendance.timestamp).label("date"),
-            func.count(Attendance.id).label("attendance_count"),
-        )
-        .join(SessionCode)
-        .filter(SessionCode.course_id == course_id)
-        .filter(Attendance.timestamp >= start_date)
-        .group_by(func.date(Attendance.timestamp))
-        .order_by(func.date(Attendance.timestamp))
-        .all()
-    )
-    trend = [
-        {"date": str(d.date), "attendance_count": d.attendance_count}
-        for d in trend_data
-    ]
+    geo_data = _geo_insights(course, mode, zoom)
+    return jsonify({"mode": mode, "zoom": zoom, "geo_data": geo_data}), 200
 
-    # Top students (default top 10)
-    top_students_data = (
-        db.session.query(
-            Attendance.student_id, func.count(Attendance.id).label("attendance_count")
-        )
-        .join(SessionCode)
-        .filter(SessionCode.course_id == course_id)
-        .group_by(Attendance.student_id)
-        .order_by(func.count(Attendance.id).desc())
-        .limit(10)
-        .all()
-    )
-    top_students_list = [
-        {"student_id": r.student_id, "attendance_count": r.attendance_count}
-        for r in top_students_data
-    ]
 
-    # Geo insights
-    geo_records = (
-        db.session.query(
-            SessionCode.id,
-            SessionCode.latitude,
-            SessionCode.longitude,
-            Attendance.student_latitude,
-            Attendance.student_longitude,
-        )
-        .join(Attendance)
-        .filter(SessionCode.course_id == course_id)
-        .all()
+# ------------------- ALL-IN-ONE COURSE DASHBOARD -------------------
+@dashboard_bp.route("/course-dashboard/<int:course_id>", methods=["GET"])
+@jwt_required()
+@load_course_access(allow_reps=True)
+def course_dashboard(course):
+    mode, zoom, error = _geo_params()
+    if error:
+        return jsonify({"error": error}), 400
+
+    aggregates = _course_aggregates(
+        course, trend_days=7, top_limit=DEFAULT_TOP_STUDENTS
     )
-    geo_data = [
-        {
-            "session_id": r.id,
-            "session_location": {"latitude": r.latitude, "longitude": r.longitude},
-            "student_location": {
-                "latitude": r.student_latitude,
-                "longitude": r.student_longitude,
-            },
-        }
-        for r in geo_records
-    ]
+    geo_data = _geo_insights(course, mode, zoom)
 
     return (
         jsonify(
             {
-                "summary": {
-                    "course_id": course.id,
-                    "course_name": course.course_name,
-                    "sessions_count": session_count,
-                    "total_attendance": total_attendance,
-                    "students_marked": students_count,
-                },
-                "attendance_trend": trend,
-                "top_students": top_students_list,
+                **aggregates,
                 "geo_insights": geo_data,
             }
         ),
@@ -0,0 +1,95 @@
+import os
+
+from flask import Blueprint, jsonify, request, send_file
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select
+
+from app.models import db, Job
+from app.utils.jobs import get_job_runner, job_to_dict
+
+jobs_bp = Blueprint("jobs_bp", __name__, url_prefix="/jobs")
+
+JOB_LIST_LIMIT = 50
+
+
+@jobs_bp.before_app_request
+def _start_job_heartbeat():
+    # Only processes serving requests take part in job ownership
+    get_job_runner().start_heartbeat()
+
+
+def _own_job(job_id):
+    job = db.session.get(Job, job_id)
+    if job is None or job.admin_id != int(get_jwt_identity()):
+        return None
+    return job
+
+
+# ------------------- LIST -------------------
+@jobs_bp.route("", methods=["GET"])
+@jwt_required()
+def list_jobs():
+    """
+    The caller's most recent jobs, newest first; ?status= filters them.
+    """
+    admin_id = int(get_jwt_identity())
+    query = select(Job).where(Job.admin_id == admin_id)
+    status = request.args.get("status")
+    if status:
+        query = query.where(Job.status == status)
+    jobs = db.session.scalars(
+        query.order_by(Job.created_at.desc()).limit(JOB_LIST_LIMIT)
+    ).all()
+    return jsonify({"jobs": [job_to_dict(job) for job in jobs]}), 200
+
+
+# ------------------- STATUS -------------------
+@jobs_bp.route("/<string:job_id>", methods=["GET"])
+@jwt_required()
+def get_job(job_id):
+    job = _own_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({"job": job_to_dict(job)}), 200
+
+
+# ------------------- DOWNLOAD -------------------
+@jobs_bp.route("/<string:job_id>/download", methods=["GET"])
+@jwt_required()
+def download_job(job_id):
+    job = _own_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job.status != "succeeded":
+        return jsonify({"error": f"Job is {job.status}"}), 409
+
+    path = get_job_runner().path(job.id, "result")
+    if not job.result_file or not os.path.exists(path):
+        return jsonify({"error": "Job has no result file"}), 404
+    return send_file(
+        path,
+        as_attachment=True,
+        download_name=job.download_name,
+        mimetype=job.mimetype,
+    )
+
+
+# ------------------- DELETE -------------------
+@jobs_bp.route("/<string:job_id>", methods=["DELETE"])
+@jwt_required()
+def delete_job(job_id):
+    """
+    Cancel a queued job or discard a finished one and its result file.
+    """
+    job = _own_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    runner = get_job_runner()
+    if job.status in ("queued", "running") and not runner.cancel(job.id):
+        return jsonify({"error": "Job is already running"}), 409
+
+    runner.remove_files(job.id)
+    db.session.delete(job)
+    db.session.commit()
+    return jsonify({"message": "Job deleted"}), 200
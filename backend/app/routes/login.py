@@ -6,11 +6,13 @@ from flask_jwt_extended import (
     jwt_required,
     get_jwt,
     get_jwt_identity,
+    current_user,
 )
 from datetime import timedelta, datetime, timezone
 
 from app.extensions import db
 from app.models import Admin
+from app.utils.admin_cache import invalidate_admin
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -37,6 +39,7 @@ def register():
 
     db.session.add(admin)
     db.session.commit()
+    invalidate_admin(admin.id)
 
     return jsonify({"message": "Registration successful"}), 201
 
@@ -135,8 +138,7 @@ def logout():
 @auth_bp.route("/profile", methods=["GET"])
 @jwt_required()
 def profile():
-    user_id = int(get_jwt_identity())
-    user = Admin.query.get(user_id)
+    user = current_user
 
     if not user:
         return jsonify({"error": "User not found"}), 404
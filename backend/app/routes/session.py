@@ -3,31 +3,19 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
 
 from app.models import db, SessionCode, Course, LocationCode
-from app.utils.access_control import has_course_access
+from app.utils.access_control import has_course_access, load_course_access, load_session_access
 from app.utils.code_generator import generate_unique_session_code, generate_long_session_code
+from app.utils.pagination import finish_page, keyset, page_from_request
+from app.utils.session_registry import register_session, unregister_session
 
 session_bp = Blueprint('session_bp', __name__, url_prefix='/sessions')
 
 
-# ------------------- CLEANUP EXPIRED SESSIONS -------------------
-def delete_expired_sessions():
-    """Remove expired sessions with no attendance linked."""
-    now = datetime.utcnow()
-    expired_sessions = SessionCode.query.filter(
-        SessionCode.expires_at < now
-    ).all()
-
-    for session in expired_sessions:
-        db.session.delete(session)
-    db.session.commit()
-
-
 # ------------------- CREATE SESSION (WITH LOCATION CODE) -------------------
 @session_bp.route('/create-with-location', methods=['POST'])
 @jwt_required()
 def create_session_with_location():
     admin_id = int(get_jwt_identity())
-    delete_expired_sessions()  # clean up before creating a new session
 
     data = request.get_json()
     course_id = data.get('course_id')
@@ -72,6 +60,7 @@ def create_session_with_location():
 
     db.session.add(session)
     db.session.commit()
+    register_session(session)
 
     return jsonify({
         'message': 'Session created successfully',
@@ -91,7 +80,6 @@ def create_session_with_location():
 @jwt_required()
 def create_session_with_coords():
     admin_id = int(get_jwt_identity())
-    delete_expired_sessions()  # clean up before creating a new session
 
     data = request.get_json()
     course_id = data.get('course_id')
@@ -127,6 +115,7 @@ def create_session_with_coords():
 
     db.session.add(session)
     db.session.commit()
+    register_session(session)
 
     return jsonify({
         'message': 'Session created successfully',
@@ -140,9 +129,14 @@ def create_session_with_coords():
 @jwt_required()
 def get_my_sessions():
     admin_id = int(get_jwt_identity())
-    delete_expired_sessions()  # clean up before listing sessions
-
-    sessions = SessionCode.query.filter_by(admin_id=admin_id).order_by(SessionCode.created_at.desc()).all()
+    page, invalid = page_from_request()
+    if invalid:
+        return invalid
+
+    # Keyset-paginated newest first on (created_at, id)
+    query = SessionCode.query.filter_by(admin_id=admin_id)
+    sessions = keyset(query, SessionCode.created_at, SessionCode.id, page).all()
+    sessions, next_cursor = finish_page(sessions, page, lambda s: (s.created_at, s.id))
     data = [{
         'id': s.id,
         'code': s.code,
@@ -154,22 +148,14 @@ def get_my_sessions():
         'course_id': s.course_id
     } for s in sessions]
 
-    return jsonify({'sessions': data}), 200
+    return jsonify({'sessions': data, 'next_cursor': next_cursor}), 200
 
 
 # ------------------- READ (SINGLE SESSION) -------------------
 @session_bp.route('/<int:session_id>', methods=['GET'])
 @jwt_required()
-def get_single_session(session_id):
-    admin_id = int(get_jwt_identity())
-    delete_expired_sessions()  # clean up before fetching session
-
-    session = SessionCode.query.get_or_404(session_id)
-    course = Course.query.get_or_404(session.course_id)
-
-    if not has_course_access(course, admin_id, allow_reps=True):
-        return jsonify({'error': 'Access denied'}), 403
-
+@load_session_access(allow_reps=True)
+def get_single_session(session, course):
     return jsonify({
         'id': session.id,
         'code': session.code,
@@ -186,15 +172,9 @@ def get_single_session(session_id):
 # ------------------- READ (COURSE SESSIONS) -------------------
 @session_bp.route('/course/<int:course_id>', methods=['GET'])
 @jwt_required()
-def get_course_sessions(course_id):
-    admin_id = int(get_jwt_identity())
-    delete_expired_sessions()  # clean up before listing sessions
-
-    course = Course.query.get_or_404(course_id)
-    if not has_course_access(course, admin_id, allow_reps=True):
-        return jsonify({'error': 'Access denied'}), 403
-
-    sessions = SessionCode.query.filter_by(course_id=course_id).order_by(SessionCode.expires_at.desc()).all()
+@load_course_access(allow_reps=True)
+def get_course_sessions(course):
+    sessions = SessionCode.query.filter_by(course_id=course.id).order_by(SessionCode.expires_at.desc()).all()
     data = [{
         'id': s.id,
         'code': s.code,
@@ -212,16 +192,10 @@ def get_course_sessions(course_id):
 # ------------------- DELETE SESSION -------------------
 @session_bp.route('/delete/<int:session_id>', methods=['DELETE'])
 @jwt_required()
-def delete_session(session_id):
-    admin_id = int(get_jwt_identity())
-
-    session = SessionCode.query.get_or_404(session_id)
-    course = Course.query.get_or_404(session.course_id)
-
-    if not has_course_access(course, admin_id, allow_reps=False):
-        return jsonify({'error': 'Access denied'}), 403
-
+@load_session_access(allow_reps=False)
+def delete_session(session, course):
     db.session.delete(session)
     db.session.commit()
+    unregister_session(session.code)
 
     return jsonify({'message': 'Session deleted successfully'}), 200
@@ -1,8 +1,18 @@
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import current_user, jwt_required, get_jwt_identity
 from datetime import datetime
-from geopy.distance import geodesic
-from app.models import db, Student, Attendance, SessionCode
+from app.models import db, Student, Attendance
+from app.utils.attendance_writer import insert_attendance
+from app.utils.geo import check_geofence
+from app.utils.jobs import JobError, job_handler, submit_job, wants_async
+from app.utils.pagination import finish_page, keyset, page_from_request
+from app.utils.roster_import import (
+    RosterFormatError,
+    import_roster,
+    read_csv_roster,
+    read_xlsx_roster,
+)
+from app.utils.session_registry import lookup_session
 
 student_bp = Blueprint("student_bp", __name__)
 
@@ -12,18 +22,21 @@ student_bp = Blueprint("student_bp", __name__)
 @jwt_required()
 def get_attendance():
     """
-    Fetch all attendance records for the logged-in student.
+    Fetch the logged-in student's attendance records, newest first, one
+    keyset page at a time (?limit=, ?cursor=).
     """
     student_id = get_jwt_identity()  # Assume JWT identity is student.id
     student = Student.query.get(student_id)
     if not student:
         return jsonify({"error": "Student not found"}), 404
 
-    records = (
-        Attendance.query.filter_by(student_id=student.id)
-        .order_by(Attendance.timestamp.desc())
-        .all()
-    )
+    page, invalid = page_from_request()
+    if invalid:
+        return invalid
+
+    query = Attendance.query.filter_by(student_id=student.id)
+    records = keyset(query, Attendance.timestamp, Attendance.id, page).all()
+    records, next_cursor = finish_page(records, page, lambda r: (r.timestamp, r.id))
     data = [
         {
             "session_id": r.session_id,
@@ -34,7 +47,7 @@ def get_attendance():
         }
         for r in records
     ]
-    return jsonify({"attendance": data}), 200
+    return jsonify({"attendance": data, "next_cursor": next_cursor}), 200
 
 
 # ------------------ MARK ATTENDANCE ------------------
@@ -66,25 +79,18 @@ def mark_attendance():
     if not student:
         return jsonify({"error": "Student not found"}), 404
 
-    session = SessionCode.query.filter_by(code=session_code).first()
+    session = lookup_session(session_code)
     if not session:
         return jsonify({"error": "Invalid session code"}), 404
 
     if datetime.utcnow() > session.expires_at:
         return jsonify({"error": "Session has expired"}), 403
 
-    # Check if attendance already exists
-    existing = Attendance.query.filter_by(
-        student_id=student.id, session_id=session.id
-    ).first()
-    if existing:
-        return jsonify({"error": "Attendance already marked for this session"}), 409
-
     # Check geolocation distance
-    student_loc = (latitude, longitude)
-    session_loc = (session.latitude, session.longitude)
-    distance = geodesic(student_loc, session_loc).meters
-    if distance > session.geo_radius:
+    inside, distance = check_geofence(
+        latitude, longitude, session.latitude, session.longitude, session.geo_radius
+    )
+    if not inside:
         return (
             jsonify(
                 {"error": f"Outside allowed location (distance: {round(distance, 2)}m)"}
@@ -92,16 +98,21 @@ def mark_attendance():
             403,
         )
 
-    # Save attendance
-    attendance = Attendance(
-        student_id=student.id,
-        session_id=session.id,
-        student_latitude=latitude,
-        student_longitude=longitude,
-        status="present",
+    # Save attendance; the unique constraint rejects a second mark
+    inserted = insert_attendance(
+        [
+            {
+                "student_id": student.id,
+                "session_id": session.id,
+                "student_latitude": latitude,
+                "student_longitude": longitude,
+                "status": "present",
+            }
+        ]
     )
-    db.session.add(attendance)
     db.session.commit()
+    if not inserted:
+        return jsonify({"error": "Attendance already marked for this session"}), 409
 
     return (
         jsonify(
@@ -113,3 +124,64 @@ def mark_attendance():
         ),
         201,
     )
+
+
+# ------------------ IMPORT ROSTER ------------------
+ROSTER_READERS = {".csv": read_csv_roster, ".xlsx": read_xlsx_roster}
+
+
+@job_handler("student-import")
+def _import_job(ctx, extension):
+    try:
+        with open(ctx.input_path, "rb") as stream:
+            report = import_roster(ROSTER_READERS[extension](stream), ctx.progress)
+    except ImportError:
+        raise JobError("xlsx import is not available on this server")
+    except RosterFormatError as e:
+        raise JobError(str(e))
+    except UnicodeDecodeError:
+        raise JobError("File must be UTF-8 encoded")
+    return report.as_dict()
+
+
+@student_bp.route("/import", methods=["POST"])
+@jwt_required()
+def import_students():
+    """
+    Create or update students from a CSV or xlsx roster with index_number,
+    full_name and email columns, matched on index_number. With ?async=1 the
+    file is queued as a job and the report becomes the job's result.
+    """
+    # Resolved through the cached user_lookup_loader, no query per upload
+    if not current_user:
+        return jsonify({"error": "Only admins can import students"}), 403
+
+    file = request.files.get("file")
+    if file is None or not file.filename:
+        return jsonify({"error": "CSV or xlsx file is required"}), 400
+
+    extension = file.filename[file.filename.rfind(".") :].lower()
+    reader = ROSTER_READERS.get(extension)
+    if reader is None:
+        return jsonify({"error": "Only CSV and xlsx files are allowed"}), 400
+
+    if wants_async():
+        return submit_job(
+            "student-import", current_user.id, {"extension": extension}, file
+        )
+
+    try:
+        report = import_roster(reader(file.stream))
+    except ImportError:
+        return jsonify({"error": "xlsx import is not available on this server"}), 400
+    except RosterFormatError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({"error": "File must be UTF-8 encoded"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Import failed", "details": str(e)}), 500
+
+    return jsonify({"message": "Roster imported", **report.as_dict()}), 200
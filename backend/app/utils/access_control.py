@@ -1,4 +1,73 @@
-from app.models import Course, CourseRepAccess
+from collections import namedtuple
+from functools import wraps
+
+from flask import abort, g, has_app_context, jsonify
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import and_, event, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app.models import db, Attendance, Course, CourseRepAccess, SessionCode
+from app.utils.cache import TTLCache, MISSING
+
+# Course ids an admin can reach: as lecturer, as any rep, as an approved rep
+CourseAccess = namedtuple("CourseAccess", ["owned", "rep", "approved_rep"])
+
+_access_cache = TTLCache(maxsize=10_000, ttl=30)
+
+
+def init_access_cache(app):
+    _access_cache.configure(_access_cache.maxsize, app.config["ACCESS_CACHE_TTL"])
+
+
+def get_course_access(admin_id: int) -> CourseAccess:
+    """
+    Load an admin's accessible course ids with a single query, memoised for
+    the current request and for ACCESS_CACHE_TTL seconds across requests.
+    """
+    per_request = g.setdefault("course_access", {})
+    access = per_request.get(admin_id)
+    if access is not None:
+        return access
+
+    access = _access_cache.get(admin_id)
+    if access is MISSING:
+        stmt = union_all(
+            select(Course.id, literal("owner"), literal(True)).where(
+                Course.lecturer_id == admin_id
+            ),
+            select(
+                CourseRepAccess.course_id,
+                literal("rep"),
+                CourseRepAccess.approved_by_lecturer,
+            ).where(CourseRepAccess.rep_id == admin_id),
+        )
+        owned, rep, approved_rep = set(), set(), set()
+        for course_id, role, approved in db.session.execute(stmt):
+            if role == "owner":
+                owned.add(course_id)
+            else:
+                rep.add(course_id)
+                if approved:
+                    approved_rep.add(course_id)
+        access = CourseAccess(frozenset(owned), frozenset(rep), frozenset(approved_rep))
+        _access_cache.set(admin_id, access)
+
+    per_request[admin_id] = access
+    return access
+
+
+def invalidate_course_access():
+    """
+    Forget every cached access set, e.g. after a bulk course import.
+    """
+    _access_cache.clear()
+    if has_app_context():
+        g.pop("course_access", None)
+
+
+def access_cache_stats():
+    return _access_cache.stats()
+
 
 def has_session_access(session, admin_id: int, allow_reps: bool = False) -> bool:
     """
@@ -7,12 +76,7 @@ def has_session_access(session, admin_id: int, allow_reps: bool = False) -> bool
     if session.admin_id == admin_id:
         return True
     if allow_reps:
-        rep_access = CourseRepAccess.query.filter_by(
-            rep_id=admin_id,
-            course_id=session.course_id,
-            approved_by_lecturer=True
-        ).first()
-        return rep_access is not None
+        return session.course_id in get_course_access(admin_id).approved_rep
     return False
 
 
@@ -23,11 +87,7 @@ def has_course_access(course, admin_id: int, allow_reps: bool = False) -> bool:
     if course.lecturer_id == admin_id:
         return True
     if allow_reps:
-        rep_access = CourseRepAccess.query.filter_by(
-            rep_id=admin_id,
-            course_id=course.id
-        ).first()
-        return rep_access is not None
+        return course.id in get_course_access(admin_id).rep
     return False
 
 
@@ -35,15 +95,129 @@ def has_model_access(model_course_id: int, admin_id: int, allow_reps: bool = Fal
     """
     Generic check if a user has access to a model tied to a course ID.
     """
-    course = Course.query.get(model_course_id)
-    if not course:
-        return False
-    if course.lecturer_id == admin_id:
+    access = get_course_access(admin_id)
+    if model_course_id in access.owned:
         return True
     if allow_reps:
-        rep_access = CourseRepAccess.query.filter_by(
-            course_id=model_course_id,
-            rep_id=admin_id
-        ).first()
-        return rep_access is not None
+        return model_course_id in access.rep
     return False
+
+
+# ------------------- COMBINED LOADERS -------------------
+# Decorators that fetch a resource, its course and the caller's rep row in one
+# joined query, then pass the loaded objects to the view instead of the id.
+# They must sit below @jwt_required().
+
+
+def _resolve(query, course_id_column, admin_id, allow_reps, message):
+    row = query.outerjoin(
+        CourseRepAccess,
+        and_(
+            CourseRepAccess.course_id == course_id_column,
+            CourseRepAccess.rep_id == admin_id,
+        ),
+    ).first()
+    if row is None:
+        abort(404)
+    *loaded, course, rep_access_id = row
+    if course is not None and course.lecturer_id == admin_id:
+        return (*loaded, course), None
+    if allow_reps and rep_access_id is not None:
+        return (*loaded, course), None
+    return None, (jsonify({"error": message}), 403)
+
+
+def load_course_access(allow_reps=False, message="Access denied"):
+    """
+    Inject `course` for a view routed on <course_id>.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(course_id, *args, **kwargs):
+            admin_id = int(get_jwt_identity())
+            query = db.session.query(Course, CourseRepAccess.id).filter(
+                Course.id == course_id
+            )
+            loaded, denied = _resolve(query, Course.id, admin_id, allow_reps, message)
+            if denied:
+                return denied
+            return view(*loaded, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def load_session_access(allow_reps=False, message="Access denied"):
+    """
+    Inject `session` and `course` for a view routed on <session_id>.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(session_id, *args, **kwargs):
+            admin_id = int(get_jwt_identity())
+            query = (
+                db.session.query(SessionCode, Course, CourseRepAccess.id)
+                .outerjoin(Course, Course.id == SessionCode.course_id)
+                .filter(SessionCode.id == session_id)
+            )
+            loaded, denied = _resolve(
+                query, SessionCode.course_id, admin_id, allow_reps, message
+            )
+            if denied:
+                return denied
+            return view(*loaded, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def load_attendance_access(allow_reps=False, message="Access denied"):
+    """
+    Inject `record`, `session` and `course` for a view routed on <id>.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(id, *args, **kwargs):
+            admin_id = int(get_jwt_identity())
+            query = (
+                db.session.query(Attendance, SessionCode, Course, CourseRepAccess.id)
+                .join(SessionCode, SessionCode.id == Attendance.session_id)
+                .outerjoin(Course, Course.id == SessionCode.course_id)
+                .filter(Attendance.id == id)
+            )
+            loaded, denied = _resolve(
+                query, SessionCode.course_id, admin_id, allow_reps, message
+            )
+            if denied:
+                return denied
+            return view(*loaded, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# Any committed change to courses or rep access drops the cached sets; these
+# tables change rarely, so a full clear keeps invalidation trivially correct.
+@event.listens_for(Session, "after_flush")
+def _note_access_changes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (Course, CourseRepAccess)):
+            session.info["course_access_changed"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("course_access_changed", False):
+        invalidate_course_access()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_access_changes(session):
+    session.info.pop("course_access_changed", None)
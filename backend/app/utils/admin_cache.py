@@ -0,0 +1,29 @@
+from collections import namedtuple
+
+from app.models import db, Admin
+from app.utils.cache import TTLCache, MISSING
+
+AdminIdentity = namedtuple("AdminIdentity", ["id", "full_name", "email"])
+
+_cache = TTLCache(maxsize=10_000, ttl=60)
+
+
+def init_admin_cache(app):
+    _cache.configure(_cache.maxsize, app.config["ADMIN_CACHE_TTL"])
+
+
+def load_admin(admin_id):
+    """
+    Return an AdminIdentity for the JWT subject, or None if it does not exist.
+    Unknown ids are cached too, so registration must call invalidate_admin.
+    """
+    admin = _cache.get(admin_id)
+    if admin is MISSING:
+        row = db.session.get(Admin, admin_id)
+        admin = AdminIdentity(row.id, row.full_name, row.email) if row else None
+        _cache.set(admin_id, admin)
+    return admin
+
+
+def invalidate_admin(admin_id):
+    _cache.pop(admin_id)
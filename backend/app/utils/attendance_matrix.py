@@ -0,0 +1,50 @@
+import base64
+
+import numpy as np
+
+
+def _positions(ids, values):
+    """
+    Index of each of `values` within `ids`, or -1 where a value is absent.
+    """
+    if not len(ids):
+        return np.full(len(values), -1, dtype=np.int64)
+    order = np.argsort(ids, kind="stable")
+    found = np.searchsorted(ids, values, sorter=order)
+    positions = order[np.minimum(found, len(ids) - 1)]
+    return np.where(ids[positions] == values, positions, -1)
+
+
+def build_matrix(student_ids, session_ids, pairs):
+    """
+    Students x sessions presence matrix from (student_id, session_id) pairs.
+
+    Rows and columns follow the order of `student_ids` and `session_ids`;
+    pairs naming a student or session outside them are ignored. Returns (matrix, student_rates, session_rates); the rates are the
+    fraction of sessions each student attended and of students present at
+    each session.
+    """
+    student_ids = np.asarray(student_ids, dtype=np.int64)
+    session_ids = np.asarray(session_ids, dtype=np.int64)
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+
+    matrix = np.zeros((len(student_ids), len(session_ids)), dtype=bool)
+    if len(pairs):
+        rows = _positions(student_ids, pairs[:, 0])
+        cols = _positions(session_ids, pairs[:, 1])
+        known = (rows >= 0) & (cols >= 0)
+        matrix[rows[known], cols[known]] = True
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        student_rates = matrix.sum(axis=1) / len(session_ids)
+        session_rates = matrix.sum(axis=0) / len(student_ids)
+    return matrix, np.nan_to_num(student_rates), np.nan_to_num(session_rates)
+
+
+def pack_rows(matrix):
+    """
+    Encode each matrix row as base64 of its bits, first column in the most
+    significant bit of the first byte.
+    """
+    packed = np.packbits(matrix, axis=1)
+    return [base64.b64encode(row.tobytes()).decode("ascii") for row in packed]
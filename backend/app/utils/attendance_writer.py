@@ -0,0 +1,121 @@
+import calendar
+from collections import Counter
+
+from sqlalchemy import delete, select
+
+from app.models import (
+    db,
+    Attendance,
+    AttendanceBucketCount,
+    AttendanceDailyCount,
+    SessionCode,
+    StudentCourseTotal,
+)
+from app.utils.db import dialect_insert
+
+# Width of the attendance_bucket_counts buckets; any offset or granularity
+# that is a multiple of it can be answered from them exactly.
+BUCKET_SECONDS = 15 * 60
+
+
+def bucket_start(timestamp):
+    """
+    Unix time of the start of the bucket holding a naive UTC datetime.
+    """
+    seconds = calendar.timegm(timestamp.utctimetuple())
+    return seconds - seconds % BUCKET_SECONDS
+
+
+def insert_attendance(rows):
+    """
+    Insert attendance rows in one statement, skipping any that would violate
+    unique_student_session instead of raising IntegrityError. The rollup
+    tables are updated in the same transaction.
+
+    Returns the set of (student_id, session_id) pairs that were inserted;
+    anything missing from it was already marked. Does not commit.
+    """
+    if not rows:
+        return set()
+    insert = dialect_insert(db.session)
+    stmt = (
+        insert(Attendance)
+        .on_conflict_do_nothing(index_elements=["student_id", "session_id"])
+        .returning(Attendance.student_id, Attendance.session_id, Attendance.timestamp)
+    )
+    inserted = db.session.execute(stmt, rows).all()
+    apply_attendance_delta(
+        db.session, [(r.session_id, r.student_id, r.timestamp) for r in inserted], 1
+    )
+    return {(r.student_id, r.session_id) for r in inserted}
+
+
+def apply_attendance_delta(session, records, sign):
+    """
+    Add (sign=1) or subtract (sign=-1) attendance records, given as
+    (session_id, student_id, timestamp) tuples, from the rollup tables.
+    Records of sessions without a course are not rolled up.
+    """
+    if not records:
+        return
+
+    session_ids = {session_id for session_id, _, _ in records}
+    course_of = dict(
+        session.execute(
+            select(SessionCode.id, SessionCode.course_id).where(
+                SessionCode.id.in_(session_ids)
+            )
+        ).all()
+    )
+
+    daily, buckets, totals = Counter(), Counter(), Counter()
+    for session_id, student_id, timestamp in records:
+        course_id = course_of.get(session_id)
+        if course_id is None:
+            continue
+        daily[course_id, timestamp.date()] += sign
+        buckets[course_id, bucket_start(timestamp)] += sign
+        totals[course_id, student_id] += sign
+    if not daily:
+        return
+
+    insert = dialect_insert(session)
+    for model, key, counts in (
+        (AttendanceDailyCount, "day", daily),
+        (AttendanceBucketCount, "bucket_start", buckets),
+        (StudentCourseTotal, "student_id", totals),
+    ):
+        stmt = insert(model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["course_id", key],
+            set_={
+                "attendance_count": model.attendance_count
+                + stmt.excluded.attendance_count
+            },
+        )
+        session.execute(
+            stmt,
+            [
+                {"course_id": course_id, key: value, "attendance_count": count}
+                for (course_id, value), count in counts.items()
+            ],
+        )
+
+    if sign < 0:
+        course_ids = {course_id for course_id, _ in daily}
+        for model in (AttendanceDailyCount, AttendanceBucketCount, StudentCourseTotal):
+            session.execute(
+                delete(model).where(
+                    model.course_id.in_(course_ids), model.attendance_count <= 0
+                )
+            )
+
+
+def retract_attendance(*criteria):
+    """
+    Subtract the attendance rows matching `criteria` from the rollups. Call
+    before deleting them with a bulk query that bypasses the ORM.
+    """
+    stmt = select(Attendance.session_id, Attendance.student_id, Attendance.timestamp)
+    records = db.session.execute(stmt.where(*criteria)).all()
+    apply_attendance_delta(db.session, records, -1)
@@ -0,0 +1,85 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire `ttl` seconds after they
+    were stored. `get` returns MISSING for absent or expired keys so that
+    None can be cached as a value.
+
+    `generation` is bumped by every pop and clear. A caller that reads it
+    before loading a value from the database and passes it to `set` will
+    not store the value if an invalidation happened in between.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._generation = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key, MISSING)
+            if entry is not MISSING:
+                value, expires = entry
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return MISSING
+
+    @property
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def set(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+    def configure(self, maxsize, ttl):
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            }
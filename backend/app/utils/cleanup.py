@@ -1,10 +1,62 @@
-from datetime import datetime
-from app.models import db, SessionCode
-
-def delete_expired_sessions():
-    now = datetime.utcnow()
-    expired = SessionCode.query.filter(SessionCode.expires_at < now).all()
-    for s in expired:
-        db.session.delete(s)
+import logging
+import time
+from datetime import datetime, timedelta
+from threading import Thread
+
+from sqlalchemy import delete, exists
+
+from app.models import db, SessionCode, Attendance, CourseSession
+from app.utils.jobs import delete_expired_jobs
+
+logger = logging.getLogger(__name__)
+
+
+def delete_expired_sessions(retention=timedelta(0)):
+    """
+    Delete sessions that expired more than `retention` ago and have no
+    attendance or course sessions linked, in a single DELETE statement.
+    Returns the number of sessions deleted.
+    """
+    cutoff = datetime.utcnow() - retention
+    stmt = delete(SessionCode).where(
+        SessionCode.expires_at < cutoff,
+        ~exists().where(Attendance.session_id == SessionCode.id),
+        ~exists().where(CourseSession.location_id == SessionCode.id),
+    )
+    result = db.session.execute(stmt)
     db.session.commit()
-    return len(expired)
+    return result.rowcount
+
+
+def start_session_reaper(app):
+    """
+    Run delete_expired_sessions every SESSION_REAPER_INTERVAL seconds on a
+    daemon thread, keeping sessions for SESSION_RETENTION after expiry, and
+    drop expired job results on the same schedule. An interval of 0 disables
+    the thread; the `flask reap-sessions` and `flask reap-jobs` commands can
+    then be scheduled externally instead.
+    """
+    interval = app.config["SESSION_REAPER_INTERVAL"]
+    if interval <= 0:
+        return None
+
+    def run():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    deleted = delete_expired_sessions(app.config["SESSION_RETENTION"])
+                    if deleted:
+                        logger.info("Reaped %d expired sessions", deleted)
+                    deleted = delete_expired_jobs()
+                    if deleted:
+                        logger.info("Reaped %d expired jobs", deleted)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Expired session cleanup failed")
+                finally:
+                    db.session.remove()
+
+    thread = Thread(target=run, name="session-reaper", daemon=True)
+    thread.start()
+    return thread
@@ -1,23 +1,139 @@
-import random
+import hashlib
+import logging
 import string
-from app.models import SessionCode
+from threading import Lock
+
+from flask import current_app
+
+from app.models import db, CodeCounter
+from app.utils.db import dialect_insert
+from app.utils.session_registry import is_live_code
+
+logger = logging.getLogger(__name__)
+
+CHARACTERS = string.ascii_uppercase + string.digits
+
+# Counter values reserved from the database per round trip
+BLOCK_SIZE = 1000
+FEISTEL_ROUNDS = 4
+
+
+class CodeAllocator:
+    """
+    Hand out unique fixed-length codes without probing the database.
+
+    Codes are a keyed permutation (a Feistel network with cycle walking) of
+    a persistent counter, so distinct counter values always give distinct
+    codes and consecutive codes look random. Counter values are reserved in
+    blocks from the code_counters table, which keeps allocation O(1) and
+    safe across worker processes.
+    """
+
+    def __init__(self, length, key):
+        self.length = length
+        self.domain = len(CHARACTERS) ** length
+        bits = (self.domain - 1).bit_length()
+        self.half_bits = (bits + 1) // 2
+        self.half_mask = (1 << self.half_bits) - 1
+        self.round_keys = [
+            hashlib.blake2b(key, digest_size=16, person=f"round{i}".encode()).digest()
+            for i in range(FEISTEL_ROUNDS)
+        ]
+        self._lock = Lock()
+        self._next = 0
+        self._end = 0
+
+    def _round(self, i, value):
+        digest = hashlib.blake2b(
+            value.to_bytes(8, "big"), digest_size=8, key=self.round_keys[i]
+        ).digest()
+        return int.from_bytes(digest, "big") & self.half_mask
+
+    def _permute(self, value):
+        left, right = value >> self.half_bits, value & self.half_mask
+        for i in range(FEISTEL_ROUNDS):
+            left, right = right, left ^ self._round(i, right)
+        return (left << self.half_bits) | right
+
+    def encode(self, counter):
+        value = self._permute(counter)
+        while value >= self.domain:
+            value = self._permute(value)
+
+        chars = []
+        for _ in range(self.length):
+            value, digit = divmod(value, len(CHARACTERS))
+            chars.append(CHARACTERS[digit])
+        return "".join(chars)
+
+    def _reserve_block(self):
+        insert = dialect_insert(db.session)
+        stmt = (
+            insert(CodeCounter)
+            .values(name=f"code{self.length}", next_value=BLOCK_SIZE)
+            .on_conflict_do_update(
+                index_elements=["name"],
+                set_={"next_value": CodeCounter.next_value + BLOCK_SIZE},
+            )
+            .returning(CodeCounter.next_value)
+        )
+        # Own transaction, so the reservation survives a request rollback
+        with db.engine.begin() as conn:
+            end = conn.execute(stmt).scalar_one()
+        if end > self.domain:
+            raise RuntimeError(f"Session code space of length {self.length} exhausted")
+        self._next, self._end = end - BLOCK_SIZE, end
+
+    def allocate(self):
+        with self._lock:
+            while True:
+                if self._next >= self._end:
+                    self._reserve_block()
+                code = self.encode(self._next)
+                self._next += 1
+                # Codes chosen by hand via /admins/location-code may collide
+                if not is_live_code(code):
+                    return code
+
+
+_allocators = {}
+_allocators_lock = Lock()
+_key = None
+
+
+def _code_key():
+    global _key
+    if _key is None:
+        secret = current_app.config.get("SESSION_CODE_KEY")
+        if not secret:
+            # Every deployment left on the default JWT key would hand out the
+            # same code sequence
+            logger.warning(
+                "SESSION_CODE_KEY is not set; session codes are keyed with "
+                "JWT_SECRET_KEY and are predictable wherever it is shared"
+            )
+            secret = current_app.config["JWT_SECRET_KEY"]
+        _key = hashlib.sha256(secret.encode()).digest()
+    return _key
+
+
+def _allocator(length):
+    with _allocators_lock:
+        allocator = _allocators.get(length)
+        if allocator is None:
+            allocator = _allocators[length] = CodeAllocator(length, _code_key())
+        return allocator
+
 
 def generate_unique_session_code(length: int = 6) -> str:
     """
     Generate a unique short alphanumeric session code.
     """
-    characters = string.ascii_uppercase + string.digits
-    while True:
-        code = ''.join(random.choices(characters, k=length))
-        if not SessionCode.query.filter_by(code=code).first():
-            return code
+    return _allocator(length).allocate()
+
 
 def generate_long_session_code(length: int = 8) -> str:
     """
     Generate a unique longer alphanumeric session code.
     """
-    characters = string.ascii_uppercase + string.digits
-    while True:
-        code = ''.join(random.choices(characters, k=length))
-        if not SessionCode.query.filter_by(code=code).first():
-            return code
+    return _allocator(length).allocate()
@@ -0,0 +1,14 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+# insert() constructs with ON CONFLICT support, by dialect name
+_DIALECT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def dialect_insert(bind):
+    """
+    The insert() of the database behind `bind`, a Session, Connection or
+    Engine, so that upserts work on whichever database is configured.
+    """
+    if not hasattr(bind, "dialect"):
+        bind = bind.get_bind()
+    return _DIALECT_INSERTS[bind.dialect.name]
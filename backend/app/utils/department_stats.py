@@ -0,0 +1,73 @@
+from sqlalchemy import event, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.models import db, Course, CourseRepAccess
+from app.utils.cache import TTLCache, MISSING
+
+PUBLIC = "public"
+
+# Course counts per department, keyed by admin id or PUBLIC
+_stats_cache = TTLCache(maxsize=10_000, ttl=300)
+
+
+def init_department_stats_cache(app):
+    _stats_cache.configure(_stats_cache.maxsize, app.config["DEPARTMENT_STATS_TTL"])
+
+
+def get_department_stats(admin_id=None):
+    """
+    Course counts per department, as [{"label", "value"}], for all courses or
+    for those an admin owns or is a rep of.
+    """
+    key = PUBLIC if admin_id is None else admin_id
+    data = _stats_cache.get(key)
+    if data is not MISSING:
+        return data
+
+    query = select(Course.department, func.count(Course.id)).group_by(
+        Course.department
+    )
+    if admin_id is not None:
+        query = query.where(
+            or_(
+                Course.lecturer_id == admin_id,
+                Course.id.in_(
+                    select(CourseRepAccess.course_id).where(
+                        CourseRepAccess.rep_id == admin_id
+                    )
+                ),
+            )
+        )
+    data = [
+        {"label": dept or "Unknown", "value": count}
+        for dept, count in db.session.execute(query)
+    ]
+    _stats_cache.set(key, data)
+    return data
+
+
+def invalidate_department_stats():
+    """
+    Forget every cached breakdown, e.g. after a bulk course import.
+    """
+    _stats_cache.clear()
+
+
+# Committed changes to courses or rep access drop every cached breakdown
+@event.listens_for(Session, "after_flush")
+def _note_course_changes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (Course, CourseRepAccess)):
+            session.info["department_stats_changed"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("department_stats_changed", False):
+        invalidate_department_stats()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_course_changes(session):
+    session.info.pop("department_stats_changed", None)
@@ -0,0 +1,179 @@
+import math
+
+import numpy as np
+from geopy.distance import geodesic
+
+# WGS84 ellipsoid, the same model geopy's geodesic uses
+_A = 6378137.0
+_F = 1 / 298.257223563
+_E2 = _F * (2 - _F)
+
+# Below this distance the local tangent-plane approximation agrees with the
+# geodesic to well under a millimetre per 100 m; beyond it we do not trust it.
+PLANAR_LIMIT_METERS = 50_000.0
+
+# Relative width of the band around the radius in which the exact geodesic
+# decides, comfortably larger than the planar approximation error.
+BOUNDARY_TOLERANCE = 1e-4
+
+
+def _radii_of_curvature(lat):
+    """
+    Metres per radian of latitude (meridional) and of longitude at `lat`.
+    """
+    sin_lat = math.sin(math.radians(lat))
+    w2 = 1 - _E2 * sin_lat * sin_lat
+    meridional = _A * (1 - _E2) / (w2 * math.sqrt(w2))
+    prime_vertical = _A / math.sqrt(w2)
+    return meridional, prime_vertical * math.cos(math.radians(lat))
+
+
+def _wrap_longitude(delta):
+    return (delta + 180.0) % 360.0 - 180.0
+
+
+def planar_distance(lat, lon, centre_lat, centre_lon):
+    """
+    Equirectangular distance in metres using the ellipsoid's local radii of
+    curvature at the midpoint latitude. Accurate for short distances only.
+    """
+    m_lat, m_lon = _radii_of_curvature((lat + centre_lat) / 2)
+    dy = math.radians(lat - centre_lat) * m_lat
+    dx = math.radians(_wrap_longitude(lon - centre_lon)) * m_lon
+    return math.hypot(dx, dy)
+
+
+def exact_distance(lat, lon, centre_lat, centre_lon):
+    """
+    Geodesic distance in metres on the WGS84 ellipsoid.
+    """
+    return geodesic((lat, lon), (centre_lat, centre_lon)).meters
+
+
+def check_geofence(lat, lon, centre_lat, centre_lon, radius):
+    """
+    Return (inside, distance_in_metres) for a point against a circular fence.
+
+    A bounding box around the centre rejects far-away points without any
+    trigonometry on the point itself, the planar approximation decides
+    everything else, and the exact geodesic is only computed when the point
+    lies within BOUNDARY_TOLERANCE of the radius or is too far away for the
+    approximation to report a meaningful distance.
+    """
+    m_lat, m_lon = _radii_of_curvature(centre_lat)
+    margin = radius * (1 + BOUNDARY_TOLERANCE) + 1.0
+    dy = abs(math.radians(lat - centre_lat)) * m_lat
+    dx = abs(math.radians(_wrap_longitude(lon - centre_lon))) * m_lon
+
+    if dx > margin or dy > margin:
+        distance = planar_distance(lat, lon, centre_lat, centre_lon)
+        if distance > PLANAR_LIMIT_METERS:
+            distance = exact_distance(lat, lon, centre_lat, centre_lon)
+        return False, distance
+
+    distance = planar_distance(lat, lon, centre_lat, centre_lon)
+    if abs(distance - radius) <= radius * BOUNDARY_TOLERANCE + 0.01:
+        distance = exact_distance(lat, lon, centre_lat, centre_lon)
+    return distance <= radius, distance
+
+
+def check_geofence_many(lats, lons, centre_lat, centre_lon, radius):
+    """
+    Vectorised check_geofence for many points against one fence.
+    Returns (inside, distances) as NumPy arrays.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+
+    mid_lat = np.radians((lats + centre_lat) / 2)
+    w2 = 1 - _E2 * np.sin(mid_lat) ** 2
+    m_lat = _A * (1 - _E2) / (w2 * np.sqrt(w2))
+    m_lon = _A / np.sqrt(w2) * np.cos(mid_lat)
+    dy = np.radians(lats - centre_lat) * m_lat
+    dx = np.radians((lons - centre_lon + 180.0) % 360.0 - 180.0) * m_lon
+    distances = np.hypot(dx, dy)
+
+    exact = (np.abs(distances - radius) <= radius * BOUNDARY_TOLERANCE + 0.01) | (
+        distances > PLANAR_LIMIT_METERS
+    )
+    for i in np.flatnonzero(exact):
+        distances[i] = exact_distance(lats[i], lons[i], centre_lat, centre_lon)
+
+    return distances <= radius, distances
+
+
+# Web Mercator cannot represent the poles; slippy-map tiles stop here
+_MERCATOR_MAX_LAT = 85.0511287798
+
+
+def tile_indices(lats, lons, zoom):
+    """
+    Slippy-map (x, y) tile indices of each point at `zoom`, as NumPy arrays.
+    """
+    n = 2**zoom
+    lats = np.clip(np.asarray(lats, dtype=float), -_MERCATOR_MAX_LAT, _MERCATOR_MAX_LAT)
+    lons = (np.asarray(lons, dtype=float) + 180.0) % 360.0 - 180.0
+    x = np.floor((lons + 180.0) / 360.0 * n)
+    y = np.floor((1 - np.arcsinh(np.tan(np.radians(lats))) / math.pi) / 2 * n)
+    return (
+        np.clip(x, 0, n - 1).astype(np.int64),
+        np.clip(y, 0, n - 1).astype(np.int64),
+    )
+
+
+def summarise_positions(
+    lats, lons, centre_lat, centre_lon, radius, zoom, max_cells, max_outliers
+):
+    """
+    Bin positions around a fence into slippy-map tiles at `zoom`.
+
+    Returns a dict with overall counts and mean distance, the `max_cells`
+    busiest tiles (count, mean position, mean distance) and the
+    `max_outliers` points furthest outside the fence, so its size does not
+    grow with the number of positions.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    inside, distances = check_geofence_many(lats, lons, centre_lat, centre_lon, radius)
+
+    x, y = tile_indices(lats, lons, zoom)
+    keys, inverse, counts = np.unique(
+        x * 2**zoom + y, return_inverse=True, return_counts=True
+    )
+    mean_lat = np.bincount(inverse, weights=lats) / counts
+    mean_lon = np.bincount(inverse, weights=lons) / counts
+    mean_distance = np.bincount(inverse, weights=distances) / counts
+
+    busiest = np.argsort(-counts, kind="stable")[:max_cells]
+    cells = [
+        {
+            "x": int(keys[i] // 2**zoom),
+            "y": int(keys[i] % 2**zoom),
+            "count": int(counts[i]),
+            "latitude": float(mean_lat[i]),
+            "longitude": float(mean_lon[i]),
+            "mean_distance": round(float(mean_distance[i]), 2),
+        }
+        for i in busiest
+    ]
+
+    outside = np.flatnonzero(~inside)
+    furthest = outside[np.argsort(-distances[outside], kind="stable")][:max_outliers]
+    outliers = [
+        {
+            "latitude": float(lats[i]),
+            "longitude": float(lons[i]),
+            "distance": round(float(distances[i]), 2),
+        }
+        for i in furthest
+    ]
+
+    return {
+        "count": int(len(lats)),
+        "inside_count": int(inside.sum()),
+        "mean_distance": round(float(distances.mean()), 2) if len(lats) else None,
+        "cells_total": int(len(keys)),
+        "cells": cells,
+        "outliers_total": int(len(outside)),
+        "outliers": outliers,
+    }
@@ -0,0 +1,352 @@
+import logging
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from threading import Lock, Thread
+
+from flask import current_app, jsonify, request, url_for
+from sqlalchemy import bindparam, delete, or_, select, update
+
+from app.models import db, Job
+
+logger = logging.getLogger(__name__)
+
+# kind -> handler(ctx, **params), registered by the route modules
+JOB_HANDLERS = {}
+
+UNFINISHED = ("queued", "running")
+
+# Heartbeats an owner may miss before its unfinished jobs are failed
+STALE_AFTER_BEATS = 4
+
+
+def job_handler(kind):
+    """
+    Register a function as the handler for jobs of `kind`. It is called as
+    handler(ctx, **job.params) inside an app context on a worker thread and
+    may return a JSON-serialisable summary, stored as the job's result.
+    """
+
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+
+    return decorator
+
+
+class JobError(Exception):
+    """A failure whose message is shown to the user as the job's error."""
+
+
+class JobContext:
+    """What a handler gets to report progress and write its result file."""
+
+    def __init__(self, runner, job):
+        self.id = job.id
+        self.admin_id = job.admin_id
+        self.input_path = runner.path(job.id, "upload")
+        self.result_path = None
+        self.download_name = None
+        self.mimetype = None
+        self._runner = runner
+
+    def progress(self, done, total=None):
+        self._runner.set_progress(self.id, done, total)
+
+    def open_result(self, download_name, mimetype):
+        self.result_path = self._runner.path(self.id, "result")
+        self.download_name = download_name
+        self.mimetype = mimetype
+        return open(self.result_path, "wb")
+
+
+class JobRunner:
+    """
+    Runs jobs on a thread pool inside this process. The jobs table holds
+    their state and each row names the runner that owns it by boot id.
+    Handlers report progress in memory; the heartbeat thread copies it to
+    the rows every `heartbeat` seconds along with proof the owner is alive.
+    """
+
+    def __init__(
+        self, app, workers=2, directory=None, result_ttl=None, heartbeat=30
+    ):
+        self.app = app
+        self.directory = directory
+        self.result_ttl = result_ttl
+        self.heartbeat = heartbeat
+        self.boot_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        os.makedirs(directory, exist_ok=True)
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="job"
+        )
+        self._futures = {}
+        self._progress = {}
+        self._lock = Lock()
+        self._heartbeat_thread = None
+
+    def path(self, job_id, suffix):
+        return os.path.join(self.directory, f"{job_id}.{suffix}")
+
+    def remove_files(self, job_id):
+        for suffix in ("upload", "result"):
+            _remove(self.path(job_id, suffix))
+
+    def submit(self, kind, admin_id, params=None, upload=None):
+        """
+        Queue a job and return its row. `upload`, a FileStorage, is saved
+        first and handed to the handler as ctx.input_path.
+        """
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job = Job(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            admin_id=admin_id,
+            params=params or {},
+            owner=self.boot_id,
+            heartbeat_at=datetime.utcnow(),
+        )
+        if upload is not None:
+            upload.save(self.path(job.id, "upload"))
+        db.session.add(job)
+        db.session.commit()
+
+        self.start_heartbeat()
+        with self._lock:
+            self._futures[job.id] = self._executor.submit(self._run, job.id)
+        return job
+
+    def cancel(self, job_id):
+        """Cancel a job that has not started yet; True if it was cancelled."""
+        with self._lock:
+            future = self._futures.get(job_id)
+        return future is not None and future.cancel()
+
+    def set_progress(self, job_id, done, total=None):
+        with self._lock:
+            self._progress[job_id] = (done, total)
+
+    def progress(self, job_id):
+        with self._lock:
+            return self._progress.get(job_id)
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            try:
+                self._execute(job_id)
+            except Exception:
+                db.session.rollback()
+                logger.exception("Could not record the outcome of job %s", job_id)
+            finally:
+                db.session.remove()
+                with self._lock:
+                    self._futures.pop(job_id, None)
+                    self._progress.pop(job_id, None)
+                _remove(self.path(job_id, "upload"))
+
+    def _execute(self, job_id):
+        # Claim the job only if it is still ours and nobody failed or
+        # deleted it in the meantime
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "queued", Job.owner == self.boot_id)
+            .values(status="running", started_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            return
+
+        job = db.session.get(Job, job_id)
+        ctx = JobContext(self, job)
+        outcome = {}
+        try:
+            result = JOB_HANDLERS[job.kind](ctx, **job.params)
+            outcome.update(status="succeeded", result=result)
+            if ctx.result_path:
+                outcome.update(
+                    result_file=os.path.basename(ctx.result_path),
+                    download_name=ctx.download_name,
+                    mimetype=ctx.mimetype,
+                )
+        except Exception as e:
+            db.session.rollback()
+            if ctx.result_path:
+                _remove(ctx.result_path)
+            if isinstance(e, JobError):
+                outcome.update(status="failed", error=str(e))
+            else:
+                logger.exception("Job %s (%s) failed", job_id, job.kind)
+                outcome.update(status="failed", error="Job failed unexpectedly")
+
+        done, total = self.progress(job_id) or (0, None)
+        finished = datetime.utcnow()
+        db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "running")
+            .values(
+                progress=done,
+                total=total,
+                finished_at=finished,
+                expires_at=finished + self.result_ttl,
+                **outcome,
+            )
+        )
+        db.session.commit()
+
+    def beat(self):
+        """
+        Refresh this runner's unfinished jobs with the current time and
+        progress, then fail unfinished jobs of runners that stopped beating.
+        Returns the number of jobs failed.
+        """
+        now = datetime.utcnow()
+        with self._lock:
+            progress = dict(self._progress)
+        db.session.execute(
+            update(Job)
+            .where(Job.owner == self.boot_id, Job.status.in_(UNFINISHED))
+            .values(heartbeat_at=now)
+        )
+        if progress:
+            # Core executemany: the ORM would read a list of parameters as a
+            # bulk update by primary key and reject this WHERE clause
+            jobs = Job.__table__
+            db.session.execute(
+                update(jobs)
+                .where(jobs.c.id == bindparam("job_id"), jobs.c.status == "running")
+                .values(progress=bindparam("done"), total=bindparam("of")),
+                [
+                    {"job_id": job_id, "done": done, "of": total}
+                    for job_id, (done, total) in progress.items()
+                ],
+            )
+        # A few missed beats, not one slow one, mean the owner is gone
+        stale = now - timedelta(seconds=self.heartbeat * STALE_AFTER_BEATS)
+        failed = db.session.execute(
+            update(Job)
+            .where(
+                Job.status.in_(UNFINISHED),
+                # Jobs from before owners were recorded have neither column
+                or_(Job.owner.is_(None), Job.owner != self.boot_id),
+                or_(Job.heartbeat_at.is_(None), Job.heartbeat_at < stale),
+            )
+            .values(
+                status="failed",
+                error="Interrupted by a server restart",
+                finished_at=now,
+                expires_at=now + self.result_ttl,
+            )
+        ).rowcount
+        db.session.commit()
+        return failed
+
+    def start_heartbeat(self):
+        """
+        Start the heartbeat thread. Called on the first request or submit,
+        so CLI commands, which serve neither, never judge other runners.
+        """
+        with self._lock:
+            if self._heartbeat_thread is not None:
+                return
+            self._heartbeat_thread = Thread(
+                target=self._beat_forever, name="job-heartbeat", daemon=True
+            )
+        self._heartbeat_thread.start()
+
+    def _beat_forever(self):
+        while True:
+            time.sleep(self.heartbeat)
+            with self.app.app_context():
+                try:
+                    failed = self.beat()
+                    if failed:
+                        logger.warning("Failed %d jobs of vanished runners", failed)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Job heartbeat failed")
+                finally:
+                    db.session.remove()
+
+
+def init_job_runner(app):
+    """
+    Create the job pool with JOB_WORKERS threads, keeping results under
+    instance_path/jobs for JOB_RESULT_TTL. Nothing starts until the first
+    job is submitted; jobs of runners that stop heartbeating for
+    STALE_AFTER_BEATS * JOB_HEARTBEAT_INTERVAL seconds are failed then.
+    """
+    runner = JobRunner(
+        app,
+        workers=app.config["JOB_WORKERS"],
+        directory=os.path.join(app.instance_path, "jobs"),
+        result_ttl=app.config["JOB_RESULT_TTL"],
+        heartbeat=app.config["JOB_HEARTBEAT_INTERVAL"],
+    )
+    app.extensions["job_runner"] = runner
+    return runner
+
+
+def get_job_runner():
+    return current_app.extensions["job_runner"]
+
+
+def delete_expired_jobs(now=None):
+    """
+    Delete jobs whose results have expired, along with their files.
+    Returns the number of jobs deleted.
+    """
+    runner = get_job_runner()
+    cutoff = now or datetime.utcnow()
+    expired = db.session.scalars(select(Job.id).where(Job.expires_at < cutoff)).all()
+    if not expired:
+        return 0
+    for job_id in expired:
+        runner.remove_files(job_id)
+    db.session.execute(delete(Job).where(Job.id.in_(expired)))
+    db.session.commit()
+    return len(expired)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# ------------------- REQUEST HELPERS -------------------
+def wants_async():
+    """True if the caller asked for the work to run as a job (?async=1)."""
+    return request.args.get("async", "").lower() in ("1", "true", "yes")
+
+
+def job_to_dict(job):
+    live = get_job_runner().progress(job.id) if job.status == "running" else None
+    done, total = live or (job.progress, job.total)
+    data = {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": {"done": done, "total": total},
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "expires_at": job.expires_at.isoformat() if job.expires_at else None,
+        "download_url": None,
+    }
+    if job.status == "succeeded" and job.result_file:
+        data["download_url"] = url_for("jobs_bp.download_job", job_id=job.id)
+    return data
+
+
+def submit_job(kind, admin_id, params=None, upload=None):
+    """Queue a job and build the 202 response pointing at its status."""
+    job = get_job_runner().submit(kind, admin_id, params, upload)
+    location = url_for("jobs_bp.get_job", job_id=job.id)
+    return jsonify({"job": job_to_dict(job)}), 202, {"Location": location}
@@ -0,0 +1,79 @@
+import base64
+import binascii
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from flask import current_app, jsonify, request
+from sqlalchemy import tuple_
+
+# One page of a keyset-paginated listing: at most `limit` rows, starting
+# after the (datetime, id) key in `after`, or from the top if it is None.
+Page = namedtuple("Page", ["limit", "after"])
+
+
+def encode_cursor(moment, row_id):
+    """
+    Opaque cursor for the row keyed (moment, row_id). It only encodes the
+    sort key, so it stays valid while rows are added or removed.
+    """
+    payload = json.dumps([moment.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        moment, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(moment), int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def page_from_request():
+    """
+    Read ?limit= and ?cursor= into a Page. limit defaults to
+    DEFAULT_PAGE_SIZE and is capped at MAX_PAGE_SIZE.
+
+    Returns (page, None), or (None, error response) if either is invalid.
+    """
+    maximum = current_app.config["MAX_PAGE_SIZE"]
+    limit = request.args.get("limit", current_app.config["DEFAULT_PAGE_SIZE"])
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        limit = 0
+    if limit < 1:
+        return None, (jsonify({"error": "limit must be a positive integer"}), 400)
+
+    cursor = request.args.get("cursor")
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            return None, (jsonify({"error": str(e)}), 400)
+    return Page(min(limit, maximum), after), None
+
+
+def keyset(query, moment_column, id_column, page):
+    """
+    Restrict a Query or Select to `page`, newest first on (moment, id). One
+    extra row is fetched so that finish_page can tell whether more follow.
+    """
+    if page.after is not None:
+        query = query.where(tuple_(moment_column, id_column) < tuple_(*page.after))
+    return query.order_by(moment_column.desc(), id_column.desc()).limit(
+        page.limit + 1
+    )
+
+
+def finish_page(rows, page, key):
+    """
+    Drop the look-ahead row and return (rows, next_cursor); next_cursor is
+    None on the last page. `key` maps a row to its (moment, id).
+    """
+    if len(rows) <= page.limit:
+        return rows, None
+    rows = rows[: page.limit]
+    return rows, encode_cursor(*key(rows[-1]))
@@ -0,0 +1,123 @@
+from sqlalchemy import BigInteger, Date, delete, event, func, insert, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import FunctionElement
+
+from app.models import (
+    Attendance,
+    AttendanceBucketCount,
+    AttendanceDailyCount,
+    SessionCode,
+    StudentCourseTotal,
+)
+from app.utils.attendance_writer import BUCKET_SECONDS, apply_attendance_delta
+
+
+class epoch_seconds(FunctionElement):
+    """Unix time of a naive UTC DateTime column, as an integer."""
+
+    type = BigInteger()
+    inherit_cache = True
+
+
+@compiles(epoch_seconds, "sqlite")
+def _epoch_seconds_sqlite(element, compiler, **kw):
+    return "CAST(strftime('%%s', %s) AS INTEGER)" % compiler.process(
+        element.clauses, **kw
+    )
+
+
+@compiles(epoch_seconds, "postgresql")
+def _epoch_seconds_postgresql(element, compiler, **kw):
+    return "CAST(EXTRACT(EPOCH FROM %s) AS BIGINT)" % compiler.process(
+        element.clauses, **kw
+    )
+
+
+# What the rollup tables should contain, computed from the raw attendance rows
+_day = func.date(Attendance.timestamp, type_=Date)
+_daily_source = (
+    select(SessionCode.course_id, _day, func.count(Attendance.id))
+    .join(SessionCode, SessionCode.id == Attendance.session_id)
+    .where(SessionCode.course_id.is_not(None))
+    .group_by(SessionCode.course_id, _day)
+)
+_bucket = epoch_seconds(Attendance.timestamp) // BUCKET_SECONDS * BUCKET_SECONDS
+_bucket_source = (
+    select(SessionCode.course_id, _bucket, func.count(Attendance.id))
+    .join(SessionCode, SessionCode.id == Attendance.session_id)
+    .where(SessionCode.course_id.is_not(None))
+    .group_by(SessionCode.course_id, _bucket)
+)
+_totals_source = (
+    select(SessionCode.course_id, Attendance.student_id, func.count(Attendance.id))
+    .join(SessionCode, SessionCode.id == Attendance.session_id)
+    .where(SessionCode.course_id.is_not(None))
+    .group_by(SessionCode.course_id, Attendance.student_id)
+)
+_rollups = (
+    (AttendanceDailyCount, AttendanceDailyCount.day, _daily_source),
+    (AttendanceBucketCount, AttendanceBucketCount.bucket_start, _bucket_source),
+    (StudentCourseTotal, StudentCourseTotal.student_id, _totals_source),
+)
+
+
+def rebuild_rollups(conn, models=None):
+    """
+    Recompute the rollup tables (all of them, or just `models`) from the
+    attendance table. Returns the number of rows written to each.
+    """
+    written = {}
+    for model, key, source in _rollups:
+        if models is not None and model not in models:
+            continue
+        conn.execute(delete(model))
+        result = conn.execute(
+            insert(model).from_select(
+                ["course_id", key.key, "attendance_count"], source
+            )
+        )
+        written[model.__tablename__] = result.rowcount
+    return written
+
+
+def check_rollups(conn):
+    """
+    Compare the rollup tables with the attendance table. Returns a list of
+    (table, course_id, key, expected, actual) for every row that differs.
+    """
+    mismatches = []
+    for model, key, source in _rollups:
+        expected = {(c, k): n for c, k, n in conn.execute(source)}
+        actual = {
+            (c, k): n
+            for c, k, n in conn.execute(
+                select(model.course_id, key, model.attendance_count)
+            )
+        }
+        for course_id, value in sorted(expected.keys() | actual.keys()):
+            want = expected.get((course_id, value), 0)
+            have = actual.get((course_id, value), 0)
+            if want != have:
+                mismatches.append((model.__tablename__, course_id, value, want, have))
+    return mismatches
+
+
+# Attendance rows deleted through the ORM (directly or by cascading from a
+# session, course or admin) are subtracted before the flush, while their
+# session still exists to tell which course they belonged to.
+@event.listens_for(Session, "before_flush")
+def _retract_deleted_attendance(session, flush_context, instances):
+    deleted = [obj for obj in session.deleted if isinstance(obj, Attendance)]
+    if deleted:
+        with session.no_autoflush:
+            records = [(a.session_id, a.student_id, a.timestamp) for a in deleted]
+            apply_attendance_delta(session, records, -1)
+
+
+@event.listens_for(Session, "after_flush")
+def _record_added_attendance(session, flush_context):
+    added = [obj for obj in session.new if isinstance(obj, Attendance)]
+    if added:
+        records = [(a.session_id, a.student_id, a.timestamp) for a in added]
+        apply_attendance_delta(session, records, 1)
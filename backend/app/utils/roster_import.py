@@ -0,0 +1,173 @@
+import csv
+import re
+from io import TextIOWrapper
+
+from sqlalchemy import or_, select
+
+from app.models import db, Student
+from app.utils.db import dialect_insert
+from app.utils.student_cache import clear_student_cache
+
+ROSTER_COLUMNS = ("index_number", "full_name", "email")
+ROSTER_CHUNK = 1000
+
+INDEX_NUMBER_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9/._-]{0,19}$")
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+class RosterFormatError(ValueError):
+    pass
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheets hand back numeric index numbers as floats
+        value = int(value)
+    return str(value).strip()
+
+
+def _records(header, rows):
+    keys = [_cell(h).lower() for h in header]
+    missing = [c for c in ROSTER_COLUMNS if c not in keys]
+    if missing:
+        raise RosterFormatError(f"Missing column(s): {', '.join(missing)}")
+    # Line 1 is the header
+    for line, values in enumerate(rows, start=2):
+        record = dict(zip(keys, values))
+        yield line, {c: _cell(record.get(c)) for c in ROSTER_COLUMNS}
+
+
+def read_csv_roster(stream):
+    reader = csv.reader(TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    header = next(reader, None)
+    if header is None:
+        raise RosterFormatError("File is empty")
+    return _records(header, reader)
+
+
+def read_xlsx_roster(stream):
+    from openpyxl import load_workbook
+
+    sheet = load_workbook(stream, read_only=True, data_only=True).active
+    rows = sheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        raise RosterFormatError("File is empty")
+    return _records(header, rows)
+
+
+def _validate(record):
+    if not all(record.values()):
+        return "index_number, full_name and email are required"
+    if not INDEX_NUMBER_RE.match(record["index_number"]):
+        return "Invalid index_number"
+    if len(record["email"]) > 100 or not EMAIL_RE.match(record["email"]):
+        return "Invalid email"
+    if len(record["full_name"]) > 100:
+        return "full_name is longer than 100 characters"
+    return None
+
+
+def _upsert_chunk(chunk, report):
+    index_numbers = [r["index_number"] for _, r in chunk]
+    emails = [r["email"] for _, r in chunk]
+    existing, email_owner = {}, {}
+    for index_number, full_name, email in db.session.execute(
+        select(Student.index_number, Student.full_name, Student.email).where(
+            or_(Student.index_number.in_(index_numbers), Student.email.in_(emails))
+        )
+    ):
+        existing[index_number] = (full_name, email)
+        email_owner[email] = index_number
+
+    rows = []
+    for line, record in chunk:
+        index_number = record["index_number"]
+        owner = email_owner.get(record["email"], index_number)
+        if owner != index_number:
+            report.reject(line, record, "Email belongs to another student")
+        elif index_number not in existing:
+            report.inserted += 1
+            rows.append(record)
+        elif existing[index_number] != (record["full_name"], record["email"]):
+            report.updated += 1
+            rows.append(record)
+        else:
+            report.unchanged += 1
+
+    if rows:
+        stmt = dialect_insert(db.session)(Student)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["index_number"],
+            set_={"full_name": stmt.excluded.full_name, "email": stmt.excluded.email},
+        )
+        db.session.execute(stmt, rows)
+    db.session.commit()
+
+
+class RosterReport:
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.errors = []
+
+    def reject(self, line, record, reason):
+        self.errors.append(
+            {"line": line, "index_number": record["index_number"], "reason": reason}
+        )
+
+    def as_dict(self):
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "rejected": len(self.errors),
+            "errors": sorted(self.errors, key=lambda e: e["line"]),
+        }
+
+
+def import_roster(records, progress=None):
+    """
+    Upsert (line, record) pairs keyed on index_number, ROSTER_CHUNK at a
+    time with one lookup and one executemany per chunk, each chunk committed
+    on its own. Rows that fail validation, repeat an index number or email
+    seen earlier in the file, or take another student's email are rejected.
+
+    Returns a RosterReport. `progress`, if given, is called with the number
+    of rows read so far after each chunk.
+    """
+    report = RosterReport()
+    seen_index, seen_email = set(), set()
+    chunk = []
+    read = 0
+    try:
+        for line, record in records:
+            read += 1
+            reason = _validate(record)
+            if reason is None and record["index_number"] in seen_index:
+                reason = "Duplicate index_number in file"
+            if reason is None and record["email"].lower() in seen_email:
+                reason = "Duplicate email in file"
+            if reason:
+                report.reject(line, record, reason)
+                continue
+
+            seen_index.add(record["index_number"])
+            seen_email.add(record["email"].lower())
+            chunk.append((line, record))
+            if len(chunk) >= ROSTER_CHUNK:
+                _upsert_chunk(chunk, report)
+                chunk = []
+                if progress:
+                    progress(read)
+        if chunk:
+            _upsert_chunk(chunk, report)
+        if progress:
+            progress(read)
+    finally:
+        # The upserts bypass the ORM events that evict cached students
+        clear_student_cache()
+    return report
@@ -0,0 +1,156 @@
+import time
+from collections import namedtuple
+from datetime import datetime
+from threading import Lock
+
+from app.models import SessionCode
+
+# Snapshot of the columns the mark-attendance path needs, safe to share
+# between threads and requests (unlike a SessionCode ORM instance).
+ActiveSession = namedtuple(
+    "ActiveSession",
+    [
+        "id",
+        "code",
+        "latitude",
+        "longitude",
+        "geo_radius",
+        "expires_at",
+        "created_at",
+        "course_id",
+        "admin_id",
+    ],
+)
+
+_sessions = {}
+# code -> time.monotonic() when the entry was last confirmed in the database.
+# Deletes made by another worker process (directly or by cascade) never reach
+# this registry, so entries older than _revalidate_after are re-read.
+_verified = {}
+_revalidate_after = 5.0
+_lock = Lock()
+
+
+def init_session_registry(app):
+    global _revalidate_after
+    _revalidate_after = app.config["SESSION_REGISTRY_TTL"]
+
+
+def _cache(session):
+    _sessions[session.code] = session
+    _verified[session.code] = time.monotonic()
+
+
+def _forget(code):
+    _sessions.pop(code, None)
+    _verified.pop(code, None)
+
+
+def _snapshot(session):
+    return ActiveSession(
+        id=session.id,
+        code=session.code,
+        latitude=session.latitude,
+        longitude=session.longitude,
+        geo_radius=session.geo_radius,
+        expires_at=session.expires_at,
+        created_at=session.created_at,
+        course_id=session.course_id,
+        admin_id=session.admin_id,
+    )
+
+
+def _evict_expired(now):
+    expired = [code for code, s in _sessions.items() if s.expires_at <= now]
+    for code in expired:
+        _forget(code)
+
+
+def load_active_sessions():
+    """
+    Replace the registry with every session that has not expired yet.
+    Must be called inside an app context.
+    """
+    now = datetime.utcnow()
+    active = SessionCode.query.filter(SessionCode.expires_at > now).all()
+    with _lock:
+        _sessions.clear()
+        _verified.clear()
+        for session in active:
+            _cache(_snapshot(session))
+    return len(active)
+
+
+def register_session(session):
+    """
+    Add a newly committed SessionCode to the registry.
+    """
+    now = datetime.utcnow()
+    with _lock:
+        _evict_expired(now)
+        if session.expires_at > now:
+            _cache(_snapshot(session))
+
+
+def unregister_session(code):
+    """
+    Drop a session from the registry, e.g. after it was deleted.
+    """
+    with _lock:
+        _forget(code)
+
+
+def unregister_sessions(course_id=None, admin_id=None):
+    """
+    Drop every cached session of a course or admin, used when the owning
+    row is deleted and its sessions go with it through the cascade.
+    """
+    with _lock:
+        stale = [
+            code
+            for code, s in _sessions.items()
+            if (course_id is not None and s.course_id == course_id)
+            or (admin_id is not None and s.admin_id == admin_id)
+        ]
+        for code in stale:
+            _forget(code)
+
+
+def is_live_code(code):
+    """
+    Whether a code belongs to a session in the registry that has not expired.
+    """
+    with _lock:
+        session = _sessions.get(code)
+        return session is not None and session.expires_at > datetime.utcnow()
+
+
+def lookup_session(code):
+    """
+    Resolve a session code to an ActiveSession, or None if it does not exist.
+
+    Live codes are answered from memory for up to SESSION_REGISTRY_TTL
+    seconds after they were last read from the database. Unknown or stale
+    codes fall back to the database, so sessions created or deleted by
+    another worker process are seen; the result is cached if it is still
+    active. Expired sessions are returned as-is so callers can report expiry
+    instead of "invalid code".
+    """
+    now = datetime.utcnow()
+    with _lock:
+        session = _sessions.get(code)
+        if session is not None:
+            fresh = time.monotonic() - _verified[code] < _revalidate_after
+            if session.expires_at > now and fresh:
+                return session
+            _forget(code)
+
+    row = SessionCode.query.filter_by(code=code).first()
+    if row is None:
+        return None
+
+    session = _snapshot(row)
+    if session.expires_at > now:
+        with _lock:
+            _cache(session)
+    return session
@@ -0,0 +1,74 @@
+from collections import namedtuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.models import Student
+from app.utils.cache import TTLCache, MISSING
+
+StudentIdentity = namedtuple(
+    "StudentIdentity", ["id", "index_number", "email", "full_name"]
+)
+
+# One entry per student keyed by index number; sized via STUDENT_CACHE_SIZE
+_cache = TTLCache(maxsize=50_000, ttl=600)
+
+
+def init_student_cache(app):
+    _cache.configure(app.config["STUDENT_CACHE_SIZE"], app.config["STUDENT_CACHE_TTL"])
+
+
+def lookup_student(index_number, email):
+    """
+    Resolve a student by index number and email, or None if they do not match.
+    """
+    student = _cache.get(index_number)
+    if student is MISSING:
+        # Read before the query: an eviction while it runs means the row
+        # may predate a commit, so it is returned but not cached
+        generation = _cache.generation
+        row = Student.query.filter_by(index_number=index_number).first()
+        if row is None:
+            return None
+        student = StudentIdentity(row.id, row.index_number, row.email, row.full_name)
+        _cache.set(index_number, student, generation)
+    return student if student.email == email else None
+
+
+def invalidate_student(index_number):
+    _cache.pop(index_number)
+
+
+def clear_student_cache():
+    """
+    Drop every cached student, e.g. after a bulk import that bypasses the ORM.
+    """
+    _cache.clear()
+
+
+def student_cache_stats():
+    return _cache.stats()
+
+
+# ORM changes to Student rows are collected at flush time and evicted once
+# the transaction commits. A lookup that read the old row before the commit
+# sees the cache generation change and does not store it.
+@event.listens_for(Session, "after_flush")
+def _collect_changed_students(session, flush_context):
+    stale = session.info.setdefault("stale_students", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Student):
+            stale.add(obj.index_number)
+            # A renamed index number must evict the old key as well
+            stale.update(inspect(obj).attrs.index_number.history.deleted or ())
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_changed_students(session):
+    for index_number in session.info.pop("stale_students", ()):
+        _cache.pop(index_number)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_students(session):
+    session.info.pop("stale_students", None)
@@ -0,0 +1,140 @@
+import logging
+import queue
+import time
+from concurrent.futures import Future
+from threading import Lock, Thread
+
+from flask import current_app
+
+from app.models import db
+from app.utils.attendance_writer import insert_attendance
+
+logger = logging.getLogger(__name__)
+
+
+class AttendanceWriteBuffer:
+    """
+    Write-behind queue that coalesces attendance inserts into group commits.
+
+    Request threads submit a row and wait on the returned Future, which only
+    resolves once the batch containing the row has been committed: True if
+    the row was inserted, False if the student was already marked for the
+    session. A single writer thread drains the queue, waiting at most
+    `max_delay` seconds after the first row to fill a batch of `max_batch`.
+    """
+
+    def __init__(self, app, max_batch=200, max_delay=0.005):
+        self.app = app
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._lock = Lock()
+        self._started_at = time.monotonic()
+        self._batches = 0
+        self._rows = 0
+        self._duplicates = 0
+        self._failures = 0
+        self._largest_batch = 0
+        self._commit_seconds = 0.0
+
+        self._thread = Thread(
+            target=self._run, name="attendance-write-buffer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, row):
+        future = Future()
+        self._queue.put((row, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            with self.app.app_context():
+                try:
+                    self._flush(batch)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.exception("Attendance group commit failed")
+                    with self._lock:
+                        self._failures += len(batch)
+                    for _, future in batch:
+                        future.set_exception(e)
+                finally:
+                    db.session.remove()
+
+    def _flush(self, batch):
+        started = time.perf_counter()
+        pending = insert_attendance([row for row, _ in batch])
+        db.session.commit()
+        elapsed = time.perf_counter() - started
+
+        # The first submission of a (student, session) pair wins
+        inserted = []
+        for row, _ in batch:
+            key = (row["student_id"], row["session_id"])
+            inserted.append(key in pending)
+            pending.discard(key)
+
+        with self._lock:
+            self._batches += 1
+            self._rows += inserted.count(True)
+            self._duplicates += inserted.count(False)
+            self._largest_batch = max(self._largest_batch, len(batch))
+            self._commit_seconds += elapsed
+
+        for (_, future), ok in zip(batch, inserted):
+            future.set_result(ok)
+
+    def stats(self):
+        with self._lock:
+            uptime = time.monotonic() - self._started_at
+            return {
+                "enabled": True,
+                "queued": self._queue.qsize(),
+                "batches": self._batches,
+                "rows_committed": self._rows,
+                "duplicates": self._duplicates,
+                "failed_rows": self._failures,
+                "largest_batch": self._largest_batch,
+                "avg_batch_size": (
+                    round((self._rows + self._duplicates) / self._batches, 2)
+                    if self._batches
+                    else 0
+                ),
+                "avg_commit_ms": (
+                    round(self._commit_seconds / self._batches * 1000, 3)
+                    if self._batches
+                    else 0
+                ),
+                "rows_per_second": round(self._rows / uptime, 2) if uptime else 0,
+            }
+
+
+def init_write_buffer(app):
+    """
+    Start the attendance write buffer if ATTENDANCE_GROUP_COMMIT is enabled.
+    """
+    if not app.config["ATTENDANCE_GROUP_COMMIT"]:
+        return None
+    buffer = AttendanceWriteBuffer(
+        app,
+        max_batch=app.config["ATTENDANCE_GROUP_COMMIT_MAX_BATCH"],
+        max_delay=app.config["ATTENDANCE_GROUP_COMMIT_DELAY_MS"] / 1000,
+    )
+    app.extensions["attendance_write_buffer"] = buffer
+    return buffer
+
+
+def get_write_buffer():
+    return current_app.extensions.get("attendance_write_buffer")
@@ -0,0 +1,175 @@
+"""
+Benchmarks for the hot paths, run from backend/ as
+
+    python -m benchmarks.<module> [options]
+
+Each builds its own database in a temporary instance folder and prints a
+small table; nothing here runs as part of the test suite.
+"""
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert, select
+
+from app import create_app
+from app.extensions import db
+from app.models import Admin, Attendance, Course, SessionCode, Student
+from app.utils.rollups import rebuild_rollups
+
+INSERT_CHUNK = 10_000
+
+
+@contextmanager
+def temporary_app(**config):
+    """An app with a fresh database, inside an app context."""
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app(
+            test_config={
+                "SESSION_REAPER_INTERVAL": 0,
+                "SESSION_CODE_KEY": "benchmark",
+                "JWT_SECRET_KEY": "benchmark-secret-key-of-at-least-32-bytes",
+                **config,
+            },
+            instance_path=directory,
+        )
+        try:
+            with app.app_context():
+                yield app
+        finally:
+            with app.app_context():
+                db.engine.dispose()
+
+
+def bulk_insert(model, rows):
+    """Core executemany of `rows` (an iterable of dicts) in chunks."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= INSERT_CHUNK:
+            db.session.execute(insert(model), chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(insert(model), chunk)
+    db.session.commit()
+
+
+def add_admin(email="bench@example.com", password="bench-password"):
+    admin = Admin(full_name="Benchmark", email=email)
+    admin.set_password(password)
+    db.session.add(admin)
+    db.session.commit()
+    return admin.id
+
+
+def seed_attendance(admin_id, courses, sessions, students, per_session):
+    """
+    `courses` courses of `admin_id` sharing `sessions` sessions six hours
+    apart, each marked by a window of `per_session` of the `students`
+    students. Attendance is bulk inserted, so the rollups are rebuilt
+    afterwards. Returns the course ids.
+    """
+    course_rows = [
+        Course(
+            course_code=f"BENCH{i:03d}", course_name=f"Bench {i}", lecturer_id=admin_id
+        )
+        for i in range(courses)
+    ]
+    db.session.add_all(course_rows)
+    db.session.commit()
+    course_ids = [c.id for c in course_rows]
+
+    bulk_insert(
+        Student,
+        (
+            {
+                "index_number": f"UEB{i:07d}",
+                "full_name": f"Student {i}",
+                "email": f"student{i}@example.com",
+            }
+            for i in range(students)
+        ),
+    )
+    student_ids = db.session.scalars(select(Student.id).order_by(Student.id)).all()
+    start = datetime(2025, 1, 6, 8)
+    bulk_insert(
+        SessionCode,
+        (
+            {
+                "code": f"B{i:07d}",
+                "created_at": start + timedelta(hours=6 * i),
+                "expires_at": start + timedelta(hours=6 * i + 2),
+                "latitude": 5.6037,
+                "longitude": -0.187,
+                "admin_id": admin_id,
+                "course_id": course_ids[i % courses],
+            }
+            for i in range(sessions)
+        ),
+    )
+    session_rows = db.session.execute(
+        select(SessionCode.id, SessionCode.created_at).order_by(SessionCode.id)
+    ).all()
+    bulk_insert(
+        Attendance,
+        (
+            {
+                "student_id": student_ids[(i * per_session + k) % students],
+                "session_id": session_id,
+                "timestamp": created_at + timedelta(seconds=k),
+                "student_latitude": 5.6037,
+                "student_longitude": -0.187,
+                "status": "present",
+            }
+            for i, (session_id, created_at) in enumerate(session_rows)
+            for k in range(per_session)
+        ),
+    )
+    rebuild_rollups(db.session.connection())
+    db.session.commit()
+    return course_ids
+
+
+@contextmanager
+def stopwatch():
+    """Yields a list that holds the elapsed seconds once the block exits."""
+    elapsed = []
+    start = time.perf_counter()
+    try:
+        yield elapsed
+    finally:
+        elapsed.append(time.perf_counter() - start)
+
+
+_UNITS = {"s": 1, "ms": 1e3, "us": 1e6}
+
+
+def summarise(samples, unit="us"):
+    """Median, p95 and p99 of a list of durations in seconds, in `unit`."""
+    ordered = sorted(samples)
+    cut = statistics.quantiles(ordered, n=100) if len(ordered) > 1 else ordered * 99
+    scale = _UNITS[unit]
+    return {
+        f"p50_{unit}": round(statistics.median(ordered) * scale, 1),
+        f"p95_{unit}": round(cut[94] * scale, 1),
+        f"p99_{unit}": round(cut[98] * scale, 1),
+    }
+
+
+def auth_headers(admin_id):
+    token = create_access_token(identity=str(admin_id))
+    return {"Authorization": f"Bearer {token}"}
+
+
+def print_table(rows):
+    """Print a list of dicts with the same keys as aligned columns."""
+    if not rows:
+        return
+    keys = list(rows[0])
+    widths = [max(len(str(k)), *(len(str(r[k])) for r in rows)) for k in keys]
+    print("  ".join(str(k).rjust(w) for k, w in zip(keys, widths)))
+    for row in rows:
+        print("  ".join(str(row[k]).rjust(w) for k, w in zip(keys, widths)))
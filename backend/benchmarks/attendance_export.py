@@ -0,0 +1,122 @@
+"""
+GET /attendance/export over 1M attendance rows, plain and gzip: time,
+output size and peak Python allocation while streaming.
+
+Compares the column-only Core stream with the ORM export it replaced, which
+loaded each row's student lazily and formatted lines by hand. That one is
+only run over the first --legacy-rows rows; it needs minutes for all of them.
+
+    python -m benchmarks.attendance_export [--rows 1000000] [--legacy-rows N]
+"""
+import argparse
+import itertools
+import time
+import tracemalloc
+
+from sqlalchemy import or_
+
+from app.extensions import db
+from app.models import Attendance, Course, CourseRepAccess, SessionCode, Student
+from benchmarks import (
+    add_admin,
+    auth_headers,
+    print_table,
+    seed_attendance,
+    stopwatch,
+    temporary_app,
+)
+
+
+def legacy_export(admin_id):
+    """The previous export: ORM rows, one lazy Student load per row."""
+    records = (
+        Attendance.query.join(SessionCode)
+        .join(Course)
+        .join(Student)
+        .filter(
+            or_(
+                Course.lecturer_id == admin_id,
+                Course.id.in_(
+                    db.session.query(CourseRepAccess.course_id).filter(
+                        CourseRepAccess.rep_id == admin_id
+                    )
+                ),
+            )
+        )
+        .yield_per(100)
+    )
+    yield "Index Number,Session ID,Timestamp,Status\n"
+    for r in records:
+        yield f"{r.student.index_number},{r.session_id},{r.timestamp},{r.status}\n"
+
+
+def drain(chunks, trace):
+    """Consume a stream; returns (seconds, bytes, peak MB or None)."""
+    if trace:
+        tracemalloc.start()
+    size = 0
+    start = time.perf_counter()
+    for chunk in chunks:
+        size += len(chunk)
+    elapsed = time.perf_counter() - start
+    peak = None
+    if trace:
+        peak = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        tracemalloc.stop()
+    return round(elapsed, 2), size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--per-session", type=int, default=1000)
+    parser.add_argument("--legacy-rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with temporary_app() as app:
+        with stopwatch() as seeding:
+            admin_id = add_admin()
+            seed_attendance(
+                admin_id,
+                10,
+                args.rows // args.per_session,
+                args.students,
+                args.per_session,
+            )
+        print(f"seeded {args.rows} rows in {seeding[0]:.0f}s")
+
+        client = app.test_client()
+        headers = auth_headers(admin_id)
+        rows = []
+        for name, url in (
+            ("csv", "/attendance/export"),
+            ("csv.gz", "/attendance/export?compress=gzip"),
+        ):
+            # Timed without tracemalloc, which slows every allocation down
+            for trace in (False, True):
+                response = client.get(url, headers=headers, buffered=False)
+                seconds, size, peak = drain(response.response, trace)
+                response.close()
+                if not trace:
+                    timing = {"seconds": seconds, "MB": round(size / 2**20, 1)}
+            rows.append({"export": name, "rows": args.rows, **timing, "peak_MB": peak})
+
+        if args.legacy_rows:
+            # The header line plus legacy_rows rows
+            chunks = itertools.islice(legacy_export(admin_id), args.legacy_rows + 1)
+            seconds, size, _ = drain(chunks, False)
+            rows.append(
+                {
+                    "export": "legacy csv",
+                    "rows": args.legacy_rows,
+                    "seconds": seconds,
+                    "MB": round(size / 2**20, 1),
+                    "peak_MB": None,
+                }
+            )
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
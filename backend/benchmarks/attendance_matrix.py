@@ -0,0 +1,122 @@
+"""
+GET /attendance/course/<id>/matrix for a course of 500 students x 60
+sessions, in both encodings, and build_matrix on its own.
+
+    python -m benchmarks.attendance_matrix [--students 500] [--sessions 60]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import Attendance, Course, SessionCode, Student
+from app.utils.attendance_matrix import build_matrix
+from benchmarks import (
+    add_admin,
+    auth_headers,
+    bulk_insert,
+    print_table,
+    summarise,
+    temporary_app,
+)
+
+ATTENDANCE_RATE = 0.85
+
+
+def seed(students, sessions):
+    admin_id = add_admin()
+    course = Course(course_code="BENCH101", course_name="Bench", lecturer_id=admin_id)
+    db.session.add(course)
+    db.session.commit()
+
+    bulk_insert(
+        Student,
+        (
+            {
+                "index_number": f"UEB{i:07d}",
+                "full_name": f"Student {i}",
+                "email": f"student{i}@example.com",
+            }
+            for i in range(students)
+        ),
+    )
+    start = datetime(2025, 1, 6, 8)
+    bulk_insert(
+        SessionCode,
+        (
+            {
+                "code": f"M{i:05d}",
+                "created_at": start + timedelta(days=i),
+                "expires_at": start + timedelta(days=i, hours=2),
+                "latitude": 5.6037,
+                "longitude": -0.187,
+                "admin_id": admin_id,
+                "course_id": course.id,
+            }
+            for i in range(sessions)
+        ),
+    )
+    rng = random.Random(0)
+    pairs = [
+        (student_id, session_id)
+        for student_id in range(1, students + 1)
+        for session_id in range(1, sessions + 1)
+        if rng.random() < ATTENDANCE_RATE
+    ]
+    bulk_insert(
+        Attendance,
+        (
+            {
+                "student_id": student_id,
+                "session_id": session_id,
+                "timestamp": start + timedelta(days=session_id - 1, minutes=10),
+                "status": "present",
+            }
+            for student_id, session_id in pairs
+        ),
+    )
+    return admin_id, course.id, pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--sessions", type=int, default=60)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    with temporary_app() as app:
+        admin_id, course_id, pairs = seed(args.students, args.sessions)
+        headers = auth_headers(admin_id)
+        client = app.test_client()
+
+        rows = []
+        for fmt in ("json", "compact"):
+            url = f"/attendance/course/{course_id}/matrix?format={fmt}"
+            size = len(client.get(url, headers=headers).data)
+            samples = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                response = client.get(url, headers=headers)
+                samples.append(time.perf_counter() - start)
+                assert response.status_code == 200
+            rows.append(
+                {"what": f"GET format={fmt}", "bytes": size, **summarise(samples, "ms")}
+            )
+
+        student_ids = list(range(1, args.students + 1))
+        session_ids = list(range(1, args.sessions + 1))
+        samples = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            build_matrix(student_ids, session_ids, pairs)
+            samples.append(time.perf_counter() - start)
+        rows.append({"what": "build_matrix", "bytes": "-", **summarise(samples, "ms")})
+
+    print(f"{args.students} students x {args.sessions} sessions, {len(pairs)} marks")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
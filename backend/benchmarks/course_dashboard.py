@@ -0,0 +1,113 @@
+"""
+Course dashboard endpoints over one course with 1M attendance rows (500
+sessions x 2000 students): latency and SQL statements per request.
+
+Compares the rollup aggregate behind course-summary and top-students with
+the raw joins over attendance that it replaced.
+
+    python -m benchmarks.course_dashboard [--sessions 500] [--students 2000]
+"""
+import argparse
+import time
+from functools import partial
+
+from sqlalchemy import event, func
+
+from app.extensions import db
+from app.models import Attendance, SessionCode
+from benchmarks import (
+    add_admin,
+    auth_headers,
+    print_table,
+    seed_attendance,
+    stopwatch,
+    summarise,
+    temporary_app,
+)
+
+
+def raw_summary_and_top(course_id, limit=10):
+    """course-summary and top-students as they were: joins over attendance."""
+    in_course = Attendance.query.join(SessionCode).filter(
+        SessionCode.course_id == course_id
+    )
+    summary = {
+        "sessions_count": SessionCode.query.filter_by(course_id=course_id).count(),
+        "total_attendance": in_course.count(),
+        "students_marked": in_course.with_entities(
+            func.count(func.distinct(Attendance.student_id))
+        ).scalar(),
+    }
+    top = (
+        db.session.query(Attendance.student_id, func.count(Attendance.id))
+        .join(SessionCode)
+        .filter(SessionCode.course_id == course_id)
+        .group_by(Attendance.student_id)
+        .order_by(func.count(Attendance.id).desc())
+        .limit(limit)
+        .all()
+    )
+    return summary, top
+
+
+def measure(call, count, statements):
+    samples = []
+    statements.clear()
+    for _ in range(count):
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return {"statements": len(statements) / count, **summarise(samples, "ms")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--raw-requests", type=int, default=5)
+    args = parser.parse_args()
+
+    with temporary_app() as app:
+        with stopwatch() as seeding:
+            admin_id = add_admin()
+            (course_id,) = seed_attendance(
+                admin_id, 1, args.sessions, args.students, args.students
+            )
+        rows_seeded = args.sessions * args.students
+        print(f"seeded {rows_seeded} rows in {seeding[0]:.0f}s")
+
+        client = app.test_client()
+        headers = auth_headers(admin_id)
+        statements = []
+        event.listen(
+            db.engine, "before_cursor_execute", lambda *a: statements.append(a[2])
+        )
+
+        rows = []
+        for name, url, count in (
+            ("course-summary", f"/dashboard/course-summary/{course_id}", args.requests),
+            ("top-students", f"/dashboard/top-students/{course_id}", args.requests),
+            # Geo insights read every position of the course, so far fewer
+            ("course-dashboard", f"/dashboard/course-dashboard/{course_id}", 5),
+        ):
+            # Warm the identity cache first
+            assert client.get(url, headers=headers).status_code == 200
+            request = partial(client.get, url, headers=headers)
+            rows.append({"endpoint": name, **measure(request, count, statements)})
+
+        rows.append(
+            {
+                "endpoint": "raw summary + top",
+                **measure(
+                    lambda: raw_summary_and_top(course_id),
+                    args.raw_requests,
+                    statements,
+                ),
+            }
+        )
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
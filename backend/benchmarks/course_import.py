@@ -0,0 +1,130 @@
+"""
+POST /courses/import with a 200k-row CSV holding 200 repeated codes: time,
+SQL statements and peak Python allocation, then the same file again, when
+every row is a duplicate.
+
+Compares the chunked import with the one it replaced, which decoded the
+whole upload and looked up each code with its own query. That one is only
+run over the first --legacy-rows rows.
+
+    python -m benchmarks.course_import [--rows 200000] [--legacy-rows 20000]
+"""
+import argparse
+import csv
+import io
+import time
+import tracemalloc
+
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import Course
+from benchmarks import add_admin, auth_headers, print_table, temporary_app
+
+DUPLICATES = 200
+
+
+def course_csv(rows):
+    """`rows` distinct courses with every 1000th code repeated at the end."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["course_code", "course_name", "department", "semester"])
+    for i in range(rows):
+        writer.writerow([f"C{i:07d}", f"Course {i}", f"Department {i % 40}", "1"])
+    for i in range(0, min(rows, DUPLICATES * 1000), 1000):
+        writer.writerow([f"C{i:07d}", "Repeated", "", ""])
+    return out.getvalue().encode()
+
+
+def legacy_import(data, admin_id):
+    """The previous import: one query per row and a single commit."""
+    reader = csv.DictReader(io.StringIO(data.decode("UTF8")))
+    imported = 0
+    for row in reader:
+        if Course.query.filter_by(course_code=row["course_code"].strip()).first():
+            continue
+        db.session.add(
+            Course(
+                course_code=row["course_code"].strip(),
+                course_name=row["course_name"].strip(),
+                department=row.get("department", "").strip(),
+                semester=row.get("semester", "").strip(),
+                lecturer_id=admin_id,
+            )
+        )
+        imported += 1
+    db.session.commit()
+    return imported
+
+
+def timed(call, statements, trace=False):
+    statements.clear()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    imported = call()
+    elapsed = round(time.perf_counter() - start, 2)
+    peak = None
+    if trace:
+        peak = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+        tracemalloc.stop()
+    return {
+        "imported": imported,
+        "seconds": elapsed,
+        "statements": len(statements),
+        "peak_MB": peak,
+    }
+
+
+def counting(app):
+    statements = []
+    with app.app_context():
+        event.listen(
+            db.engine, "before_cursor_execute", lambda *a: statements.append(a[2])
+        )
+    return statements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--legacy-rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    data = course_csv(args.rows)
+    print(f"{args.rows} rows plus {DUPLICATES} repeats, {len(data) / 2**20:.1f} MB")
+    rows = []
+
+    with temporary_app() as app:
+        admin_id = add_admin()
+        client = app.test_client()
+        headers = auth_headers(admin_id)
+        statements = counting(app)
+
+        def upload():
+            response = client.post(
+                "/courses/import",
+                data={"file": (io.BytesIO(data), "courses.csv")},
+                headers=headers,
+                content_type="multipart/form-data",
+            )
+            return response.get_json()["imported"]
+
+        rows.append({"import": "chunked", **timed(upload, statements)})
+        rows.append({"import": "chunked, again", **timed(upload, statements)})
+        db.session.execute(db.delete(Course))
+        db.session.commit()
+        rows.append({"import": "chunked, traced", **timed(upload, statements, True)})
+
+    if args.legacy_rows:
+        legacy_data = course_csv(args.legacy_rows)
+        with temporary_app() as app:
+            admin_id = add_admin()
+            statements = counting(app)
+            result = timed(lambda: legacy_import(legacy_data, admin_id), statements)
+            rows.append({"import": f"legacy, {args.legacy_rows} rows", **result})
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+GET /dashboard/summary for an admin with 50 courses, 2000 sessions and 2M
+attendance rows: latency and SQL statements per request.
+
+Compares the single statement over the rollup tables with the four queries
+over the attendance table that it replaced.
+
+    python -m benchmarks.dashboard_summary [--rows 2000000] [--requests 200]
+"""
+import argparse
+import time
+
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import Attendance, Course, CourseRepAccess, SessionCode, Student
+from benchmarks import (
+    add_admin,
+    auth_headers,
+    print_table,
+    seed_attendance,
+    stopwatch,
+    summarise,
+    temporary_app,
+)
+
+
+def raw_summary(admin_id):
+    """The summary as it was computed before the rollups: four queries."""
+    accessible = (
+        db.session.query(Course.id)
+        .outerjoin(CourseRepAccess, Course.id == CourseRepAccess.course_id)
+        .filter((Course.lecturer_id == admin_id) | (CourseRepAccess.rep_id == admin_id))
+        .distinct()
+    )
+    return {
+        "courses": accessible.count(),
+        "sessions": db.session.query(SessionCode)
+        .filter(SessionCode.course_id.in_(accessible))
+        .count(),
+        "attendance_records": db.session.query(Attendance)
+        .join(SessionCode)
+        .filter(SessionCode.course_id.in_(accessible))
+        .count(),
+        "students_marked": db.session.query(Student)
+        .join(Attendance)
+        .join(SessionCode)
+        .filter(SessionCode.course_id.in_(accessible))
+        .distinct()
+        .count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--courses", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--raw-requests", type=int, default=5)
+    args = parser.parse_args()
+
+    with temporary_app() as app:
+        with stopwatch() as seeding:
+            admin_id = add_admin()
+            seed_attendance(
+                admin_id,
+                args.courses,
+                args.sessions,
+                args.students,
+                args.rows // args.sessions,
+            )
+        print(f"seeded {args.rows} rows in {seeding[0]:.0f}s")
+
+        client = app.test_client()
+        headers = auth_headers(admin_id)
+        statements = []
+        event.listen(
+            db.engine, "before_cursor_execute", lambda *a: statements.append(a[2])
+        )
+
+        # The first request fills the identity and course access caches
+        expected = client.get("/dashboard/summary", headers=headers).get_json()
+        samples = []
+        statements.clear()
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            response = client.get("/dashboard/summary", headers=headers)
+            samples.append(time.perf_counter() - start)
+            assert response.get_json() == expected
+        rows = [
+            {
+                "summary": "rollups, 1 statement",
+                "statements": len(statements) / args.requests,
+                **summarise(samples, "ms"),
+            }
+        ]
+
+        samples = []
+        statements.clear()
+        for _ in range(args.raw_requests):
+            start = time.perf_counter()
+            assert raw_summary(admin_id) == expected
+            samples.append(time.perf_counter() - start)
+        rows.append(
+            {
+                "summary": "attendance, 4 queries",
+                "statements": len(statements) / args.raw_requests,
+                **summarise(samples, "ms"),
+            }
+        )
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
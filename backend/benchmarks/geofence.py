@@ -0,0 +1,89 @@
+"""
+Geofence check latency: app/utils/geo.py against geopy's geodesic.
+
+Points are drawn around a campus fence in three groups: well inside or
+outside (decided by the bounding box or the planar distance), on the radius
+boundary (where the exact geodesic decides) and kilometres away. Also times
+check_geofence_many over a full bulk upload.
+
+    python -m benchmarks.geofence [--points 20000] [--radius 50]
+"""
+import argparse
+import random
+import time
+
+from geopy.distance import geodesic
+
+from app.routes.attendance import MAX_BULK_SUBMISSIONS
+from app.utils.geo import check_geofence, check_geofence_many
+from benchmarks import print_table, summarise
+
+CENTRE = (5.6037, -0.187)
+
+
+def points(count, radius, spread, rng):
+    """`count` points at `spread` (low, high) multiples of the radius."""
+    out = []
+    for _ in range(count):
+        offset = geodesic(meters=radius * rng.uniform(*spread))
+        point = offset.destination(CENTRE, bearing=rng.uniform(0, 360))
+        out.append((point.latitude, point.longitude))
+    return out
+
+
+def geodesic_check(lat, lon, centre_lat, centre_lon, radius):
+    """What mark-attendance did before: one geodesic per check."""
+    distance = geodesic((lat, lon), (centre_lat, centre_lon)).meters
+    return distance <= radius, distance
+
+
+def measure(check, sample, radius):
+    samples = []
+    for lat, lon in sample:
+        start = time.perf_counter()
+        check(lat, lon, *CENTRE, radius)
+        samples.append(time.perf_counter() - start)
+    return summarise(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--points", type=int, default=20_000)
+    parser.add_argument("--radius", type=float, default=50.0)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    groups = {
+        "inside/outside": (0.0, 3.0),
+        "boundary": (0.99995, 1.00005),
+        "far (1-20 km)": (20.0, 400.0),
+    }
+    rows = []
+    for name, spread in groups.items():
+        sample = points(args.points, args.radius, spread, rng)
+        for checker, check in (
+            ("geo.py", check_geofence),
+            ("geodesic", geodesic_check),
+        ):
+            timings = measure(check, sample, args.radius)
+            rows.append({"points": name, "check": checker, **timings})
+
+    sample = points(MAX_BULK_SUBMISSIONS, args.radius, (0.0, 3.0), rng)
+    lats, lons = zip(*sample)
+    samples = []
+    for _ in range(200):
+        start = time.perf_counter()
+        check_geofence_many(lats, lons, *CENTRE, args.radius)
+        samples.append(time.perf_counter() - start)
+    rows.append(
+        {
+            "points": f"bulk of {MAX_BULK_SUBMISSIONS}",
+            "check": "geo.py many",
+            **summarise(samples),
+        }
+    )
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from app.extensions import db
+from app.models import Admin
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    apps = []
+
+    def make(**config):
+        config = {
+            "TESTING": True,
+            "JWT_SECRET_KEY": "test-secret-key-of-at-least-32-bytes",
+            "SESSION_CODE_KEY": "test-session-code-key",
+            "SESSION_REAPER_INTERVAL": 0,
+            **config,
+        }
+        app = create_app(test_config=config, instance_path=str(tmp_path))
+        apps.append(app)
+        return app
+
+    yield make
+    for app in apps:
+        with app.app_context():
+            db.engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_admin(app):
+    """Create an admin; returns (admin_id, Authorization headers)."""
+
+    def make(email="lecturer@example.com", full_name="Lecturer"):
+        with app.app_context():
+            admin = Admin(full_name=full_name, email=email)
+            admin.set_password("secret")
+            db.session.add(admin)
+            db.session.commit()
+            token = create_access_token(identity=str(admin.id))
+            return admin.id, {"Authorization": f"Bearer {token}"}
+
+    return make
+
+
+@pytest.fixture
+def wait_for_job(client):
+    """Poll a job's status URL until it finishes; returns the job dict."""
+
+    def wait(location, headers, timeout=10):
+        deadline = time.monotonic() + timeout
+        while True:
+            job = client.get(location, headers=headers).get_json()["job"]
+            if job["status"] not in ("queued", "running"):
+                return job
+            if time.monotonic() > deadline:
+                raise AssertionError(f"Job still {job['status']} after {timeout}s")
+            time.sleep(0.02)
+
+    return wait
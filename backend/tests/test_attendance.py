@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from threading import Barrier
+
+import pytest
+
+from app.extensions import db
+from app.models import (
+    Admin,
+    Attendance,
+    Course,
+    SessionCode,
+    Student,
+    StudentCourseTotal,
+)
+
+THREADS = 16
+
+
+def _seed():
+    admin = Admin(full_name="Lecturer", email="lecturer@example.com")
+    admin.set_password("secret")
+    student = Student(
+        index_number="UEB0000001", full_name="Ama Mensah", email="ama@example.com"
+    )
+    db.session.add_all([admin, student])
+    db.session.flush()
+    course = Course(course_code="CE101", course_name="Surveying", lecturer_id=admin.id)
+    db.session.add(course)
+    db.session.flush()
+    session = SessionCode(
+        code="ABC123",
+        expires_at=datetime.utcnow() + timedelta(hours=1),
+        latitude=5.6037,
+        longitude=-0.187,
+        geo_radius=50.0,
+        admin_id=admin.id,
+        course_id=course.id,
+    )
+    db.session.add(session)
+    db.session.commit()
+    return session.id, course.id, student.id
+
+
+@pytest.mark.parametrize("group_commit", [False, True])
+def test_concurrent_marks_insert_once(make_app, group_commit):
+    app = make_app(ATTENDANCE_GROUP_COMMIT=group_commit)
+    with app.app_context():
+        session_id, course_id, student_id = _seed()
+
+    barrier = Barrier(THREADS)
+    payload = {
+        "session_code": "ABC123",
+        "index_number": "UEB0000001",
+        "email": "ama@example.com",
+        "latitude": 5.6037,
+        "longitude": -0.187,
+    }
+
+    def mark(_):
+        client = app.test_client()
+        barrier.wait()
+        return client.post("/attendance/mark-attendance", json=payload).status_code
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        statuses = sorted(pool.map(mark, range(THREADS)))
+
+    assert statuses == [201] + [409] * (THREADS - 1)
+    with app.app_context():
+        assert Attendance.query.filter_by(session_id=session_id).count() == 1
+        # The rollups count the single insert, not the rejected duplicates
+        total = db.session.get(StudentCourseTotal, (course_id, student_id))
+        assert total.attendance_count == 1
@@ -0,0 +1,169 @@
+import csv
+import gzip
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models import Admin, Attendance, Course, CourseRepAccess, SessionCode, Student
+from app.routes import attendance
+
+HEADER = ["Index Number", "Session ID", "Timestamp", "Status"]
+START = datetime(2025, 3, 3, 8)
+
+
+@pytest.fixture
+def seeded(app, make_admin):
+    """
+    Attendance in a course of the caller, in a course they are a rep of and
+    in a stranger's course. Some index numbers and statuses need quoting.
+    Returns the caller's headers, the course ids and the expected CSV rows.
+    """
+    admin_id, headers = make_admin()
+    with app.app_context():
+        other = Admin(full_name="Other", email="other@example.com")
+        other.set_password("secret")
+        db.session.add(other)
+        db.session.flush()
+        owners = {"OWN": admin_id, "REP": other.id, "NO": other.id}
+        courses = [
+            Course(course_code=code, course_name=code, lecturer_id=lecturer)
+            for code, lecturer in owners.items()
+        ]
+        db.session.add_all(courses)
+        db.session.flush()
+        db.session.add(CourseRepAccess(rep_id=admin_id, course_id=courses[1].id))
+        students = [
+            Student(index_number=index, full_name=index, email=f"{i}@ex.io")
+            for i, index in enumerate(
+                ["UEB001", "UEB,002", 'UEB"003"', "UEB 004", "UEB\n005"]
+            )
+        ]
+        db.session.add_all(students)
+        db.session.flush()
+
+        expected = {course.id: [] for course in courses}
+        for i, course in enumerate(courses * 2):
+            session = SessionCode(
+                code=f"EXP{i}",
+                created_at=START + timedelta(days=i),
+                expires_at=START + timedelta(days=i, hours=1),
+                latitude=5.6,
+                longitude=-0.18,
+                admin_id=course.lecturer_id,
+                course_id=course.id,
+            )
+            db.session.add(session)
+            db.session.flush()
+            for j, student in enumerate(students):
+                status = ["present", 'late, "excused"', "late,early"][j % 3]
+                record = Attendance(
+                    student_id=student.id,
+                    session_id=session.id,
+                    timestamp=session.created_at + timedelta(minutes=j),
+                    status=status,
+                )
+                db.session.add(record)
+                expected[course.id].append(
+                    [
+                        student.index_number,
+                        str(session.id),
+                        str(record.timestamp),
+                        status,
+                    ]
+                )
+        db.session.commit()
+        return {
+            "headers": headers,
+            "own": courses[0].id,
+            "rep": courses[1].id,
+            "expected": expected,
+        }
+
+
+def _rows(text):
+    rows = list(csv.reader(io.StringIO(text, newline="")))
+    assert rows[0] == HEADER
+    return rows[1:]
+
+
+def _export(client, headers, query=""):
+    response = client.get(f"/attendance/export{query}", headers=headers)
+    assert response.status_code == 200
+    return response
+
+
+def test_export_quotes_values_and_covers_accessible_courses(client, seeded):
+    response = _export(client, seeded["headers"])
+    assert response.mimetype == "text/csv"
+    assert "filename=attendance.csv" in response.headers["Content-Disposition"]
+    text = response.get_data(as_text=True)
+
+    assert '"UEB,002"' in text
+    assert '"UEB""003"""' in text
+    assert '"late, ""excused"""' in text
+    expected = seeded["expected"][seeded["own"]] + seeded["expected"][seeded["rep"]]
+    assert sorted(_rows(text)) == sorted(expected)
+
+
+def test_export_filters_by_course(client, seeded):
+    response = _export(client, seeded["headers"], f"?course_id={seeded['rep']}")
+    text = response.get_data(as_text=True)
+    assert sorted(_rows(text)) == sorted(seeded["expected"][seeded["rep"]])
+
+
+def test_rows_are_written_in_partitions(client, seeded, monkeypatch):
+    whole = _export(client, seeded["headers"]).get_data(as_text=True)
+    monkeypatch.setattr(attendance, "EXPORT_BATCH", 3)
+    response = client.get("/attendance/export", headers=seeded["headers"])
+    chunks = list(response.response)
+    # The header, then one chunk per partition of three rows
+    assert len(chunks) == 1 + -(-20 // 3)
+    assert b"".join(chunks).decode() == whole
+
+
+def test_gzip_export_matches_plain_export(client, seeded):
+    plain = _export(client, seeded["headers"]).data
+    response = _export(client, seeded["headers"], "?compress=gzip")
+    assert response.mimetype == "application/gzip"
+    assert "filename=attendance.csv.gz" in response.headers["Content-Disposition"]
+    assert gzip.decompress(response.data) == plain
+
+
+def test_unknown_compression_is_refused(client, seeded):
+    response = client.get("/attendance/export?compress=bz2", headers=seeded["headers"])
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "compress must be 'gzip'"}
+
+
+@pytest.mark.parametrize(
+    "query, name, mimetype",
+    [
+        ("", "attendance.csv", "text/csv"),
+        ("&compress=gzip", "attendance.csv.gz", "application/gzip"),
+    ],
+)
+def test_export_job_output_matches_streamed_export(
+    client, seeded, wait_for_job, query, name, mimetype
+):
+    headers = seeded["headers"]
+    streamed = _export(client, headers, f"?course_id={seeded['own']}{query}").data
+
+    response = client.get(
+        f"/attendance/export?async=1&course_id={seeded['own']}{query}",
+        headers=headers,
+    )
+    assert response.status_code == 202
+    job = wait_for_job(response.headers["Location"], headers)
+    assert job["status"] == "succeeded"
+    assert job["progress"]["done"] == len(seeded["expected"][seeded["own"]])
+
+    download = client.get(job["download_url"], headers=headers)
+    assert download.status_code == 200
+    assert download.mimetype == mimetype
+    assert f"filename={name}" in download.headers["Content-Disposition"]
+    if mimetype == "application/gzip":
+        assert gzip.decompress(download.data) == gzip.decompress(streamed)
+    else:
+        assert download.data == streamed
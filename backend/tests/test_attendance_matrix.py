@@ -0,0 +1,97 @@
+import base64
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.extensions import db
+from app.models import Attendance, Course, SessionCode, Student
+from app.utils.attendance_matrix import build_matrix
+
+
+def test_pairs_outside_the_axes_are_ignored():
+    # (2, 30) names a session that was not fetched
+    matrix, student_rates, session_rates = build_matrix(
+        [1, 2], [10, 20], [(1, 10), (2, 30)]
+    )
+    assert matrix.tolist() == [[True, False], [False, False]]
+    assert student_rates.tolist() == [0.5, 0.0]
+    assert session_rates.tolist() == [0.5, 0.0]
+
+
+def test_axes_keep_the_given_order():
+    matrix, _, _ = build_matrix([3, 1, 2], [20, 10], [(1, 10), (2, 20), (3, 10)])
+    assert matrix.tolist() == [[False, True], [False, True], [True, False]]
+
+
+def _seed(admin_id):
+    course = Course(course_code="CE101", course_name="Surveying", lecturer_id=admin_id)
+    students = [
+        Student(index_number=f"UEB{i}", full_name=f"Student {i}", email=f"s{i}@ex.io")
+        for i in (3, 1, 2)
+    ]
+    db.session.add(course)
+    db.session.add_all(students)
+    db.session.flush()
+    start = datetime(2025, 3, 1, 8)
+    sessions = [
+        SessionCode(
+            code=f"CODE{i}",
+            created_at=start + timedelta(days=i),
+            expires_at=start + timedelta(days=i, hours=1),
+            latitude=5.6,
+            longitude=-0.18,
+            admin_id=admin_id,
+            course_id=course.id,
+        )
+        for i in (2, 0, 1)
+    ]
+    db.session.add_all(sessions)
+    db.session.flush()
+    by_index = {s.index_number: s.id for s in students}
+    by_code = {s.code: s.id for s in sessions}
+    # CODE2 has no attendance and still gets a column
+    for index_number, code in [("UEB1", "CODE0"), ("UEB1", "CODE1"), ("UEB3", "CODE0")]:
+        db.session.add(
+            Attendance(
+                student_id=by_index[index_number],
+                session_id=by_code[code],
+                timestamp=start,
+            )
+        )
+    db.session.commit()
+    return course.id
+
+
+def test_matrix_endpoint(app, client, make_admin):
+    admin_id, headers = make_admin()
+    with app.app_context():
+        course_id = _seed(admin_id)
+
+    data = client.get(
+        f"/attendance/course/{course_id}/matrix", headers=headers
+    ).get_json()
+    assert [s["code"] for s in data["sessions"]] == ["CODE0", "CODE1", "CODE2"]
+    assert [s["present"] for s in data["sessions"]] == [2, 1, 0]
+    # Only students who attended something, by index number
+    assert [s["index_number"] for s in data["students"]] == ["UEB1", "UEB3"]
+    assert [s["attended"] for s in data["students"]] == [2, 1]
+    assert data["matrix"] == [[1, 1, 0], [1, 0, 0]]
+
+    compact = client.get(
+        f"/attendance/course/{course_id}/matrix?format=compact", headers=headers
+    ).get_json()
+    rows = [
+        np.unpackbits(np.frombuffer(base64.b64decode(row), dtype=np.uint8))[:3]
+        for row in compact["rows"]
+    ]
+    assert [row.tolist() for row in rows] == data["matrix"]
+
+
+def test_matrix_rejects_unknown_format(app, client, make_admin):
+    admin_id, headers = make_admin()
+    with app.app_context():
+        course_id = _seed(admin_id)
+    response = client.get(
+        f"/attendance/course/{course_id}/matrix?format=csv", headers=headers
+    )
+    assert response.status_code == 400
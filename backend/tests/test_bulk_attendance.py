@@ -0,0 +1,265 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.extensions import db
+from app.models import Attendance, Course, CourseRepAccess, SessionCode, Student
+from app.routes.attendance import MAX_BULK_SUBMISSIONS
+
+URL = "/attendance/mark-attendance/bulk"
+LAT, LON = 5.6037, -0.187
+
+
+@pytest.fixture
+def course(app, make_admin):
+    """
+    A course with its lecturer, an approved rep, a rep awaiting approval and
+    an unrelated admin, plus three students. Returns ids and headers.
+    """
+    lecturer_id, lecturer = make_admin()
+    rep_id, rep = make_admin(email="rep@example.com")
+    pending_id, pending = make_admin(email="pending@example.com")
+    _, stranger = make_admin(email="stranger@example.com")
+    with app.app_context():
+        course = Course(
+            course_code="CE101", course_name="Surveying", lecturer_id=lecturer_id
+        )
+        db.session.add(course)
+        db.session.flush()
+        db.session.add_all(
+            [
+                CourseRepAccess(
+                    rep_id=rep_id, course_id=course.id, approved_by_lecturer=True
+                ),
+                CourseRepAccess(
+                    rep_id=pending_id, course_id=course.id, approved_by_lecturer=False
+                ),
+            ]
+            + [
+                Student(index_number=f"UEB{i}", full_name=f"S{i}", email=f"s{i}@ex.io")
+                for i in range(3)
+            ]
+        )
+        db.session.commit()
+        return {
+            "id": course.id,
+            "lecturer_id": lecturer_id,
+            "pending_id": pending_id,
+            "headers": {
+                "lecturer": lecturer,
+                "rep": rep,
+                "pending": pending,
+                "stranger": stranger,
+            },
+        }
+
+
+@pytest.fixture
+def make_session(app, course):
+    """Create a session of the course; returns its (unique) code."""
+
+    def make(created_at, expires_at, admin_id=None):
+        code = uuid.uuid4().hex[:10]
+        with app.app_context():
+            session = SessionCode(
+                code=code,
+                created_at=created_at,
+                expires_at=expires_at,
+                latitude=LAT,
+                longitude=LON,
+                geo_radius=50.0,
+                admin_id=admin_id or course["lecturer_id"],
+                course_id=course["id"],
+            )
+            db.session.add(session)
+            db.session.commit()
+        return code
+
+    return make
+
+
+def _item(i, **fields):
+    return {
+        "index_number": f"UEB{i}",
+        "email": f"s{i}@ex.io",
+        "latitude": LAT,
+        "longitude": LON,
+        **fields,
+    }
+
+
+def _upload(client, headers, code, submissions):
+    return client.post(
+        URL, json={"session_code": code, "submissions": submissions}, headers=headers
+    )
+
+
+@pytest.mark.parametrize(
+    "who, status",
+    [("lecturer", 200), ("rep", 200), ("pending", 403), ("stranger", 403)],
+)
+def test_only_owner_and_approved_reps_may_upload(
+    client, course, make_session, who, status
+):
+    now = datetime.utcnow()
+    code = make_session(now - timedelta(minutes=10), now + timedelta(hours=1))
+    response = _upload(client, course["headers"][who], code, [_item(0)])
+    assert response.status_code == status
+    if status == 403:
+        assert response.get_json() == {"error": "Access denied"}
+    else:
+        assert response.get_json()["marked"] == 1
+
+
+def test_session_creator_may_upload_without_approval(client, course, make_session):
+    now = datetime.utcnow()
+    code = make_session(
+        now - timedelta(minutes=10),
+        now + timedelta(hours=1),
+        admin_id=course["pending_id"],
+    )
+    response = _upload(client, course["headers"]["pending"], code, [_item(0)])
+    assert response.status_code == 200
+    assert response.get_json()["marked"] == 1
+
+
+def test_timestamps_must_fall_within_the_session(app, client, course, make_session):
+    now = datetime.utcnow()
+    started = now - timedelta(hours=2)
+    expired = now - timedelta(hours=1)
+    code = make_session(started, expired)
+    captured = started + timedelta(minutes=30)
+    aware = (captured + timedelta(minutes=1)).replace(tzinfo=timezone.utc)
+    local = aware.astimezone(timezone(timedelta(hours=-5)))
+
+    response = _upload(
+        client,
+        course["headers"]["lecturer"],
+        code,
+        [
+            _item(0, timestamp=captured.isoformat()),
+            _item(1, timestamp=local.isoformat()),
+            _item(2, timestamp=(started - timedelta(seconds=1)).isoformat()),
+            _item(2, timestamp=(expired + timedelta(seconds=1)).isoformat()),
+            _item(2, timestamp=(now + timedelta(minutes=5)).isoformat()),
+            _item(2, timestamp="yesterday"),
+            # Without a timestamp the upload time is used, after expiry here
+            _item(2),
+        ],
+    )
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [r["status"] for r in body["results"][:2]] == ["marked", "marked"]
+    assert [r["error"] for r in body["results"][2:]] == [
+        "Timestamp is before the session started",
+        "Session code has expired",
+        "Timestamp is in the future",
+        "Invalid latitude, longitude or timestamp",
+        "Session code has expired",
+    ]
+    assert (body["marked"], body["duplicates"], body["rejected"]) == (2, 0, 5)
+
+    with app.app_context():
+        stored = {
+            a.student.index_number: a.timestamp
+            for a in Attendance.query.filter_by(session_id=body["session_id"])
+        }
+    # Offset timestamps are stored as naive UTC
+    assert stored == {"UEB0": captured, "UEB1": aware.replace(tzinfo=None)}
+
+
+def test_every_submission_gets_its_own_outcome(app, client, course, make_session):
+    now = datetime.utcnow()
+    code = make_session(now - timedelta(minutes=10), now + timedelta(hours=1))
+    with app.app_context():
+        session = SessionCode.query.filter_by(code=code).one()
+        already = Student.query.filter_by(index_number="UEB2").one()
+        db.session.add(
+            Attendance(
+                student_id=already.id,
+                session_id=session.id,
+                timestamp=now - timedelta(minutes=5),
+            )
+        )
+        db.session.commit()
+
+    response = _upload(
+        client,
+        course["headers"]["rep"],
+        code,
+        [
+            _item(0),
+            _item(0, timestamp=(now - timedelta(minutes=1)).isoformat()),
+            _item(1, email="s0@ex.io"),
+            _item(9),
+            _item(1, latitude=LAT + 0.01),
+            _item(2),
+            _item(1, email=""),
+            "not a submission",
+            _item(1, latitude="north"),
+            _item(1),
+        ],
+    )
+    assert response.status_code == 200
+    body = response.get_json()
+    results = body["results"]
+    assert [(r["index_number"], r["status"]) for r in results] == [
+        ("UEB0", "marked"),
+        ("UEB0", "duplicate"),
+        ("UEB1", "rejected"),
+        ("UEB9", "rejected"),
+        ("UEB1", "rejected"),
+        ("UEB2", "duplicate"),
+        ("UEB1", "rejected"),
+        (None, "rejected"),
+        ("UEB1", "rejected"),
+        ("UEB1", "marked"),
+    ]
+    assert results[2]["error"] == results[3]["error"] == "Student not found"
+    assert results[4]["error"].startswith("Outside allowed location (distance: ")
+    assert (
+        results[1]["error"]
+        == results[5]["error"]
+        == "Attendance already marked for this session"
+    )
+    assert results[6]["error"] == "All fields are required"
+    assert results[7]["error"] == "Invalid submission"
+    assert results[8]["error"] == "Invalid latitude, longitude or timestamp"
+    assert results[0]["distance"] == 0.0
+    assert (body["marked"], body["duplicates"], body["rejected"]) == (2, 2, 6)
+
+    with app.app_context():
+        marked = {
+            a.student.index_number
+            for a in Attendance.query.filter_by(session_id=body["session_id"])
+        }
+    assert marked == {"UEB0", "UEB1", "UEB2"}
+
+
+def test_malformed_uploads_are_refused(client, course, make_session):
+    now = datetime.utcnow()
+    code = make_session(now - timedelta(minutes=10), now + timedelta(hours=1))
+    headers = course["headers"]["lecturer"]
+
+    for body in [
+        {"session_code": code},
+        {"session_code": code, "submissions": []},
+        {"session_code": code, "submissions": {"index_number": "UEB0"}},
+        {"submissions": [_item(0)]},
+    ]:
+        response = client.post(URL, json=body, headers=headers)
+        assert response.status_code == 400
+        assert response.get_json() == {
+            "error": "session_code and submissions are required"
+        }
+
+    response = _upload(client, headers, code, [_item(0)] * (MAX_BULK_SUBMISSIONS + 1))
+    assert response.status_code == 400
+    assert response.get_json() == {
+        "error": f"At most {MAX_BULK_SUBMISSIONS} submissions per upload"
+    }
+
+    response = _upload(client, headers, "no-such-code", [_item(0)])
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "Invalid session code"}
@@ -0,0 +1,108 @@
+import io
+import tracemalloc
+from itertools import islice
+
+import pytest
+from sqlalchemy import insert
+
+from app.extensions import db
+from app.models import Course
+from app.routes import course as course_routes
+from app.routes.course import EXPORT_PDF_MAX_ROWS, _export_rows, _write_export
+
+MB = 1024 * 1024
+
+
+def _seed_courses(lecturer_id, count):
+    db.session.execute(
+        insert(Course),
+        [
+            {
+                "course_code": f"C{i:06d}",
+                "course_name": f"Course number {i}",
+                "department": "Engineering",
+                "semester": "First",
+                "lecturer_id": lecturer_id,
+            }
+            for i in range(count)
+        ],
+    )
+    db.session.commit()
+
+
+def _peak_memory(rows, format, out):
+    tracemalloc.start()
+    try:
+        _write_export(rows, format, out)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_xlsx_export_of_100k_courses_stays_under_ceiling(
+    app, make_admin, tmp_path
+):
+    pytest.importorskip("xlsxwriter")
+    admin_id, _ = make_admin()
+    with app.app_context():
+        _seed_courses(admin_id, 100_000)
+        with open(tmp_path / "courses.xlsx", "wb") as out:
+            peak = _peak_memory(_export_rows(admin_id), "excel", out)
+            size = out.tell()
+
+    # The rows, the workbook and the spreadsheet XML are never held whole:
+    # the file is ~1.9 MB compressed and well over ten times that as XML
+    assert size > MB
+    assert peak < 8 * MB, f"peak {peak / MB:.1f} MB"
+
+
+def test_pdf_export_at_the_row_cap_stays_under_ceiling(app, make_admin, tmp_path):
+    pytest.importorskip("reportlab")
+    admin_id, _ = make_admin()
+    with app.app_context():
+        _seed_courses(admin_id, EXPORT_PDF_MAX_ROWS)
+        with open(tmp_path / "courses.pdf", "wb") as out:
+            peak = _peak_memory(_export_rows(admin_id), "pdf", out)
+
+    assert peak < 16 * MB, f"peak {peak / MB:.1f} MB"
+
+
+def test_pdf_export_beyond_the_cap_is_refused(
+    app, client, make_admin, wait_for_job, monkeypatch
+):
+    pytest.importorskip("reportlab")
+    monkeypatch.setattr(course_routes, "EXPORT_PDF_MAX_ROWS", 20)
+    admin_id, headers = make_admin()
+    with app.app_context():
+        _seed_courses(admin_id, 21)
+
+    response = client.get("/courses/export?format=pdf", headers=headers)
+    assert response.status_code == 400
+    assert "limited to 20 courses" in response.get_json()["error"]
+
+    response = client.get("/courses/export?format=pdf&async=1", headers=headers)
+    job = wait_for_job(response.headers["Location"], headers)
+    assert job["status"] == "failed"
+    assert "limited to 20 courses" in job["error"]
+
+    # Excel has no cap
+    response = client.get("/courses/export?format=excel", headers=headers)
+    assert response.status_code == 200
+
+
+def test_export_contains_every_course(app, client, make_admin):
+    openpyxl = pytest.importorskip("openpyxl")
+    admin_id, headers = make_admin()
+    with app.app_context():
+        _seed_courses(admin_id, 2_500)
+
+    response = client.get("/courses/export?format=excel", headers=headers)
+    assert response.status_code == 200
+    sheet = openpyxl.load_workbook(io.BytesIO(response.data), read_only=True).active
+    rows = list(sheet.iter_rows(values_only=True))
+    assert rows[0] == ("Course Code", "Course Name", "Department", "Semester")
+    assert len(rows) == 2_501
+    assert list(islice(rows, 1, 3)) == [
+        ("C000000", "Course number 0", "Engineering", "First"),
+        ("C000001", "Course number 1", "Engineering", "First"),
+    ]
@@ -0,0 +1,154 @@
+import io
+
+from app.extensions import db
+from app.models import Course
+from app.routes import course as course_routes
+from app.routes.course import _import_courses
+
+HEADER = "course_code,course_name,department,semester"
+
+
+def _csv(*lines, prefix=""):
+    return io.BytesIO((prefix + "\n".join((HEADER,) + lines)).encode())
+
+
+def _import(stream, admin_id, progress=None):
+    result = {"imported": 0, "skipped": []}
+    return _import_courses(stream, admin_id, result, progress)
+
+
+def _upload(client, headers, data, query=""):
+    return client.post(
+        f"/courses/import{query}",
+        data={"file": (io.BytesIO(data), "courses.csv")},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+
+
+def test_every_row_is_imported_or_skipped_with_a_reason(app, make_admin):
+    admin_id, _ = make_admin()
+    with app.app_context():
+        old = Course(course_code="CE100", course_name="Old", lecturer_id=admin_id)
+        db.session.add(old)
+        db.session.commit()
+        result = _import(
+            _csv(
+                "CE101, Surveying ,Civil,1",
+                "CE100,Again,Civil,1",  # already in the database
+                "CE102,Hydraulics,,",
+                "CE101,Surveying II,Civil,2",  # repeated in the file
+                ",No code,Civil,1",
+                "CE103,,Civil,1",
+                "CE104",  # short row
+                prefix="﻿",
+            ),
+            admin_id,
+        )
+        courses = {c.course_code: c for c in Course.query}
+
+    assert result["imported"] == 2
+    assert [(s["line"], s["reason"]) for s in result["skipped"]] == [
+        (3, "Duplicate course_code"),
+        (5, "Duplicate course_code in file"),
+        (6, "Missing course_code or course_name"),
+        (7, "Missing course_code or course_name"),
+        (8, "Missing course_code or course_name"),
+    ]
+    assert result["skipped"][0]["row"]["course_name"] == "Again"
+    assert sorted(courses) == ["CE100", "CE101", "CE102"]
+    assert courses["CE100"].course_name == "Old"
+    assert courses["CE101"].course_name == "Surveying"
+    assert (courses["CE102"].department, courses["CE102"].semester) == ("", "")
+    assert {c.lecturer_id for c in courses.values()} == {admin_id}
+
+
+def test_chunks_cross_the_import_chunk_boundary(app, make_admin, monkeypatch):
+    monkeypatch.setattr(course_routes, "IMPORT_CHUNK", 3)
+    admin_id, _ = make_admin()
+    lines = [f"C{i:03d},Course {i},Dept,1" for i in range(10)]
+    # Repeats of a code from an earlier chunk, and of one within a chunk
+    lines.insert(7, "C001,Late repeat,Dept,1")
+    lines.insert(2, "C000,Early repeat,Dept,1")
+    progress = []
+    with app.app_context():
+        old = Course(course_code="C009", course_name="Old", lecturer_id=admin_id)
+        db.session.add(old)
+        db.session.commit()
+        result = _import(_csv(*lines), admin_id, lambda done: progress.append(done))
+        codes = sorted(db.session.scalars(db.select(Course.course_code)))
+
+    assert result["imported"] == 9
+    assert [(s["line"], s["reason"]) for s in result["skipped"]] == [
+        (4, "Duplicate course_code in file"),
+        (10, "Duplicate course_code in file"),
+        (13, "Duplicate course_code"),
+    ]
+    assert codes == [f"C{i:03d}" for i in range(10)]
+    # After every full chunk, then once at the end
+    assert progress == [3, 6, 9, 12, 12]
+
+
+def test_failure_reports_what_was_committed(app, client, make_admin, monkeypatch):
+    monkeypatch.setattr(course_routes, "IMPORT_CHUNK", 4)
+    admin_id, headers = make_admin()
+    real_chunk = course_routes._import_chunk
+    calls = []
+
+    def failing_chunk(chunk, *args):
+        calls.append(len(chunk))
+        if len(calls) == 3:
+            raise RuntimeError("disk full")
+        return real_chunk(chunk, *args)
+
+    monkeypatch.setattr(course_routes, "_import_chunk", failing_chunk)
+    lines = [f"C{i:03d},Course {i},," for i in range(12)]
+    response = _upload(client, headers, _csv(*lines).getvalue())
+
+    assert response.status_code == 500
+    body = response.get_json()
+    assert (body["error"], body["details"]) == ("Import failed", "disk full")
+    assert body["imported"] == 8
+    with app.app_context():
+        assert Course.query.count() == 8
+
+
+def test_invalid_utf8_reports_the_partial_count(app, client, make_admin, monkeypatch):
+    monkeypatch.setattr(course_routes, "IMPORT_CHUNK", 100)
+    _, headers = make_admin()
+    # Far beyond the decoder's first read, so whole chunks commit before it
+    lines = [f"C{i:05d},Course number {i},Department,1" for i in range(2000)]
+    data = _csv(*lines).getvalue() + b"\nC99999,Caf\xe9,Dept,1\n"
+    response = _upload(client, headers, data)
+
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body["error"] == "File must be UTF-8 encoded"
+    assert 0 < body["imported"] < 2000
+    assert body["imported"] % 100 == 0
+    with app.app_context():
+        assert Course.query.count() == body["imported"]
+
+
+def test_imported_courses_reach_the_callers_caches(client, make_admin, wait_for_job):
+    _, headers = make_admin()
+    # Prime the course access cache with no courses
+    assert client.get("/dashboard/summary", headers=headers).get_json()["courses"] == 0
+
+    response = _upload(client, headers, _csv("CE101,Surveying,,").getvalue())
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "message": "1 courses imported",
+        "imported": 1,
+        "skipped": [],
+    }
+    assert client.get("/dashboard/summary", headers=headers).get_json()["courses"] == 1
+
+    data = _csv("CE101,Surveying,,", "CE102,Hydraulics,,").getvalue()
+    response = _upload(client, headers, data, "?async=1")
+    assert response.status_code == 202
+    job = wait_for_job(response.headers["Location"], headers)
+    assert job["status"] == "succeeded"
+    assert job["result"]["imported"] == 1
+    assert [s["line"] for s in job["result"]["skipped"]] == [2]
+    assert client.get("/dashboard/summary", headers=headers).get_json()["courses"] == 2
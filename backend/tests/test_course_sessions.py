@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models import Course, CourseRepAccess, SessionCode
+
+
+@pytest.fixture
+def course(app, make_admin):
+    """
+    A course with three sessions, its lecturer, an approved rep, a rep
+    awaiting approval and an unrelated admin. Returns the id and headers.
+    """
+    lecturer_id, lecturer = make_admin()
+    rep_id, rep = make_admin(email="rep@example.com")
+    pending_id, pending = make_admin(email="pending@example.com")
+    _, stranger = make_admin(email="stranger@example.com")
+    with app.app_context():
+        course = Course(
+            course_code="CE101", course_name="Surveying", lecturer_id=lecturer_id
+        )
+        db.session.add(course)
+        db.session.flush()
+        db.session.add_all(
+            [
+                CourseRepAccess(
+                    rep_id=rep_id, course_id=course.id, approved_by_lecturer=True
+                ),
+                CourseRepAccess(rep_id=pending_id, course_id=course.id),
+            ]
+            + [
+                SessionCode(
+                    code=f"CS{i}",
+                    expires_at=datetime.utcnow() + timedelta(hours=i + 1),
+                    latitude=5.6,
+                    longitude=-0.18,
+                    admin_id=lecturer_id,
+                    course_id=course.id,
+                )
+                for i in range(3)
+            ]
+        )
+        db.session.commit()
+        return {
+            "id": course.id,
+            "headers": {
+                "lecturer": lecturer,
+                "rep": rep,
+                "pending": pending,
+                "stranger": stranger,
+            },
+        }
+
+
+@pytest.mark.parametrize(
+    "who, status",
+    [("lecturer", 200), ("rep", 200), ("pending", 200), ("stranger", 403)],
+)
+def test_course_sessions_are_listed_for_lecturer_and_reps(client, course, who, status):
+    response = client.get(
+        f"/sessions/course/{course['id']}", headers=course["headers"][who]
+    )
+    assert response.status_code == status
+    if status == 200:
+        sessions = response.get_json()["sessions"]
+        assert [s["code"] for s in sessions] == ["CS2", "CS1", "CS0"]
+    else:
+        assert response.get_json() == {"error": "Access denied"}
+
+
+def test_unknown_course_is_not_found(client, course):
+    response = client.get("/sessions/course/999", headers=course["headers"]["lecturer"])
+    assert response.status_code == 404
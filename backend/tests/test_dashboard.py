@@ -0,0 +1,218 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import (
+    Admin,
+    Attendance,
+    Course,
+    CourseRepAccess,
+    SessionCode,
+    Student,
+)
+from app.routes import dashboard
+from app.routes.dashboard import _course_aggregates
+from app.utils.attendance_writer import insert_attendance
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+
+def _seed(sessions, students):
+    admin = Admin(full_name="Lecturer", email="lecturer@example.com")
+    admin.set_password("secret")
+    db.session.add(admin)
+    db.session.flush()
+    course = Course(course_code="CE101", course_name="Surveying", lecturer_id=admin.id)
+    db.session.add(course)
+    db.session.add_all(
+        Student(
+            index_number=f"UEB{i:07d}", full_name=f"Student {i}", email=f"s{i}@ex.io"
+        )
+        for i in range(students)
+    )
+    db.session.flush()
+
+    now = datetime.utcnow()
+    rows = []
+    for s in range(sessions):
+        session = SessionCode(
+            code=f"S{s:05d}",
+            created_at=now - timedelta(days=s),
+            expires_at=now - timedelta(days=s) + timedelta(hours=1),
+            latitude=5.6037,
+            longitude=-0.187,
+            admin_id=admin.id,
+            course_id=course.id,
+        )
+        db.session.add(session)
+        db.session.flush()
+        rows += [
+            {
+                "student_id": student_id,
+                "session_id": session.id,
+                "timestamp": session.created_at + timedelta(minutes=5),
+                "student_latitude": 5.6037,
+                "student_longitude": -0.187,
+                "status": "present",
+            }
+            # Each session is attended by a different share of the class
+            for student_id in range(1, students + 1)
+            if student_id % (s + 2)
+        ]
+    insert_attendance(rows)
+    db.session.commit()
+    return admin.id, course
+
+
+def test_course_aggregates_is_one_statement(app):
+    with app.app_context():
+        _, course = _seed(sessions=6, students=30)
+        db.session.refresh(course)
+        with count_statements() as statements:
+            data = _course_aggregates(course, trend_days=7, top_limit=10)
+
+    assert len(statements) == 1
+    assert data["summary"]["sessions_count"] == 6
+    assert data["summary"]["students_marked"] == 30
+    assert len(data["top_students"]) == 10
+    assert len(data["attendance_trend"]) == 6
+
+
+def test_course_dashboard_query_count(app, client):
+    with app.app_context():
+        admin_id, course = _seed(sessions=20, students=50)
+        course_id = course.id
+        token = create_access_token(identity=str(admin_id))
+    headers = {"Authorization": f"Bearer {token}"}
+    url = f"/dashboard/course-dashboard/{course_id}"
+
+    # Warm the admin identity cache, then count a steady-state request
+    assert client.get(url, headers=headers).status_code == 200
+    with app.app_context(), count_statements() as statements:
+        response = client.get(url, headers=headers)
+
+    assert response.status_code == 200
+    # Course access check, the aggregate query, then the course's sessions
+    # and their positions for the geo insights; none of them per session
+    assert len(statements) == 4, statements
+
+
+def test_dashboard_summary_is_one_statement(app, client):
+    with app.app_context():
+        admin_id, course = _seed(sessions=8, students=40)
+        # A course the admin helps with as a rep counts; a stranger's does not
+        other = Admin(full_name="Other", email="other@example.com")
+        other.set_password("secret")
+        db.session.add(other)
+        db.session.flush()
+        helped, unrelated = (
+            Course(course_code=code, course_name=code, lecturer_id=other.id)
+            for code in ("CE102", "CE103")
+        )
+        db.session.add_all([helped, unrelated])
+        db.session.flush()
+        db.session.add(CourseRepAccess(rep_id=admin_id, course_id=helped.id))
+        for target, day in ((helped, 1), (unrelated, 2)):
+            session = SessionCode(
+                code=f"X{target.course_code}",
+                created_at=datetime.utcnow() - timedelta(days=day),
+                expires_at=datetime.utcnow(),
+                latitude=5.6037,
+                longitude=-0.187,
+                admin_id=other.id,
+                course_id=target.id,
+            )
+            db.session.add(session)
+            db.session.flush()
+            # Students 41 and 42 are only ever marked outside the seeded course
+            insert_attendance(
+                [
+                    {"student_id": s, "session_id": session.id}
+                    for s in (1, 2, 40 + day)
+                ]
+            )
+        db.session.commit()
+        accessible = [course.id, helped.id]
+        expected = {
+            "courses": 2,
+            "sessions": SessionCode.query.filter(
+                SessionCode.course_id.in_(accessible)
+            ).count(),
+            "attendance_records": Attendance.query.join(SessionCode)
+            .filter(SessionCode.course_id.in_(accessible))
+            .count(),
+            "students_marked": db.session.query(Attendance.student_id)
+            .join(SessionCode)
+            .filter(SessionCode.course_id.in_(accessible))
+            .distinct()
+            .count(),
+        }
+        token = create_access_token(identity=str(admin_id))
+        newcomer = Admin(full_name="New", email="new@example.com")
+        newcomer.set_password("secret")
+        db.session.add(newcomer)
+        db.session.commit()
+        newcomer_token = create_access_token(identity=str(newcomer.id))
+
+    # Warm the identity and course access caches, then count a request
+    for bearer in (token, newcomer_token):
+        headers = {"Authorization": f"Bearer {bearer}"}
+        assert client.get("/dashboard/summary", headers=headers).status_code == 200
+    with app.app_context(), count_statements() as statements:
+        response = client.get(
+            "/dashboard/summary", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert len(statements) == 1, statements
+        assert response.get_json() == expected
+
+        # Without courses there is nothing to count
+        statements.clear()
+        response = client.get(
+            "/dashboard/summary",
+            headers={"Authorization": f"Bearer {newcomer_token}"},
+        )
+        assert statements == []
+        assert response.get_json() == {
+            "courses": 0,
+            "sessions": 0,
+            "attendance_records": 0,
+            "students_marked": 0,
+        }
+
+
+def test_top_students_limit_is_validated_and_capped(app, client, monkeypatch):
+    monkeypatch.setattr(dashboard, "MAX_TOP_STUDENTS", 12)
+    with app.app_context():
+        admin_id, course = _seed(sessions=6, students=30)
+        course_id = course.id
+        token = create_access_token(identity=str(admin_id))
+    headers = {"Authorization": f"Bearer {token}"}
+    url = f"/dashboard/top-students/{course_id}"
+
+    for limit in ("abc", "0", "-5", "2.5", ""):
+        response = client.get(f"{url}?limit={limit}", headers=headers)
+        assert response.status_code == 400, limit
+        assert response.get_json() == {"error": "limit must be a positive integer"}
+
+    for query, expected in (("", 10), ("?limit=3", 3), ("?limit=1000000", 12)):
+        response = client.get(url + query, headers=headers)
+        assert response.status_code == 200
+        top = response.get_json()["top_students"]
+        assert len(top) == expected, query
+        counts = [s["attendance_count"] for s in top]
+        assert counts == sorted(counts, reverse=True)
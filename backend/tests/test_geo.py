@@ -0,0 +1,69 @@
+import math
+import random
+
+import numpy as np
+import pytest
+from geopy.distance import geodesic
+
+from app.utils.geo import check_geofence, check_geofence_many
+
+# (latitude, longitude) of fence centres: equator, campus latitudes, high
+# latitude and both sides of the antimeridian
+CENTRES = [
+    (0.0, 0.0),
+    (5.6037, -0.187),
+    (51.5, -0.12),
+    (-33.9, 18.4),
+    (69.6, 18.9),
+    (10.0, 179.9999),
+    (-10.0, -179.9999),
+]
+RADII = [3.0, 25.0, 100.0, 500.0]
+
+
+def _points(centre_lat, centre_lon, radius, count, rng):
+    """Points around a fence, concentrated near its boundary."""
+    points = []
+    for _ in range(count):
+        bearing = rng.uniform(0, 360)
+        distance = radius * rng.choice(
+            [rng.uniform(0, 3), rng.uniform(0.999, 1.001), 1.0]
+        )
+        point = geodesic(meters=distance).destination((centre_lat, centre_lon), bearing)
+        points.append((point.latitude, point.longitude))
+    return points
+
+
+@pytest.mark.parametrize("centre", CENTRES)
+@pytest.mark.parametrize("radius", RADII)
+def test_matches_geodesic(centre, radius):
+    rng = random.Random(f"{centre}{radius}")
+    for lat, lon in _points(*centre, radius, 200, rng):
+        expected = geodesic((lat, lon), centre).meters
+        inside, distance = check_geofence(lat, lon, *centre, radius)
+        assert inside == (expected <= radius)
+        assert distance == pytest.approx(expected, abs=1e-3)
+
+
+@pytest.mark.parametrize("centre", CENTRES)
+def test_many_matches_single(centre):
+    rng = random.Random(str(centre))
+    points = _points(*centre, 50.0, 300, rng)
+    lats, lons = zip(*points)
+    inside, distances = check_geofence_many(lats, lons, *centre, 50.0)
+    for i, (lat, lon) in enumerate(points):
+        one_inside, one_distance = check_geofence(lat, lon, *centre, 50.0)
+        assert bool(inside[i]) == one_inside
+        assert distances[i] == pytest.approx(one_distance, abs=1e-3)
+
+
+def test_far_points_report_geodesic_distance():
+    # Beyond the planar range the reported distance is the exact one
+    inside, distance = check_geofence(5.6, -0.19, 51.5, -0.12, 100.0)
+    assert not inside
+    assert distance == pytest.approx(geodesic((5.6, -0.19), (51.5, -0.12)).meters)
+
+    inside, distances = check_geofence_many([5.6], [-0.19], 51.5, -0.12, 100.0)
+    assert not inside[0]
+    assert math.isclose(distances[0], distance)
+    assert isinstance(inside, np.ndarray)
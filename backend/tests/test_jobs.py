@@ -0,0 +1,333 @@
+import logging
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models import Course, Job
+from app.utils.jobs import (
+    JOB_HANDLERS,
+    STALE_AFTER_BEATS,
+    JobError,
+    delete_expired_jobs,
+    get_job_runner,
+)
+
+
+@pytest.fixture
+def runner(app):
+    with app.app_context():
+        yield get_job_runner()
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    """Register a handler for the "test" job kind for one test."""
+
+    def register(func):
+        monkeypatch.setitem(JOB_HANDLERS, "test", func)
+        return func
+
+    return register
+
+
+def _queue(runner, admin_id, params=None, **fields):
+    """Insert a queued job owned by `runner` without handing it to the pool."""
+    fields = {"owner": runner.boot_id, "heartbeat_at": datetime.utcnow(), **fields}
+    job = Job(
+        id=os.urandom(16).hex(),
+        kind="test",
+        admin_id=admin_id,
+        params=params or {},
+        **fields,
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job.id
+
+
+def _run(runner, job_id):
+    """Run a job on the calling thread and return its row afterwards."""
+    runner._run(job_id)
+    return db.session.get(Job, job_id)
+
+
+# ------------------- RUNNER -------------------
+def test_job_succeeds_with_result_file(runner, make_admin, handler):
+    admin_id, _ = make_admin()
+
+    @handler
+    def write_report(ctx, rows):
+        with open(ctx.input_path) as f:
+            assert f.read() == "uploaded"
+        with ctx.open_result("report.txt", "text/plain") as out:
+            out.write(b"x" * rows)
+        ctx.progress(rows, rows)
+        return {"rows": rows}
+
+    job_id = _queue(runner, admin_id, {"rows": 3})
+    with open(runner.path(job_id, "upload"), "w") as f:
+        f.write("uploaded")
+    job = _run(runner, job_id)
+
+    assert job.status == "succeeded"
+    assert job.result == {"rows": 3}
+    assert (job.progress, job.total) == (3, 3)
+    assert job.result_file == f"{job_id}.result"
+    assert (job.download_name, job.mimetype) == ("report.txt", "text/plain")
+    assert job.started_at <= job.finished_at
+    assert job.expires_at == job.finished_at + runner.result_ttl
+    with open(runner.path(job_id, "result"), "rb") as f:
+        assert f.read() == b"xxx"
+    # The upload is the handler's input only
+    assert not os.path.exists(runner.path(job_id, "upload"))
+    assert runner.progress(job_id) is None
+
+
+def test_job_error_message_is_shown(runner, make_admin, handler):
+    admin_id, _ = make_admin()
+
+    @handler
+    def refuse(ctx):
+        with ctx.open_result("partial.txt", "text/plain") as out:
+            out.write(b"half")
+        raise JobError("Nothing to do")
+
+    job = _run(runner, _queue(runner, admin_id))
+    assert (job.status, job.error) == ("failed", "Nothing to do")
+    assert job.result_file is None
+    assert job.expires_at is not None
+    assert not os.path.exists(runner.path(job.id, "result"))
+
+
+def test_unexpected_error_is_logged_not_shown(runner, make_admin, handler, caplog):
+    admin_id, _ = make_admin()
+
+    @handler
+    def crash(ctx):
+        raise KeyError("internal detail")
+
+    with caplog.at_level(logging.ERROR, logger="app.utils.jobs"):
+        job = _run(runner, _queue(runner, admin_id))
+    assert (job.status, job.error) == ("failed", "Job failed unexpectedly")
+    assert "internal detail" not in job.error
+    assert "internal detail" in caplog.text
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        {"owner": "another-runner"},
+        {"status": "failed", "error": "Interrupted by a server restart"},
+    ],
+)
+def test_only_queued_jobs_of_this_runner_are_claimed(
+    runner, make_admin, handler, fields
+):
+    admin_id, _ = make_admin()
+    calls = []
+    handler(lambda ctx: calls.append(ctx.id))
+
+    job_id = _queue(runner, admin_id)
+    db.session.query(Job).filter_by(id=job_id).update(fields)
+    db.session.commit()
+    job = _run(runner, job_id)
+
+    assert calls == []
+    assert job.status == fields.get("status", "queued")
+    assert job.started_at is None
+
+
+def test_deleted_job_is_not_run(runner, make_admin, handler):
+    admin_id, _ = make_admin()
+    calls = []
+    handler(lambda ctx: calls.append(ctx.id))
+
+    job_id = _queue(runner, admin_id)
+    db.session.query(Job).filter_by(id=job_id).delete()
+    db.session.commit()
+    assert _run(runner, job_id) is None
+    assert calls == []
+
+
+def test_outcome_does_not_overwrite_a_failed_job(runner, make_admin, handler):
+    admin_id, _ = make_admin()
+
+    @handler
+    def outlived(ctx):
+        # Another runner decided this one was gone while the handler ran
+        db.session.query(Job).filter_by(id=ctx.id).update(
+            {"status": "failed", "error": "Interrupted by a server restart"}
+        )
+        db.session.commit()
+        return {"rows": 1}
+
+    job = _run(runner, _queue(runner, admin_id))
+    assert (job.status, job.error) == ("failed", "Interrupted by a server restart")
+    assert job.result is None
+
+
+# ------------------- HEARTBEAT -------------------
+def test_beat_refreshes_own_jobs_and_fails_stale_ones(runner, make_admin):
+    admin_id, _ = make_admin()
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=runner.heartbeat * STALE_AFTER_BEATS + 1)
+    fresh = now - timedelta(seconds=runner.heartbeat)
+
+    own = _queue(runner, admin_id, heartbeat_at=stale)
+    own_running = _queue(runner, admin_id, status="running", heartbeat_at=stale)
+    runner.set_progress(own_running, 40, 100)
+    other_fresh = _queue(runner, admin_id, owner="other", heartbeat_at=fresh)
+    other_stale = _queue(runner, admin_id, owner="other", heartbeat_at=stale)
+    other_running = _queue(
+        runner, admin_id, owner="other", status="running", heartbeat_at=stale
+    )
+    legacy = _queue(runner, admin_id, owner=None, heartbeat_at=None)
+    finished = _queue(
+        runner, admin_id, owner="other", status="succeeded", heartbeat_at=stale
+    )
+
+    assert runner.beat() == 3
+    db.session.expire_all()
+    status = {job.id: job for job in db.session.query(Job)}
+
+    for job_id in (own, own_running):
+        assert status[job_id].heartbeat_at >= now
+    assert status[own].status == "queued"
+    assert status[own_running].status == "running"
+    assert (status[own_running].progress, status[own_running].total) == (40, 100)
+    assert status[other_fresh].status == "queued"
+    assert status[finished].status == "succeeded"
+    for job_id in (other_stale, other_running, legacy):
+        job = status[job_id]
+        assert (job.status, job.error) == ("failed", "Interrupted by a server restart")
+        assert job.expires_at == job.finished_at + runner.result_ttl
+
+    # Nothing is left for a second beat to fail
+    assert runner.beat() == 0
+
+
+# ------------------- EXPIRY -------------------
+def test_delete_expired_jobs_removes_rows_and_files(runner, make_admin):
+    admin_id, _ = make_admin()
+    now = datetime.utcnow()
+    expired = _queue(runner, admin_id, status="succeeded", expires_at=now)
+    kept = _queue(
+        runner, admin_id, status="succeeded", expires_at=now + timedelta(hours=1)
+    )
+    unfinished = _queue(runner, admin_id)
+    for job_id in (expired, kept):
+        for suffix in ("upload", "result"):
+            open(runner.path(job_id, suffix), "w").close()
+
+    assert delete_expired_jobs(now + timedelta(seconds=1)) == 1
+    assert {job.id for job in db.session.query(Job)} == {kept, unfinished}
+    assert not os.path.exists(runner.path(expired, "result"))
+    assert not os.path.exists(runner.path(expired, "upload"))
+    assert os.path.exists(runner.path(kept, "result"))
+    assert delete_expired_jobs(now + timedelta(seconds=1)) == 0
+
+
+# ------------------- ROUTES -------------------
+def _add_course(app, admin_id):
+    with app.app_context():
+        course = Course(course_code="C1", course_name="One", lecturer_id=admin_id)
+        db.session.add(course)
+        db.session.commit()
+
+
+def _export(client, headers):
+    response = client.get("/courses/export?async=1", headers=headers)
+    assert response.status_code == 202
+    return response.headers["Location"]
+
+
+def test_submitted_job_can_be_downloaded(app, client, make_admin, wait_for_job):
+    admin_id, headers = make_admin()
+    _add_course(app, admin_id)
+
+    location = _export(client, headers)
+    job = wait_for_job(location, headers)
+    assert job["status"] == "succeeded"
+    assert job["download_url"] == f"{location}/download"
+
+    response = client.get(job["download_url"], headers=headers)
+    assert response.status_code == 200
+    assert response.data.startswith(b"PK")
+    assert "attachment" in response.headers["Content-Disposition"]
+    listed = client.get("/jobs", headers=headers).get_json()["jobs"]
+    assert [j["id"] for j in listed] == [job["id"]]
+
+
+def test_download_of_unfinished_or_failed_job_conflicts(
+    app, client, make_admin, wait_for_job
+):
+    admin_id, headers = make_admin()
+    # No courses, so the export fails with a JobError
+    job = wait_for_job(_export(client, headers), headers)
+    assert (job["status"], job["error"]) == ("failed", "No courses to export")
+    assert job["download_url"] is None
+
+    response = client.get(f"/jobs/{job['id']}/download", headers=headers)
+    assert response.status_code == 409
+    assert response.get_json() == {"error": "Job is failed"}
+
+    with app.app_context():
+        queued = _queue(get_job_runner(), admin_id)
+    response = client.get(f"/jobs/{queued}/download", headers=headers)
+    assert response.status_code == 409
+    assert response.get_json() == {"error": "Job is queued"}
+
+
+def test_jobs_of_other_admins_are_not_found(app, client, make_admin, wait_for_job):
+    admin_id, headers = make_admin()
+    _, intruder = make_admin(email="other@example.com")
+    _add_course(app, admin_id)
+    job = wait_for_job(_export(client, headers), headers)
+
+    for method, url in [
+        ("get", f"/jobs/{job['id']}"),
+        ("get", f"/jobs/{job['id']}/download"),
+        ("delete", f"/jobs/{job['id']}"),
+        ("get", "/jobs/no-such-job"),
+        ("get", "/jobs/no-such-job/download"),
+    ]:
+        response = getattr(client, method)(url, headers=intruder)
+        assert response.status_code == 404, url
+        assert response.get_json() == {"error": "Job not found"}
+    assert client.get("/jobs", headers=intruder).get_json() == {"jobs": []}
+
+
+def test_download_without_result_file_is_not_found(
+    app, client, make_admin, wait_for_job
+):
+    admin_id, headers = make_admin()
+    _add_course(app, admin_id)
+    job = wait_for_job(_export(client, headers), headers)
+    with app.app_context():
+        os.remove(get_job_runner().path(job["id"], "result"))
+
+    response = client.get(f"/jobs/{job['id']}/download", headers=headers)
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "Job has no result file"}
+
+
+def test_delete_discards_finished_job_but_not_running_one(
+    app, client, make_admin, wait_for_job
+):
+    admin_id, headers = make_admin()
+    _add_course(app, admin_id)
+    job = wait_for_job(_export(client, headers), headers)
+
+    assert client.delete(f"/jobs/{job['id']}", headers=headers).status_code == 200
+    assert client.get(f"/jobs/{job['id']}", headers=headers).status_code == 404
+    with app.app_context():
+        runner = get_job_runner()
+        assert not os.path.exists(runner.path(job["id"], "result"))
+        # Running, and not a future this runner could still cancel
+        running = _queue(runner, admin_id, status="running")
+
+    response = client.delete(f"/jobs/{running}", headers=headers)
+    assert response.status_code == 409
+    assert response.get_json() == {"error": "Job is already running"}
@@ -0,0 +1,113 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import inspect, select, text, tuple_
+
+from app.extensions import db
+from app.migrations import MIGRATIONS, upgrade_database
+from app.models import Attendance, Course, CourseRepAccess, SessionCode, Student
+
+NOW = datetime(2025, 1, 1)
+
+
+def query_plan(conn, stmt):
+    compiled = stmt.compile(dialect=conn.dialect)
+    params = tuple(
+        value.isoformat(" ") if isinstance(value, datetime) else value
+        for value in (compiled.params[name] for name in compiled.positiontup)
+    )
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)
+    return " | ".join(row[3] for row in rows)
+
+
+# (statement mirroring a route query, index its plan must use)
+HOT_QUERIES = {
+    "session attendance page": (
+        select(Attendance)
+        .where(Attendance.session_id == 1)
+        .where(tuple_(Attendance.timestamp, Attendance.id) < tuple_(NOW, 10))
+        .order_by(Attendance.timestamp.desc(), Attendance.id.desc())
+        .limit(101),
+        "ix_attendance_session_timestamp",
+    ),
+    "attendance in a time range": (
+        select(Attendance.id).where(Attendance.timestamp >= NOW),
+        "ix_attendance_timestamp",
+    ),
+    "active sessions of a course": (
+        select(SessionCode).where(
+            SessionCode.course_id == 1, SessionCode.expires_at > NOW
+        ),
+        "ix_session_codes_course_expires",
+    ),
+    "my sessions page": (
+        select(SessionCode)
+        .where(SessionCode.admin_id == 1)
+        .order_by(SessionCode.created_at.desc(), SessionCode.id.desc())
+        .limit(101),
+        "ix_session_codes_admin_created",
+    ),
+    "expired session reaper": (
+        select(SessionCode.id).where(SessionCode.expires_at < NOW),
+        "ix_session_codes_expires_at",
+    ),
+    "lecturer courses": (
+        select(Course.id).where(Course.lecturer_id == 1),
+        "ix_courses_lecturer_id",
+    ),
+    "reps of a course": (
+        select(CourseRepAccess).where(CourseRepAccess.course_id == 1),
+        "ix_course_rep_access_course_rep",
+    ),
+    "courses of a rep": (
+        select(CourseRepAccess.course_id).where(
+            CourseRepAccess.rep_id == 1, CourseRepAccess.approved_by_lecturer
+        ),
+        "sqlite_autoindex_course_rep_access_1",
+    ),
+    "student by index number": (
+        select(Student).where(Student.index_number == "UEB0000001"),
+        "sqlite_autoindex_students_1",
+    ),
+}
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(app, name):
+    stmt, index = HOT_QUERIES[name]
+    with app.app_context(), db.engine.connect() as conn:
+        plan = query_plan(conn, stmt)
+    assert f"INDEX {index}" in plan, plan
+
+
+def test_fresh_database_reaches_latest_version(app):
+    with app.app_context(), db.engine.connect() as conn:
+        version = conn.execute(text("SELECT version FROM schema_version")).scalar()
+        tables = set(inspect(conn).get_table_names())
+    assert version == MIGRATIONS[-1][0]
+    assert tables >= set(db.metadata.tables)
+
+
+def test_baseline_is_frozen(app):
+    # Migration 1 must create the original schema only, whatever the models
+    # say now; later tables and indexes come from later migrations
+    with app.app_context():
+        db.drop_all()
+        with db.engine.begin() as conn:
+            conn.execute(text("DROP TABLE schema_version"))
+            MIGRATIONS[0][2](conn)
+            inspector = inspect(conn)
+            tables = set(inspector.get_table_names())
+            indexes = {
+                index["name"]
+                for table in tables
+                for index in inspector.get_indexes(table)
+            }
+    assert "code_counters" not in tables
+    assert "jobs" not in tables
+    assert not indexes
+
+
+def test_upgrade_is_idempotent(app):
+    with app.app_context():
+        assert upgrade_database() == MIGRATIONS[-1][0]
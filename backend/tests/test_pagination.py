@@ -0,0 +1,243 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app.extensions import db
+from app.models import Admin, Attendance, Course, SessionCode, Student
+from app.utils.pagination import decode_cursor, encode_cursor
+
+T0 = datetime(2025, 3, 3, 8)
+T1 = datetime(2025, 3, 3, 10)
+
+
+def _seed():
+    """
+    One lecturer with a course of five sessions and nine students who all
+    attended every session. Sessions 0-1 and 2-4 share their marking time,
+    so every listing is full of identical timestamps; 20 more sessions
+    without attendance share three creation times.
+
+    The first student and the lecturer get the same id, as /students/attendance
+    reads its JWT identity as a student id.
+    """
+    students = [
+        Student(index_number=f"UEB{i:03}", full_name=f"S {i}", email=f"{i}@ex.io")
+        for i in range(9)
+    ]
+    db.session.add_all(students)
+    db.session.flush()
+    lecturer = Admin(id=students[0].id, full_name="Lecturer", email="l@ex.io")
+    lecturer.set_password("secret")
+    db.session.add(lecturer)
+    db.session.flush()
+    course = Course(course_code="CS101", course_name="Intro", lecturer_id=lecturer.id)
+    db.session.add(course)
+    db.session.flush()
+
+    sessions = [
+        SessionCode(
+            code=f"P{i:03}",
+            created_at=T0 + timedelta(hours=i % 3),
+            expires_at=T1 + timedelta(days=1),
+            latitude=5.6,
+            longitude=-0.18,
+            admin_id=lecturer.id,
+            course_id=course.id if i < 5 else None,
+        )
+        for i in range(25)
+    ]
+    db.session.add_all(sessions)
+    db.session.flush()
+    db.session.add_all(
+        Attendance(
+            student_id=student.id,
+            session_id=session.id,
+            timestamp=T0 if i < 2 else T1,
+        )
+        for i, session in enumerate(sessions[:5])
+        for student in students
+    )
+    db.session.commit()
+
+    token = create_access_token(identity=str(lecturer.id))
+    return {
+        "headers": {"Authorization": f"Bearer {token}"},
+        "course": course.id,
+        "session": sessions[2].id,
+        "student": students[0],
+    }
+
+
+@pytest.fixture
+def seeded(app):
+    with app.app_context():
+        yield _seed()
+
+
+def _newest_first(query):
+    return query.order_by(Attendance.timestamp.desc(), Attendance.id.desc()).all()
+
+
+def _listings(seeded):
+    """
+    (url, response key, row -> identity, expected identities in order) for
+    every paginated listing.
+    """
+    student = seeded["student"]
+    marks = _newest_first(Attendance.query)
+    by_session = [m for m in marks if m.session_id == seeded["session"]]
+    own = [m for m in marks if m.student_id == student.id]
+    sessions = SessionCode.query.order_by(
+        SessionCode.created_at.desc(), SessionCode.id.desc()
+    ).all()
+    return [
+        (
+            f"/attendance/course/{seeded['course']}",
+            "attendance",
+            lambda r: (r["student_id"], r["session_id"]),
+            [(m.student_id, m.session_id) for m in marks],
+        ),
+        (
+            f"/attendance/{seeded['session']}",
+            "attendance",
+            lambda r: r["id"],
+            [m.id for m in by_session],
+        ),
+        (
+            f"/attendance/student/{student.index_number}",
+            "attendance",
+            lambda r: r["session_id"],
+            [m.session_id for m in own],
+        ),
+        (
+            f"/attendance/filter?course_id={seeded['course']}",
+            "filtered",
+            lambda r: (r["student"], r["session_id"]),
+            [(m.student.index_number, m.session_id) for m in marks],
+        ),
+        (
+            "/students/attendance",
+            "attendance",
+            lambda r: r["session_id"],
+            [m.session_id for m in own],
+        ),
+        (
+            "/sessions/my-sessions",
+            "sessions",
+            lambda r: r["id"],
+            [s.id for s in sessions],
+        ),
+    ]
+
+
+def _walk(client, url, key, headers, limit):
+    """Follow next_cursor to the end; returns (rows, number of pages)."""
+    separator = "&" if "?" in url else "?"
+    rows, cursor, pages = [], None, 0
+    while True:
+        query = f"{separator}limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url + query, headers=headers)
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        assert len(body[key]) <= limit
+        rows.extend(body[key])
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return rows, pages
+
+
+def test_cursor_round_trip():
+    moment = datetime(2025, 3, 3, 8, 15, 30, 123456)
+    cursor = encode_cursor(moment, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (moment, 42)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "W10", "WyJ4IiwxXQ", "!!!"])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("limit", [1, 4, 7, 1000])
+def test_walks_every_listing_without_duplicates_or_skips(client, seeded, limit):
+    for url, key, identity, expected in _listings(seeded):
+        rows, pages = _walk(client, url, key, seeded["headers"], limit)
+        assert [identity(r) for r in rows] == expected, url
+        assert pages == max(1, -(-len(expected) // limit)), url
+
+
+def test_ties_are_broken_by_id(client, seeded):
+    url = f"/attendance/{seeded['session']}"
+    rows, _ = _walk(client, url, "attendance", seeded["headers"], 2)
+    assert len({r["timestamp"] for r in rows}) == 1
+    ids = [r["id"] for r in rows]
+    assert ids == sorted(ids, reverse=True)
+
+
+def test_rows_added_during_a_walk_do_not_shift_pages(app, client, seeded):
+    url = f"/attendance/course/{seeded['course']}?limit=5"
+    headers = seeded["headers"]
+    expected = [
+        (m.student_id, m.session_id) for m in _newest_first(Attendance.query)
+    ]
+    first = client.get(url, headers=headers).get_json()
+
+    # A newer mark and one tied with the cursor row both sort before the
+    # cursor, so the rest of the walk neither repeats nor loses a row
+    newcomer = Student(index_number="UEB999", full_name="Late", email="late@ex.io")
+    db.session.add(newcomer)
+    db.session.flush()
+    db.session.add_all(
+        [
+            Attendance(student_id=newcomer.id, session_id=1, timestamp=T1),
+            Attendance(
+                student_id=newcomer.id, session_id=2, timestamp=T1 + timedelta(1)
+            ),
+        ]
+    )
+    db.session.commit()
+
+    rows, cursor = first["attendance"], first["next_cursor"]
+    while cursor:
+        page = client.get(f"{url}&cursor={cursor}", headers=headers).get_json()
+        rows.extend(page["attendance"])
+        cursor = page["next_cursor"]
+    assert [(r["student_id"], r["session_id"]) for r in rows] == expected
+
+
+@pytest.mark.parametrize(
+    "query, error",
+    [
+        ("cursor=not-a-cursor", "Invalid cursor"),
+        ("cursor=W10", "Invalid cursor"),
+        ("limit=0", "limit must be a positive integer"),
+        ("limit=-3", "limit must be a positive integer"),
+        ("limit=abc", "limit must be a positive integer"),
+    ],
+)
+def test_invalid_page_parameters_are_rejected(client, seeded, query, error):
+    for url, *_ in _listings(seeded):
+        separator = "&" if "?" in url else "?"
+        response = client.get(url + separator + query, headers=seeded["headers"])
+        assert response.status_code == 400, url
+        assert response.get_json() == {"error": error}
+
+
+def test_page_size_is_capped(make_app):
+    app = make_app(DEFAULT_PAGE_SIZE=2, MAX_PAGE_SIZE=3)
+    client = app.test_client()
+    with app.app_context():
+        seeded = _seed()
+        listings = _listings(seeded)
+    for url, key, _, expected in listings:
+        separator = "&" if "?" in url else "?"
+        capped = client.get(url + separator + "limit=50", headers=seeded["headers"])
+        default = client.get(url, headers=seeded["headers"])
+        assert len(capped.get_json()[key]) == min(3, len(expected)), url
+        assert len(default.get_json()[key]) == min(2, len(expected)), url
+        rows, pages = _walk(client, url, key, seeded["headers"], 50)
+        assert len(rows) == len(expected), url
+        assert pages == -(-len(expected) // 3), url
@@ -0,0 +1,243 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, update
+
+from app.extensions import db
+from app.models import (
+    Admin,
+    Attendance,
+    AttendanceBucketCount,
+    AttendanceDailyCount,
+    Course,
+    SessionCode,
+    Student,
+    StudentCourseTotal,
+)
+from app.utils.attendance_writer import insert_attendance, retract_attendance
+from app.utils.rollups import check_rollups, rebuild_rollups
+
+START = datetime(2025, 3, 3, 8)
+ROLLUP_MODELS = (AttendanceDailyCount, AttendanceBucketCount, StudentCourseTotal)
+
+
+def _mismatches():
+    with db.engine.connect() as conn:
+        return check_rollups(conn)
+
+
+def _rollup_total():
+    return db.session.scalar(
+        db.select(db.func.coalesce(db.func.sum(StudentCourseTotal.attendance_count), 0))
+    )
+
+
+@pytest.fixture
+def seeded(app):
+    """
+    Two lecturers, three courses, four sessions per course over two days
+    plus one session without a course, and five students. Half the marks go
+    through the ORM, half through insert_attendance.
+    """
+    with app.app_context():
+        lecturers = [
+            Admin(full_name=f"Lecturer {i}", email=f"l{i}@ex.io") for i in (1, 2)
+        ]
+        for lecturer in lecturers:
+            lecturer.set_password("secret")
+        students = [
+            Student(index_number=f"UEB{i}", full_name=f"Student {i}", email=f"{i}@x.io")
+            for i in range(5)
+        ]
+        db.session.add_all(lecturers + students)
+        db.session.flush()
+        courses = [
+            Course(course_code=f"C{i}", course_name=f"Course {i}", lecturer_id=owner.id)
+            for i, owner in enumerate([lecturers[0], lecturers[0], lecturers[1]])
+        ]
+        db.session.add_all(courses)
+        db.session.flush()
+        sessions = [
+            SessionCode(
+                code=f"S{course.id}{i}",
+                created_at=START + timedelta(days=i // 2, minutes=40 * i),
+                expires_at=START + timedelta(days=i // 2, minutes=40 * i + 30),
+                latitude=5.6,
+                longitude=-0.18,
+                admin_id=course.lecturer_id,
+                course_id=course.id,
+            )
+            for course in courses
+            for i in range(4)
+        ]
+        sessions.append(
+            SessionCode(
+                code="NOCOURSE",
+                created_at=START,
+                expires_at=START + timedelta(hours=1),
+                latitude=5.6,
+                longitude=-0.18,
+                admin_id=lecturers[0].id,
+            )
+        )
+        db.session.add_all(sessions)
+        db.session.flush()
+
+        marks = [
+            {
+                "student_id": student.id,
+                "session_id": session.id,
+                "timestamp": session.created_at + timedelta(minutes=5 + student.id),
+                "status": "present",
+            }
+            for session in sessions
+            for student in students
+            if (student.id + session.id) % 3
+        ]
+        for mark in marks[::2]:
+            db.session.add(Attendance(**mark))
+        db.session.commit()
+        insert_attendance(marks[1::2])
+        db.session.commit()
+
+        yield {
+            "lecturers": [a.id for a in lecturers],
+            "courses": [c.id for c in courses],
+            "sessions": [s.id for s in sessions],
+            "students": [s.id for s in students],
+            "marks": len(marks),
+        }
+
+
+def test_inserts_are_rolled_up(seeded):
+    assert _mismatches() == []
+    no_course = db.session.scalar(
+        db.select(db.func.count(Attendance.id))
+        .join(SessionCode)
+        .where(SessionCode.course_id.is_(None))
+    )
+    # Marks of sessions without a course are not rolled up
+    assert _rollup_total() == seeded["marks"] - no_course > 0
+    daily = db.session.scalar(
+        db.select(db.func.sum(AttendanceDailyCount.attendance_count))
+    )
+    buckets = db.session.scalar(
+        db.select(db.func.sum(AttendanceBucketCount.attendance_count))
+    )
+    assert daily == buckets == _rollup_total()
+
+
+def test_duplicate_core_insert_is_not_counted(seeded):
+    before = _rollup_total()
+    existing = db.session.scalars(db.select(Attendance).limit(1)).one()
+    inserted = insert_attendance(
+        [
+            {
+                "student_id": existing.student_id,
+                "session_id": existing.session_id,
+                "timestamp": existing.timestamp,
+            }
+        ]
+    )
+    db.session.commit()
+    assert inserted == set()
+    assert _rollup_total() == before
+    assert _mismatches() == []
+
+
+def test_orm_delete_of_single_rows(seeded):
+    for record in db.session.scalars(db.select(Attendance).limit(7)):
+        db.session.delete(record)
+    db.session.commit()
+    assert _mismatches() == []
+
+
+def test_bulk_delete_by_session(seeded):
+    session_id = seeded["sessions"][1]
+    retract_attendance(Attendance.session_id == session_id)
+    Attendance.query.filter_by(session_id=session_id).delete()
+    db.session.commit()
+    assert _mismatches() == []
+
+
+@pytest.mark.parametrize(
+    "model, key",
+    [
+        (SessionCode, "sessions"),
+        (Student, "students"),
+        (Course, "courses"),
+        (Admin, "lecturers"),
+    ],
+)
+def test_cascading_deletes(seeded, model, key):
+    before = _rollup_total()
+    db.session.delete(db.session.get(model, seeded[key][0]))
+    db.session.commit()
+    assert _mismatches() == []
+    assert _rollup_total() < before
+
+
+def test_rollups_never_keep_zero_rows(seeded):
+    db.session.delete(db.session.get(Course, seeded["courses"][0]))
+    db.session.commit()
+    for model in ROLLUP_MODELS:
+        assert not db.session.scalar(
+            db.select(db.func.count()).where(model.attendance_count <= 0)
+        )
+        assert not db.session.scalar(
+            db.select(db.func.count()).where(model.course_id == seeded["courses"][0])
+        )
+
+
+def test_rebuild_repairs_corrupted_rollups(app, seeded):
+    course_id = seeded["courses"][1]
+    with db.engine.begin() as conn:
+        conn.execute(
+            update(StudentCourseTotal).values(
+                attendance_count=StudentCourseTotal.attendance_count + 3
+            )
+        )
+        conn.execute(
+            delete(AttendanceDailyCount).where(
+                AttendanceDailyCount.course_id == course_id
+            )
+        )
+        conn.execute(
+            AttendanceBucketCount.__table__.insert().values(
+                course_id=course_id, bucket_start=0, attendance_count=9
+            )
+        )
+    mismatches = _mismatches()
+    assert {table for table, *_ in mismatches} == {
+        "attendance_daily_counts",
+        "attendance_bucket_counts",
+        "student_course_totals",
+    }
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["check-rollups"])
+    assert result.exit_code == 1
+    assert "expected" in result.output
+
+    result = runner.invoke(args=["rebuild-rollups"])
+    assert result.exit_code == 0
+    assert _mismatches() == []
+    result = runner.invoke(args=["check-rollups"])
+    assert result.exit_code == 0
+    assert "Rollups match" in result.output
+
+
+def test_rebuild_rollups_matches_incremental_maintenance(seeded):
+    def snapshot():
+        return {
+            model.__tablename__: sorted(
+                tuple(row) for row in db.session.execute(db.select(model.__table__))
+            )
+            for model in ROLLUP_MODELS
+        }
+
+    incremental = snapshot()
+    with db.engine.begin() as conn:
+        rebuild_rollups(conn)
+    db.session.expire_all()
+    assert snapshot() == incremental
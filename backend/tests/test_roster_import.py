@@ -0,0 +1,121 @@
+import io
+
+import pytest
+
+from app.extensions import db
+from app.models import Student
+from app.utils import roster_import
+from app.utils.roster_import import import_roster, read_csv_roster
+
+
+def _csv(*lines):
+    return io.BytesIO("\n".join(("index_number,full_name,email",) + lines).encode())
+
+
+def _seed_students():
+    db.session.add_all(
+        Student(index_number=index_number, full_name=name, email=email)
+        for index_number, name, email in [
+            ("UEB0001", "Ama Mensah", "ama@ex.io"),
+            ("UEB0002", "Kofi Boateng", "kofi@ex.io"),
+            ("UEB0099", "Akua Nyarko", "akua@ex.io"),
+        ]
+    )
+    db.session.commit()
+
+
+def test_report_counts_every_outcome(app):
+    roster = _csv(
+        "UEB0001,Ama Mensah,ama@ex.io",  # unchanged
+        "UEB0002,Kofi A. Boateng,kofi@ex.io",  # updated
+        "UEB0003,Esi Owusu,esi@ex.io",  # inserted
+        "UEB0004,Yaw Darko,akua@ex.io",  # another student's email
+        "UEB0003,Esi Again,esi2@ex.io",  # index number repeated in the file
+        "UEB0005,Efua Asante,ESI@ex.io",  # email repeated in the file
+        "UEB0006,Kwame Adjei,not-an-email",
+        "UEB0007,,kwaku@ex.io",
+        "bad index!,Abena Osei,abena@ex.io",
+    )
+    with app.app_context():
+        _seed_students()
+        report = import_roster(read_csv_roster(roster)).as_dict()
+        students = {s.index_number: s for s in Student.query}
+
+    assert (report["inserted"], report["updated"], report["unchanged"]) == (1, 1, 1)
+    assert report["rejected"] == 6
+    assert [(e["line"], e["reason"]) for e in report["errors"]] == [
+        (5, "Email belongs to another student"),
+        (6, "Duplicate index_number in file"),
+        (7, "Duplicate email in file"),
+        (8, "Invalid email"),
+        (9, "index_number, full_name and email are required"),
+        (10, "Invalid index_number"),
+    ]
+    assert sorted(students) == ["UEB0001", "UEB0002", "UEB0003", "UEB0099"]
+    assert students["UEB0002"].full_name == "Kofi A. Boateng"
+
+
+def test_chunks_are_counted_across_boundaries(app, monkeypatch):
+    monkeypatch.setattr(roster_import, "ROSTER_CHUNK", 3)
+    lines = [f"UEB{i:04d},Student {i},s{i}@ex.io" for i in range(1, 11)]
+    progress = []
+    with app.app_context():
+        _seed_students()
+        report = import_roster(read_csv_roster(_csv(*lines)), progress.append)
+        count = Student.query.count()
+
+    # UEB0001 and UEB0002 exist with other names and emails
+    assert (report.inserted, report.updated, report.unchanged) == (8, 2, 0)
+    assert count == 11
+    assert progress == [3, 6, 9, 10]
+
+
+def test_missing_columns_are_reported(client, make_admin):
+    _, headers = make_admin()
+    data = {"file": (io.BytesIO(b"index_number,name\nUEB1,Ama\n"), "roster.csv")}
+    response = client.post("/students/import", headers=headers, data=data)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Missing column(s): full_name, email"
+
+
+def _xlsx(rows):
+    xlsxwriter = pytest.importorskip("xlsxwriter")
+    buffer = io.BytesIO()
+    with xlsxwriter.Workbook(buffer) as workbook:
+        sheet = workbook.add_worksheet()
+        for r, row in enumerate(rows):
+            sheet.write_row(r, 0, row)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_xlsx_roster_upload(app, client, make_admin, wait_for_job, asynchronous):
+    pytest.importorskip("openpyxl")
+    _, headers = make_admin()
+    roster = _xlsx(
+        [
+            ("Index_Number", "Full_Name", "Email"),
+            # Spreadsheets store numeric-looking index numbers as numbers
+            (10001, "Ama Mensah", "ama@ex.io"),
+            ("UEB0002", "Kofi Boateng", "kofi@ex.io"),
+            ("UEB0003", "Esi Owusu", "kofi@ex.io"),
+        ]
+    )
+    url = "/students/import?async=1" if asynchronous else "/students/import"
+    response = client.post(
+        url, headers=headers, data={"file": (roster, "roster.xlsx")}
+    )
+    if asynchronous:
+        assert response.status_code == 202
+        job = wait_for_job(response.headers["Location"], headers)
+        assert job["status"] == "succeeded", job
+        report = job["result"]
+    else:
+        assert response.status_code == 200, response.get_json()
+        report = response.get_json()
+
+    assert (report["inserted"], report["rejected"]) == (2, 1)
+    assert report["errors"][0]["reason"] == "Duplicate email in file"
+    with app.app_context():
+        assert db.session.get(Student, 1).index_number == "10001"